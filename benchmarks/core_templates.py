@@ -0,0 +1,39 @@
+"""
+Measure the cold start of core templates, loaded from the precompiled artifact or built from source.
+
+    python benchmarks/core_templates.py [repetitions]
+"""
+import subprocess
+import sys
+import time
+
+IMPORT = "from dumbo_asp.primitives.templates import Template"
+SCENARIOS = {
+    "import only": "",
+    "artifact: one template": "Template.core_template('@dumbo/transitive closure')",
+    "artifact: expand a program": "from dumbo_asp.primitives.programs import SymbolicProgram; "
+                                  "Template.expand_program(SymbolicProgram.parse("
+                                  "'__apply_template__(\"@dumbo/transitive closure\", (relation, r)).'))",
+    "artifact: all templates": "Template.core_templates_as_parsable_string()",
+    "source: all templates": "import tempfile, pathlib; "
+                             "Template.write_core_templates_artifact(pathlib.Path(tempfile.mkdtemp()) / 'a.json')",
+}
+
+
+def measure(code: str, repetitions: int) -> float:
+    res = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"{IMPORT}\n{code}"], check=True)
+        res.append(time.perf_counter() - start)
+    return min(res)
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for title, code in SCENARIOS.items():
+        print(f"{title:<40} {measure(code, repetitions):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measure ground size and solve time of every core template across instance sizes.
+
+    python benchmarks/grounding.py [--sizes 4,8,16] [--filter TEXT] [--timeout SECONDS]
+                                   [--save BASELINE.json] [--check BASELINE.json] [--tolerance 0.1]
+
+Instances are random facts over 1..size for the input predicates of each template (body predicates not defined by
+the template), except for predicates whose name fixes their intended meaning (e.g., size/1, rows/1, value/1).
+With --check, the ground sizes are compared with a baseline saved by --save, and the script fails if some template
+grows by more than the given tolerance.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import clingo
+
+from dumbo_asp.primitives.predicates import Predicate
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.templates import Template
+
+SCALARS = {"size", "rows", "cols"}
+RANGES = {"value", "value'", "node", "row", "col", "set_element"}
+STARTS = {"start"}
+
+
+def input_predicates(template: Template) -> list[Predicate]:
+    defined = set()
+    used = set()
+    for rule in template.program:
+        head, positive, negative = rule.predicates_by_position
+        defined.update(head)
+        used.update(positive)
+        used.update(negative)
+    return sorted(
+        (predicate for predicate in used - defined if not predicate.name.startswith('_')),
+        key=lambda predicate: (predicate.name, predicate.arity),
+    )
+
+
+def instance(predicates: list[Predicate], size: int, generator: random.Random) -> str:
+    res = []
+    for predicate in predicates:
+        if predicate.arity == 0:
+            res.append(f"{predicate.name}.")
+        elif predicate.name in SCALARS and predicate.arity == 1:
+            res.append(f"{predicate.name}({size}).")
+        elif predicate.name in RANGES and predicate.arity == 1:
+            res.append(f"{predicate.name}(1..{size}).")
+        elif predicate.name in STARTS and predicate.arity == 1:
+            res.append(f"{predicate.name}(1).")
+        else:
+            for _ in range(size * predicate.arity):
+                arguments = ','.join(str(generator.randint(1, size)) for _ in range(predicate.arity))
+                res.append(f"{predicate.name}({arguments}).")
+    return '\n'.join(res)
+
+
+def measure(name: str, size: int, timeout: float, seed: int) -> dict:
+    template = Template.core_template(name)
+    facts = instance(input_predicates(template), size, random.Random(f"{seed}/{name}/{size}"))
+    program = Template.expand_program(SymbolicProgram.parse(f'{facts}\n__apply_template__("{name}").'))
+
+    control = clingo.Control(["--warn=none"])
+    start = time.perf_counter()
+    control.add("base", [], str(program))
+    control.ground([("base", [])])
+    grounding = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with control.solve(async_=True) as handle:
+        finished = handle.wait(timeout)
+        if not finished:
+            handle.cancel()
+        result = handle.get()
+    solving = time.perf_counter() - start
+
+    lp = control.statistics["problem"]["lp"]
+    return {
+        "rules": int(lp["rules"]),
+        "atoms": int(lp["atoms"]),
+        "ground": round(grounding, 4),
+        "solve": round(solving, 4),
+        "status": "timeout" if not finished else ("sat" if result.satisfiable else "unsat"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="4,8,16")
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--timeout", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path)
+    parser.add_argument("--check", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = [name for name in Template.core_template_names() if args.filter in name]
+    results = {}
+    print(f"{'template':<55} {'size':>5} {'rules':>9} {'atoms':>9} {'ground':>8} {'solve':>8}  status")
+    for name in names:
+        for size in sizes:
+            res = measure(name, size, args.timeout, args.seed)
+            results.setdefault(name, {})[str(size)] = res
+            print(f"{name:<55} {size:>5} {res['rules']:>9} {res['atoms']:>9} "
+                  f"{res['ground']:>7.3f}s {res['solve']:>7.3f}s  {res['status']}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+    if args.check:
+        baseline = json.loads(args.check.read_text())
+        regressions = [
+            f"{name} (size {size}): {key} {expected[key]} -> {results[name][size][key]}"
+            for name, by_size in baseline.items() if name in results
+            for size, expected in by_size.items() if size in results[name]
+            for key in ("rules", "atoms")
+            if results[name][size][key] > expected[key] * (1 + args.tolerance)
+        ]
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
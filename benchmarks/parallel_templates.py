@@ -0,0 +1,48 @@
+"""
+Compare serial and parallel expansion of programs with many applications of core and declared templates.
+
+    python benchmarks/parallel_templates.py [applications] [workers...]
+"""
+import os
+import sys
+import time
+
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.templates import Template
+
+
+def program(applications: int) -> SymbolicProgram:
+    half = applications // 2
+    return SymbolicProgram.parse('\n'.join([
+        *(f'__apply_template__("@dumbo/transitive closure", (relation, r{index}), (closure, c{index})).'
+          for index in range(half)),
+        '__template__("pairs").',
+        '__pair(X,Y) :- element(X), element(Y), X < Y.',
+        'pair(X,Y) :- __pair(X,Y).',
+        '__end__.',
+        *(f'__apply_template__("pairs", (element, e{index}), (pair, p{index})).'
+          for index in range(applications - half)),
+    ]))
+
+
+def measure(the_program: SymbolicProgram, workers: int) -> tuple[float, str]:
+    start = time.perf_counter()
+    res = Template.expand_program(the_program, limit=10_000_000, deterministic=True, workers=workers)
+    return time.perf_counter() - start, str(res)
+
+
+def main():
+    applications = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    workers = [int(argument) for argument in sys.argv[2:]] or sorted({2, os.cpu_count() or 1})
+    the_program = program(applications)
+    serial, expected = measure(the_program, 1)
+    print(f"{applications} applications, {os.cpu_count()} cpus")
+    print(f"{'serial':<12} {serial:8.3f}s")
+    for worker in workers:
+        elapsed, res = measure(the_program, worker)
+        assert res == expected, "parallel expansion differs from the serial one"
+        print(f"{f'{worker} workers':<12} {elapsed:8.3f}s  x{serial / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
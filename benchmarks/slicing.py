@@ -0,0 +1,47 @@
+"""
+Compare query functions on a large program with and without slicing.
+
+    python benchmarks/slicing.py [size]
+"""
+import sys
+import time
+
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.queries import validate_in_all_models, enumerate_models
+
+
+def program_of_size(size: int) -> SymbolicProgram:
+    return SymbolicProgram.parse(f"""
+node(1..{size}).
+link(X, X+1) :- node(X), node(X+1).
+reach(X, Y) :- link(X, Y).
+reach(X, Z) :- reach(X, Y), link(Y, Z).
+in(X) :- node(X), not out(X).
+out(X) :- node(X), not in(X).
+{{selected(X) : node(X)}} = 1 :- X = 1.
+
+goal :- start.
+start.
+    """)
+
+
+def measure(title: str, fun) -> None:
+    start = time.perf_counter()
+    fun()
+    print(f"{title:<40} {time.perf_counter() - start:8.3f}s")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    program = program_of_size(size)
+    print(f"{len(program)} rules over {size} nodes; sliced on goal: {len(program.slice(*Model.of_atoms('goal')))}")
+    for sliced in [False, True]:
+        measure(f"validate_in_all_models(slice={sliced})",
+                lambda: validate_in_all_models(program, true_atoms=Model.of_atoms("goal"), slice=sliced))
+        measure(f"enumerate_models(slice={sliced}, up_to=1)",
+                lambda: enumerate_models(program, true_atoms=Model.of_atoms("goal"), up_to=1, slice=sliced))
+
+
+if __name__ == "__main__":
+    main()
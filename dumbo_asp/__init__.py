@@ -0,0 +1,6 @@
+import importlib.metadata
+
+try:
+    __version__ = importlib.metadata.version("dumbo-asp")
+except importlib.metadata.PackageNotFoundError:  # not installed (e.g., running from a source checkout)
+    __version__ = "0+unknown"
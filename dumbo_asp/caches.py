@@ -0,0 +1,107 @@
+import dataclasses
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Final
+
+import clingo
+import typeguard
+from dumbo_utils.validation import validate
+
+import dumbo_asp
+
+CACHE_FORMAT_VERSION: Final = f"1-dumbo-asp-{dumbo_asp.__version__}-clingo-{clingo.__version__}"
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class ResultCache:
+    """
+    On-disk cache of pickled results, keyed by content hashes.
+
+    Entries are written atomically (to a temporary file, then renamed), and the least recently used ones are evicted
+    when the size of the directory exceeds max_size bytes (hits refresh the modification time of entries).
+    """
+    directory: Path
+    max_size: int = 256 * 1024 * 1024
+    __metrics: dict[str, int] = dataclasses.field(
+        default_factory=lambda: {"hits": 0, "misses": 0, "writes": 0, "evictions": 0},
+        init=False, repr=False, compare=False,
+    )
+
+    def __post_init__(self):
+        validate("max_size", self.max_size, min_value=0)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256('\0'.join((CACHE_FORMAT_VERSION, *parts)).encode()).hexdigest()
+
+    @property
+    def metrics(self) -> dict[str, int]:
+        return dict(self.__metrics)
+
+    def __path(self, namespace: str, key: str) -> Path:
+        return self.directory / f"{namespace}-{key}.pickle"
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        path = self.__path(namespace, key)
+        try:
+            with open(path, "rb") as file:
+                res = pickle.load(file)
+        except Exception:  # missing, truncated, or written by incompatible code
+            self.__metrics["misses"] += 1
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted by another process in the meantime
+            pass
+        self.__metrics["hits"] += 1
+        return res
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        file_descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.__path(namespace, key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.__metrics["writes"] += 1
+        self.__evict()
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        missing = object()
+        res = self.get(namespace, key, missing)
+        if res is missing:
+            res = compute()
+            self.put(namespace, key, res)
+        return res
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self.__entries())
+
+    def clear(self) -> None:
+        for entry in self.__entries():
+            os.unlink(entry.path)
+
+    def __entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".pickle")]
+
+    def __evict(self) -> None:
+        entries = [(entry.stat(), entry) for entry in self.__entries()]
+        size = sum(stat.st_size for stat, _ in entries)
+        if size <= self.max_size:
+            return
+        for stat, entry in sorted(entries, key=lambda element: element[0].st_mtime_ns):
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            self.__metrics["evictions"] += 1
+            size -= stat.st_size
+            if size <= self.max_size:
+                break
@@ -0,0 +1,127 @@
+import dataclasses
+from typing import Callable, Final, Iterable, Optional
+
+import clingo
+import igraph
+import typeguard
+
+from dumbo_asp.primitives.predicates import Predicate
+
+Tuples = tuple[tuple[clingo.Symbol, ...], ...]
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class Accelerator:
+    """
+    Python-native evaluation of a core template, used when its input predicates are defined by facts only.
+
+    The evaluation receives the instances of the input predicates (by name in the template) and returns the instances
+    of the output predicates (by name in the template), or None if the template must be expanded as usual.
+    """
+    inputs: tuple[Predicate, ...]
+    outputs: tuple[Predicate, ...]
+    evaluate: Callable[[dict[str, Tuples]], Optional[dict[str, Iterable[tuple[clingo.Symbol, ...]]]]]
+
+
+ACCELERATORS: Final[dict[str, Accelerator]] = {}
+
+
+def register_accelerator(template: str, *, inputs: Iterable[str], outputs: Iterable[str]) -> Callable:
+    """
+    Register the decorated function as the accelerator of the given core template.
+    Predicates are given as name/arity.
+    """
+    def decorator(evaluate: Callable) -> Callable:
+        ACCELERATORS[template] = Accelerator(
+            inputs=tuple(Predicate.parse(predicate) for predicate in inputs),
+            outputs=tuple(Predicate.parse(predicate) for predicate in outputs),
+            evaluate=evaluate,
+        )
+        return evaluate
+    return decorator
+
+
+def _graph(nodes: Iterable[clingo.Symbol], links: Tuples) -> tuple[igraph.Graph, list[clingo.Symbol]]:
+    """
+    The graph of the given links, whose first vertices are the given nodes (in order, without repetitions).
+    """
+    vertices = {}
+    for node in nodes:
+        vertices.setdefault(node, len(vertices))
+    for source, target in links:
+        vertices.setdefault(source, len(vertices))
+        vertices.setdefault(target, len(vertices))
+    graph = igraph.Graph(n=len(vertices), directed=True,
+                         edges=[(vertices[source], vertices[target]) for source, target in links])
+    return graph, list(vertices.keys())
+
+
+def _components(nodes: Tuples, links: Tuples) -> tuple[list[clingo.Symbol], list[clingo.Symbol]]:
+    """
+    Vertices of the graph and the smallest vertex in the strongly connected component of each vertex.
+    """
+    graph, vertices = _graph((node for node, in nodes), links)
+    membership = graph.connected_components(mode="strong").membership
+    smallest = {}
+    for vertex, component in enumerate(membership):
+        if component not in smallest or vertices[vertex] < smallest[component]:
+            smallest[component] = vertices[vertex]
+    return vertices, [smallest[component] for component in membership]
+
+
+@register_accelerator("@dumbo/transitive closure", inputs=["relation/2"], outputs=["closure/2"])
+def _transitive_closure(instances: dict[str, Tuples]) -> dict[str, Iterable[tuple[clingo.Symbol, ...]]]:
+    graph, vertices = _graph((), instances["relation"])
+    cyclic = set(source for source, target in graph.get_edgelist() if source == target)
+    cyclic.update(vertex for component in graph.connected_components(mode="strong") if len(component) > 1
+                  for vertex in component)
+    res = []
+    for vertex, reached in enumerate(graph.neighborhood(order=len(vertices), mode="out", mindist=1)):
+        res.extend((vertices[vertex], vertices[other]) for other in reached)
+        if vertex in cyclic:
+            res.append((vertices[vertex], vertices[vertex]))
+    return {"closure": res}
+
+
+@register_accelerator("@dumbo/reachable nodes", inputs=["start/1", "link/2"], outputs=["reach/1"])
+def _reachable_nodes(instances: dict[str, Tuples]) -> dict[str, Iterable[tuple[clingo.Symbol, ...]]]:
+    graph, vertices = _graph((node for node, in instances["start"]), instances["link"])
+    reached = set()
+    for start in range(len(set(instances["start"]))):
+        reached.update(graph.subcomponent(start, mode="out"))
+    return {"reach": [(vertices[vertex],) for vertex in reached]}
+
+
+@register_accelerator("@dumbo/strongly connected components", inputs=["node/1", "link/2"],
+                      outputs=["in_scc/2", "scc/1"])
+def _strongly_connected_components(instances: dict[str, Tuples]) -> dict[str, Iterable[tuple[clingo.Symbol, ...]]]:
+    vertices, smallest = _components(instances["node"], instances["link"])
+    component_of = dict(zip(vertices, smallest))
+    in_scc = [(node, component_of[node]) for node, in instances["node"]]
+    return {"in_scc": in_scc, "scc": set((component,) for _, component in in_scc)}
+
+
+@register_accelerator("@dumbo/condensation graph", inputs=["node/1", "link/2"],
+                      outputs=["in_scc/2", "scc/1", "scc_link/2"])
+def _condensation_graph(instances: dict[str, Tuples]) -> dict[str, Iterable[tuple[clingo.Symbol, ...]]]:
+    res = _strongly_connected_components(instances)
+    component_of = dict(res["in_scc"])
+    res["scc_link"] = set(
+        (component_of[source], component_of[target]) for source, target in instances["link"]
+        if source in component_of and target in component_of and component_of[source] != component_of[target]
+    )
+    return res
+
+
+@register_accelerator("@dumbo/generate grid", inputs=["rows/1", "cols/1"], outputs=["row/1", "col/1", "grid/2"])
+def _generate_grid(instances: dict[str, Tuples]) -> Optional[dict[str, Iterable[tuple[clingo.Symbol, ...]]]]:
+    if len(instances["rows"]) != 1 or len(instances["cols"]) != 1:
+        return None  # the debug rules of the template must be kept
+    (rows,), = instances["rows"]
+    (cols,), = instances["cols"]
+    if rows.type != clingo.SymbolType.Number or cols.type != clingo.SymbolType.Number:
+        return None
+    row = [(clingo.Number(index),) for index in range(1, rows.number + 1)]
+    col = [(clingo.Number(index),) for index in range(1, cols.number + 1)]
+    return {"row": row, "col": col, "grid": [(r, c) for r, in row for c, in col]}
@@ -131,6 +131,19 @@ class SymbolicAtom:
         ])
         return SymbolicAtom(value, None, key=SymbolicAtom.__key)
 
+    @staticmethod
+    def of_wire_format(wire_format: tuple[str, bool]) -> "SymbolicAtom":
+        string, parsed = wire_format
+        res = SymbolicAtom.parse(string)
+        return res if parsed else SymbolicAtom(res.__value, None, key=SymbolicAtom.__key)
+
+    @property
+    def wire_format(self) -> tuple[str, bool]:
+        return str(self), self.__parsed_string is not None
+
+    def __reduce__(self):
+        return SymbolicAtom.of_wire_format, (self.wire_format,)
+
     def __str__(self):
         return self.__parsed_string or str(self.__value)
 
@@ -160,8 +173,13 @@ class SymbolicAtom:
         return self.value.negative
 
     def match(self, *pattern: "SymbolicAtom") -> bool:
-        for a_pattern in pattern:
-            if self.predicate == a_pattern.predicate and \
-                    all(argument.match(a_pattern.arguments[index]) for index, argument in enumerate(self.arguments)):
-                return True
-        return False
+        return any(a_pattern.match_value(self.__value) for a_pattern in pattern)
+
+    def match_value(self, value: clingo.ast.AST) -> bool:
+        """
+        Whether the atom given as an AST node (a function) matches this atom, seen as a pattern.
+        """
+        return value.ast_type == clingo.ast.ASTType.Function and value.name == self.__value.name and \
+            len(value.arguments) == len(self.__value.arguments) and \
+            all(SymbolicTerm.match_values(argument, self.__value.arguments[index])
+                for index, argument in enumerate(value.arguments))
@@ -0,0 +1,87 @@
+import dataclasses
+import time
+from typing import Optional
+
+import typeguard
+from dumbo_utils.validation import validate
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class ExpansionEstimate:
+    """
+    Predicted size of an expansion: rules produced, ground instances of rules, and characters of the produced rules.
+    """
+    rules: int = 0
+    instances: int = 0
+    bytes: int = 0
+
+    def __add__(self, other: "ExpansionEstimate") -> "ExpansionEstimate":
+        return ExpansionEstimate(
+            rules=self.rules + other.rules,
+            instances=self.instances + other.instances,
+            bytes=self.bytes + other.bytes,
+        )
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class ExpansionBudget:
+    """
+    Limits on rules, ground instances, bytes and wall time (since creation), shared by the expansions using it.
+
+    Expansions reserve the estimated size of each step before performing it, and charge the actual size after it, so
+    that a bad input is stopped before exhausting memory. Limits set to None are not checked.
+    """
+    rules: Optional[int] = None
+    instances: Optional[int] = None
+    bytes: Optional[int] = None
+    seconds: Optional[float] = None
+    __usage: dict[str, int] = dataclasses.field(
+        default_factory=lambda: {"rules": 0, "instances": 0, "bytes": 0}, init=False, repr=False, compare=False,
+    )
+    __start: float = dataclasses.field(default_factory=time.monotonic, init=False, repr=False, compare=False)
+
+    class ExceededError(ValueError):
+        def __init__(self, *args):
+            super().__init__("expansion budget exceeded", *args)
+
+    def __post_init__(self):
+        for limit in ("rules", "instances", "bytes", "seconds"):
+            if getattr(self, limit) is not None:
+                validate(limit, getattr(self, limit), min_value=0)
+
+    @property
+    def usage(self) -> dict[str, int | float]:
+        return {**self.__usage, "seconds": time.monotonic() - self.__start}
+
+    def report(self, reason: str = "", estimate: Optional[ExpansionEstimate] = None) -> str:
+        usage = self.usage
+        lines = [reason] if reason else []
+        for resource in ("rules", "instances", "bytes", "seconds"):
+            limit = getattr(self, resource)
+            line = f"{resource}: {usage[resource]:.3f}" if resource == "seconds" else f"{resource}: {usage[resource]}"
+            if estimate is not None and resource != "seconds" and getattr(estimate, resource):
+                line += f" + {getattr(estimate, resource)} (estimated)"
+            lines.append(line + ("" if limit is None else f" of {limit}"))
+        return '\n'.join(lines)
+
+    def reserve(self, estimate: ExpansionEstimate, reason: str = "") -> None:
+        """
+        Raise an ExceededError if the estimated size of the next step does not fit the remaining budget.
+        """
+        usage = self.usage
+        if any(getattr(self, resource) is not None and
+               usage[resource] + getattr(estimate, resource) > getattr(self, resource)
+               for resource in ("rules", "instances", "bytes")) or \
+                (self.seconds is not None and usage["seconds"] > self.seconds):
+            raise ExpansionBudget.ExceededError(self.report(reason, estimate))
+
+    def charge(self, actual: ExpansionEstimate, reason: str = "") -> None:
+        """
+        Account for the actual size of a step, and raise an ExceededError if the budget is exceeded.
+        """
+        self.__usage["rules"] += actual.rules
+        self.__usage["instances"] += actual.instances
+        self.__usage["bytes"] += actual.bytes
+        self.reserve(ExpansionEstimate(), reason)
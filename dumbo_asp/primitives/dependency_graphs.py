@@ -0,0 +1,164 @@
+import dataclasses
+from collections import deque
+from dataclasses import InitVar
+from functools import cached_property
+from typing import Iterable
+
+import igraph
+import typeguard
+from dumbo_utils.primitives import PrivateKey
+from dumbo_utils.validation import validate
+
+from dumbo_asp.primitives.predicates import Predicate
+from dumbo_asp.primitives.rules import SymbolicRule
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class DependencyGraph:
+    """
+    Predicate dependency graph: an edge (p, q) means that q is defined by a rule using p.
+
+    Edges are positive or negative according to the body literal. Choice rules are read as p :- not not p, hence
+    inducing a choice self-loop on their head predicates; disjunctive rules are shifted, hence inducing negative edges
+    among their head predicates.
+    """
+    __predicates: tuple[Predicate, ...]
+    __positive_edges: frozenset[tuple[int, int]]
+    __negative_edges: frozenset[tuple[int, int]]
+    __choice_edges: frozenset[tuple[int, int]]
+
+    key: InitVar[PrivateKey]
+    __key = PrivateKey()
+
+    def __post_init__(self, key: PrivateKey):
+        self.__key.validate(key)
+
+    @staticmethod
+    def of(rules: Iterable[SymbolicRule]) -> "DependencyGraph":
+        index = {}
+        positive_edges, negative_edges, choice_edges = set(), set(), set()
+
+        def vertex(predicate: Predicate) -> int:
+            if predicate not in index:
+                index[predicate] = len(index)
+            return index[predicate]
+
+        for rule in rules:
+            head, positive, negative = rule.predicates_by_position
+            head = [vertex(predicate) for predicate in head]
+            positive = [vertex(predicate) for predicate in positive]
+            negative = [vertex(predicate) for predicate in negative]
+            for target in head:
+                positive_edges.update((source, target) for source in positive)
+                negative_edges.update((source, target) for source in negative)
+                if rule.is_choice_rule:
+                    choice_edges.add((target, target))
+                elif rule.is_disjunctive_rule:
+                    negative_edges.update((source, target) for source in head if source != target)
+
+        return DependencyGraph(
+            tuple(index.keys()),
+            frozenset(positive_edges),
+            frozenset(negative_edges),
+            frozenset(choice_edges),
+            key=DependencyGraph.__key,
+        )
+
+    @property
+    def predicates(self) -> tuple[Predicate, ...]:
+        return self.__predicates
+
+    @cached_property
+    def positive_edges(self) -> frozenset[tuple[Predicate, Predicate]]:
+        return self.__edges_as_predicates(self.__positive_edges)
+
+    @cached_property
+    def negative_edges(self) -> frozenset[tuple[Predicate, Predicate]]:
+        return self.__edges_as_predicates(self.__negative_edges)
+
+    @cached_property
+    def choice_edges(self) -> frozenset[tuple[Predicate, Predicate]]:
+        return self.__edges_as_predicates(self.__choice_edges)
+
+    def __edges_as_predicates(self, edges: frozenset[tuple[int, int]]) -> frozenset[tuple[Predicate, Predicate]]:
+        return frozenset((self.__predicates[source], self.__predicates[target]) for source, target in edges)
+
+    @cached_property
+    def __index(self) -> dict[Predicate, int]:
+        return {predicate: index for index, predicate in enumerate(self.__predicates)}
+
+    @cached_property
+    def __graph(self) -> igraph.Graph:
+        return igraph.Graph(
+            n=len(self.__predicates),
+            edges=list(self.__positive_edges | self.__negative_edges | self.__choice_edges),
+            directed=True,
+        )
+
+    @cached_property
+    def __membership(self) -> tuple[int, ...]:
+        return tuple(self.__graph.connected_components(mode="strong").membership)
+
+    @cached_property
+    def strongly_connected_components(self) -> tuple[tuple[Predicate, ...], ...]:
+        """
+        Strongly connected components in topological order, so that each component comes after the components
+        it depends on.
+        """
+        components = self.__graph.connected_components(mode="strong")
+        condensation = components.cluster_graph(combine_edges=False)
+        condensation.simplify()
+        return tuple(
+            tuple(self.__predicates[vertex] for vertex in components[component])
+            for component in condensation.topological_sorting(mode="out")
+        )
+
+    def component_of(self, predicate: Predicate) -> tuple[Predicate, ...]:
+        validate("predicate", predicate in self.__index, equals=True, help_msg=f"Unknown predicate {predicate}")
+        component = self.__membership[self.__index[predicate]]
+        return tuple(self.__predicates[vertex] for vertex, member in enumerate(self.__membership)
+                     if member == component)
+
+    def __has_edge_within_a_component(self, edges: Iterable[tuple[int, int]]) -> bool:
+        return any(self.__membership[source] == self.__membership[target] for source, target in edges)
+
+    @cached_property
+    def is_stratified(self) -> bool:
+        return not self.__has_edge_within_a_component(self.__negative_edges) and \
+            not self.__has_edge_within_a_component(self.__choice_edges)
+
+    @cached_property
+    def is_tight(self) -> bool:
+        return not self.__has_edge_within_a_component(self.__positive_edges)
+
+    @cached_property
+    def unstratified_predicates(self) -> frozenset[Predicate]:
+        """
+        Predicates in components having a negative or choice edge inside.
+        """
+        components = set(self.__membership[source] for source, target in self.__negative_edges | self.__choice_edges
+                         if self.__membership[source] == self.__membership[target])
+        return frozenset(self.__predicates[vertex] for vertex, component in enumerate(self.__membership)
+                         if component in components)
+
+    def dependencies(self, *predicates: Predicate) -> frozenset[Predicate]:
+        """
+        Predicates the given predicates depend on (the given predicates included), that is, predicates reaching the
+        given predicates in the graph. Predicates without arity match any arity; unknown predicates are ignored.
+        """
+        sources = [index for predicate in predicates for index in self.__indices_of(predicate)]
+        reached = set(sources)
+        queue = deque(sources)
+        adjacency = self.__graph.get_adjlist(mode="in")
+        while queue:
+            for vertex in adjacency[queue.popleft()]:
+                if vertex not in reached:
+                    reached.add(vertex)
+                    queue.append(vertex)
+        return frozenset(self.__predicates[vertex] for vertex in reached)
+
+    def __indices_of(self, predicate: Predicate) -> list[int]:
+        if predicate.arity is not None:
+            return [self.__index[predicate]] if predicate in self.__index else []
+        return [index for index, candidate in enumerate(self.__predicates) if candidate.name == predicate.name]
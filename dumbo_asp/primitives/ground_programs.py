@@ -0,0 +1,163 @@
+from typing import Sequence, TextIO
+
+import clingo
+from dumbo_utils.validation import validate
+
+
+class AspifWriter(clingo.Observer):
+    """
+    Write the ground program received from clingo in the aspif format.
+    """
+
+    def __init__(self, output: TextIO):
+        self.__output = output
+        self.__output.write("asp 1 0 0\n")
+
+    @staticmethod
+    def __literals(literals: Sequence[int]) -> str:
+        return ' '.join(str(literal) for literal in (len(literals), *literals))
+
+    @staticmethod
+    def __weighted_literals(literals: Sequence[tuple[int, int]]) -> str:
+        return ' '.join(str(element) for element in (len(literals), *(x for pair in literals for x in pair)))
+
+    def rule(self, choice: bool, head: Sequence[int], body: Sequence[int]) -> None:
+        self.__output.write(f"1 {int(choice)} {self.__literals(head)} 0 {self.__literals(body)}\n")
+
+    def weight_rule(self, choice: bool, head: Sequence[int], lower_bound: int,
+                    body: Sequence[tuple[int, int]]) -> None:
+        self.__output.write(
+            f"1 {int(choice)} {self.__literals(head)} 1 {lower_bound} {self.__weighted_literals(body)}\n"
+        )
+
+    def minimize(self, priority: int, literals: Sequence[tuple[int, int]]) -> None:
+        self.__output.write(f"2 {priority} {self.__weighted_literals(literals)}\n")
+
+    def output_atom(self, symbol: clingo.Symbol, atom: int) -> None:
+        name = str(symbol)
+        self.__output.write(f"4 {len(name.encode())} {name} {self.__literals([atom] if atom else [])}\n")
+
+    def output_term(self, symbol: clingo.Symbol, condition: Sequence[int]) -> None:
+        name = str(symbol)
+        self.__output.write(f"4 {len(name.encode())} {name} {self.__literals(condition)}\n")
+
+    def external(self, atom: int, value: clingo.TruthValue) -> None:
+        self.__output.write(f"5 {atom} {int(value)}\n")
+
+    def assume(self, literals: Sequence[int]) -> None:
+        self.__output.write(f"6 {self.__literals(literals)}\n")
+
+    def heuristic(self, atom: int, type_: clingo.HeuristicType, bias: int, priority: int,
+                  condition: Sequence[int]) -> None:
+        self.__output.write(f"7 {int(type_)} {atom} {bias} {priority} {self.__literals(condition)}\n")
+
+    def acyc_edge(self, node_u: int, node_v: int, condition: Sequence[int]) -> None:
+        self.__output.write(f"8 {node_u} {node_v} {self.__literals(condition)}\n")
+
+    def theory_atom(self, *args) -> None:
+        validate("theory atoms", True, equals=False, help_msg="Theory atoms are not supported")
+
+    def theory_atom_with_guard(self, *args) -> None:
+        validate("theory atoms", True, equals=False, help_msg="Theory atoms are not supported")
+
+    def close(self) -> None:
+        self.__output.write("0\n")
+
+
+class _AuxiliaryAtom(int):
+    pass
+
+
+class SmodelsWriter(clingo.Observer):
+    """
+    Write the ground program received from clingo in the smodels (lparse) format.
+
+    Atom 1 is reserved for false (heads of constraints), so clingo atoms are shifted by one. Weight rules with choice
+    or disjunctive heads are split by means of auxiliary atoms, free externals are written as choices, and the
+    priorities of minimize statements are dropped. Statements are buffered until close(), as auxiliary atoms are
+    numbered after the atoms of clingo.
+    """
+
+    def __init__(self, output: TextIO):
+        self.__output = output
+        self.__statements = []
+        self.__symbols = []
+        self.__max_atom = 1
+        self.__auxiliary_atoms = 0
+
+    def __atom(self, atom: int) -> int:
+        res = atom + 1
+        self.__max_atom = max(self.__max_atom, res)
+        return res
+
+    def __auxiliary_atom(self) -> int:
+        self.__auxiliary_atoms += 1
+        return _AuxiliaryAtom(self.__auxiliary_atoms)
+
+    def __body(self, literals: Sequence[int]) -> list[int]:
+        negative = [self.__atom(-literal) for literal in literals if literal < 0]
+        positive = [self.__atom(literal) for literal in literals if literal > 0]
+        return [len(literals), len(negative), *negative, *positive]
+
+    def __weighted_body(self, literals: Sequence[tuple[int, int]]) -> list[int]:
+        negative = [(self.__atom(-literal), weight) for literal, weight in literals if literal < 0]
+        positive = [(self.__atom(literal), weight) for literal, weight in literals if literal > 0]
+        return [len(literals), len(negative), *(atom for atom, _ in negative), *(atom for atom, _ in positive),
+                *(weight for _, weight in negative), *(weight for _, weight in positive)]
+
+    def __rule(self, choice: bool, head: list[int], body: list[int]) -> None:
+        if choice:
+            self.__statements.append([3, len(head), *head, *body])
+        elif len(head) > 1:
+            self.__statements.append([8, len(head), *head, *body])
+        else:
+            self.__statements.append([1, head[0] if head else 1, *body])
+
+    def rule(self, choice: bool, head: Sequence[int], body: Sequence[int]) -> None:
+        self.__rule(choice, [self.__atom(atom) for atom in head], self.__body(body))
+
+    def weight_rule(self, choice: bool, head: Sequence[int], lower_bound: int,
+                    body: Sequence[tuple[int, int]]) -> None:
+        if not choice and len(head) == 1:
+            self.__statements.append([5, self.__atom(head[0]), lower_bound, *self.__weighted_body(body)])
+            return
+        auxiliary = self.__auxiliary_atom()
+        self.__statements.append([5, auxiliary, lower_bound, *self.__weighted_body(body)])
+        self.__rule(choice, [self.__atom(atom) for atom in head], [1, 0, auxiliary])
+
+    def minimize(self, priority: int, literals: Sequence[tuple[int, int]]) -> None:
+        self.__statements.append([6, 0, *self.__weighted_body(literals)])
+
+    def output_atom(self, symbol: clingo.Symbol, atom: int) -> None:
+        if atom == 0:
+            atom = self.__auxiliary_atom()
+            self.__statements.append([1, atom, 0, 0])
+        else:
+            atom = self.__atom(atom)
+        self.__symbols.append((atom, str(symbol)))
+
+    def external(self, atom: int, value: clingo.TruthValue) -> None:
+        if value == clingo.TruthValue.Free:
+            self.__statements.append([3, 1, self.__atom(atom), 0, 0])
+        elif value == clingo.TruthValue.True_:
+            self.__statements.append([1, self.__atom(atom), 0, 0])
+
+    def output_term(self, *args) -> None:
+        validate("output terms", True, equals=False, help_msg="Output terms are not supported in smodels")
+
+    def theory_atom(self, *args) -> None:
+        validate("theory atoms", True, equals=False, help_msg="Theory atoms are not supported")
+
+    def theory_atom_with_guard(self, *args) -> None:
+        validate("theory atoms", True, equals=False, help_msg="Theory atoms are not supported")
+
+    def close(self) -> None:
+        def resolve(element: int) -> int:
+            return self.__max_atom + element if type(element) is _AuxiliaryAtom else element
+
+        for statement in self.__statements:
+            self.__output.write(' '.join(str(resolve(element)) for element in statement) + '\n')
+        self.__output.write("0\n")
+        for atom, name in self.__symbols:
+            self.__output.write(f"{resolve(atom)} {name}\n")
+        self.__output.write("0\nB+\n0\nB-\n1\n0\n1\n")
@@ -147,6 +147,23 @@ class Model:
     def __iter__(self):
         return self.value.__iter__()
 
+    @cached_property
+    def predicate_cardinalities(self) -> dict[tuple[str, int], tuple[int, tuple[int, ...]]]:
+        """
+        For each predicate (name and arity), the number of atoms and the number of distinct terms in each position.
+        """
+        res = {}
+        for element in self:
+            if type(element) is GroundAtom:
+                value = element.value
+                entry = res.get((value.name, len(value.arguments)))
+                if entry is None:
+                    entry = res[(value.name, len(value.arguments))] = [0, tuple(set() for _ in value.arguments)]
+                entry[0] += 1
+                for argument, position in zip(value.arguments, entry[1]):
+                    position.add(argument)
+        return {key: (count, tuple(len(position) for position in positions)) for key, (count, positions) in res.items()}
+
     @cached_property
     def contains_only_ground_atoms(self) -> bool:
         return all(type(element) is GroundAtom for element in self)
@@ -245,3 +262,25 @@ class Model:
             atom.symbol.arguments
             for atom in self.__compute_substitutions_control.symbolic_atoms.by_signature(predicate, number_of_arguments)
         )
+
+    def compute_substitutions_in_batch(
+            self, *queries: tuple[str, int, str],
+    ) -> tuple[tuple[list[clingo.Symbol], ...], ...]:
+        """
+        Like compute_substitutions, for several (arguments, number_of_arguments, conjunctive_query) in one ground step.
+        """
+        Model.__compute_substitutions_calls += 1
+        part: Final = f"__query_{COMPUTE_SUBSTITUTION_UUID}_{Model.__compute_substitutions_calls}__"
+        self.__compute_substitutions_control.add(part, [], '\n'.join(
+            f"{part}{index}({arguments}) :- {conjunctive_query}."
+            for index, (arguments, _, conjunctive_query) in enumerate(queries)
+        ))
+        self.__compute_substitutions_control.ground([(part, [])])
+        return tuple(
+            tuple(
+                atom.symbol.arguments
+                for atom in self.__compute_substitutions_control.symbolic_atoms.by_signature(f"{part}{index}",
+                                                                                             number_of_arguments)
+            )
+            for index, (_, number_of_arguments, _) in enumerate(queries)
+        )
@@ -1,9 +1,13 @@
 import base64
 import dataclasses
+import hashlib
+import io
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import InitVar
-from functools import cached_property, cache
-from typing import Optional, Iterable, Dict, List
+from functools import cached_property
+from typing import Optional, Iterable, Dict, List, Final, Sequence, TextIO
 
 import clingo
 import clingo.ast
@@ -12,21 +16,163 @@ from dumbo_utils.primitives import PrivateKey
 from dumbo_utils.validation import validate
 
 from dumbo_asp import utils
+from dumbo_asp.caches import ResultCache
 from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
+from dumbo_asp.primitives.budgets import ExpansionBudget, ExpansionEstimate
+from dumbo_asp.primitives.dependency_graphs import DependencyGraph
+from dumbo_asp.primitives.ground_programs import AspifWriter, SmodelsWriter
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.parsers import Parser
 from dumbo_asp.primitives.predicates import Predicate
-from dumbo_asp.primitives.rules import SymbolicRule
+from dumbo_asp.primitives.rule_sequences import RuleSequence
+from dumbo_asp.primitives.rules import SymbolicRule, SubstitutionPlan
 from dumbo_asp.primitives.terms import SymbolicTerm
 
+PARALLEL_EXPANSION_MIN_RULES_PER_WORKER: Final = 16
+PARALLEL_EXPANSION_SHARDS_PER_WORKER: Final = 4
+
+_expansion_worker_herbrand_base: Optional[Model] = None
+
+
+def _init_expansion_worker(herbrand_base: tuple) -> None:
+    global _expansion_worker_herbrand_base
+    _expansion_worker_herbrand_base = Model.of_elements(herbrand_base, sort=False)
+
+
+def _expand_shard_in_worker(shard: tuple[SymbolicRule, ...]) -> list[tuple[SymbolicRule, ...]]:
+    return [rule.expand_global_and_local_variables(herbrand_base=_expansion_worker_herbrand_base) for rule in shard]
+
+
+def _relaxed_rule(rule: SymbolicRule) -> str:
+    body = rule.body_as_string(drop_negative_literals=True)
+    return '\n'.join(f"{atom} :- {body}." for atom in rule.head_elements)
+
+
+@typeguard.typechecked
+@dataclasses.dataclass
+class IncrementalHerbrandBase:
+    """
+    Herbrand base of a lineage of programs, maintained by a multi-shot clingo.Control.
+
+    The rules of a new version are grounded in a new program part if their head predicates do not occur in the body
+    of already grounded rules (so that the rules grounded so far would not derive new atoms); otherwise, or if some
+    rule was removed, the control is reset and the whole version is grounded from scratch.
+    """
+    __control: Optional[clingo.Control] = dataclasses.field(default=None, init=False, repr=False)
+    __grounded: set[str] = dataclasses.field(default_factory=set, init=False, repr=False)
+    __body_predicates: set[tuple[str, int]] = dataclasses.field(default_factory=set, init=False, repr=False)
+    __steps: int = dataclasses.field(default=0, init=False)
+    __resets: int = dataclasses.field(default=0, init=False)
+
+    @property
+    def steps(self) -> int:
+        return self.__steps
+
+    @property
+    def resets(self) -> int:
+        return self.__resets
+
+    def herbrand_base(self, program: "SymbolicProgram") -> Model:
+        relaxed = {}
+        for rule in program:
+            relaxed.setdefault(_relaxed_rule(rule), rule)
+        new_rules = [rule for string, rule in relaxed.items() if string not in self.__grounded]
+        if self.__control is None or not self.__grounded.issubset(relaxed.keys()) or any(
+                (predicate.name, predicate.arity) in self.__body_predicates
+                for rule in new_rules for predicate in rule.head_predicates
+        ):
+            if self.__control is not None:
+                self.__resets += 1
+            self.__control = clingo.Control()
+            self.__grounded.clear()
+            self.__body_predicates.clear()
+            new_rules = list(relaxed.values())
+        if new_rules:
+            self.__ground(new_rules)
+        return Model.of_atoms(atom.symbol for atom in self.__control.symbolic_atoms)
+
+    def __ground(self, rules: list[SymbolicRule]) -> None:
+        part = f"step_{self.__steps}"
+        self.__steps += 1
+        self.__control.add(part, [], '\n'.join(_relaxed_rule(rule) for rule in rules))
+        self.__control.ground([(part, [])])
+        for rule in rules:
+            self.__grounded.add(_relaxed_rule(rule))
+            _, positive, negative = rule.predicates_by_position
+            self.__body_predicates.update((predicate.name, predicate.arity) for predicate in positive + negative)
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class RuleGroundingProfile:
+    index: int
+    rule: SymbolicRule
+    instances: int
+    head_atoms: int
+    body_literals: int
+    seconds: float
+
+    def __str__(self):
+        return f"{self.seconds:9.4f}s {self.instances:9} instances {self.head_atoms:9} atoms " \
+               f"{self.body_literals:9} literals  #{self.index} {utils.one_line(str(self.rule))}"
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class GroundingProfile:
+    rules: tuple[RuleGroundingProfile, ...]
+    herbrand_base_seconds: float
+
+    @property
+    def total_seconds(self) -> float:
+        return self.herbrand_base_seconds + sum(rule.seconds for rule in self.rules)
+
+    @property
+    def total_instances(self) -> int:
+        return sum(rule.instances for rule in self.rules)
+
+    def report(self, top: Optional[int] = None) -> str:
+        rules = self.rules if top is None else self.rules[:top]
+        return '\n'.join([
+            f"{self.total_seconds:9.4f}s {self.total_instances:9} instances "
+            f"(Herbrand base in {self.herbrand_base_seconds:.4f}s)",
+            *(str(rule) for rule in rules),
+        ])
+
+
+class _GroundingObserver(clingo.Observer):
+    def __init__(self):
+        self.instances = 0
+        self.head_atoms = set()
+        self.body_literals = 0
+
+    def reset(self) -> None:
+        self.instances = 0
+        self.head_atoms = set()
+        self.body_literals = 0
+
+    def rule(self, choice: bool, head: Sequence[int], body: Sequence[int]) -> None:
+        self.instances += 1
+        self.head_atoms.update(head)
+        self.body_literals += len(body)
+
+    def weight_rule(self, choice: bool, head: Sequence[int], lower_bound: int,
+                    body: Sequence[tuple[int, int]]) -> None:
+        self.instances += 1
+        self.head_atoms.update(head)
+        self.body_literals += len(body)
+
 
 @typeguard.typechecked
 @dataclasses.dataclass(frozen=True)
 class SymbolicProgram:
-    __rules: tuple[SymbolicRule, ...]
+    __rules: RuleSequence
     __parsed_string: Optional[str]
 
     key: InitVar[PrivateKey]
+    __herbrand_base_engine: Optional[IncrementalHerbrandBase] = dataclasses.field(default=None, compare=False,
+                                                                                  repr=False)
+    __result_cache: Optional[ResultCache] = dataclasses.field(default=None, compare=False, repr=False)
     __key = PrivateKey()
 
     def __post_init__(self, key: PrivateKey):
@@ -40,14 +186,69 @@ class SymbolicProgram:
                 rules.append(arg)
             else:
                 rules.extend(arg)
-        return SymbolicProgram(tuple(rules), None, key=SymbolicProgram.__key)
+        return SymbolicProgram(RuleSequence.of(rules), None, key=SymbolicProgram.__key)
 
     @staticmethod
     def parse(string: str) -> "SymbolicProgram":
-        rules = tuple(SymbolicRule.parse(utils.extract_parsed_string(string, rule.location))
-                      for rule in Parser.parse_program(string))
+        rules = RuleSequence.of(SymbolicRule.parse(utils.extract_parsed_string(string, rule.location))
+                                for rule in Parser.parse_program(string))
         return SymbolicProgram(rules, string, key=SymbolicProgram.__key)
 
+    @staticmethod
+    def of_wire_format(wire_format: tuple[tuple[tuple, ...], Optional[str]]) -> "SymbolicProgram":
+        rules, parsed_string = wire_format
+        return SymbolicProgram(RuleSequence.of(SymbolicRule.of_wire_format(rule) for rule in rules), parsed_string,
+                               key=SymbolicProgram.__key)
+
+    def wire_format(self, *, with_metadata: bool = True) -> tuple[tuple[tuple, ...], Optional[str]]:
+        return tuple(rule.wire_format(with_metadata=with_metadata) for rule in self.__rules), self.__parsed_string
+
+    def __reduce__(self):
+        return SymbolicProgram.of_wire_format, (self.wire_format(),)
+
+    def __derive(self, *args: SymbolicRule | Iterable[SymbolicRule],
+                 herbrand_base: Optional[Model] = None) -> "SymbolicProgram":
+        return self.__derive_sequence(SymbolicProgram.of(*args).__rules, herbrand_base=herbrand_base)
+
+    def __derive_sequence(self, rules: RuleSequence, *, herbrand_base: Optional[Model] = None) -> "SymbolicProgram":
+        res = SymbolicProgram(rules, None, SymbolicProgram.__key, self.__herbrand_base_engine, self.__result_cache)
+        if herbrand_base is not None:
+            res.__dict__["herbrand_base"] = herbrand_base
+        return res
+
+    def with_incremental_herbrand_base(self) -> "SymbolicProgram":
+        """
+        Attach an IncrementalHerbrandBase to this program; programs derived from the result share it.
+        """
+        return SymbolicProgram(self.__rules, self.__parsed_string, SymbolicProgram.__key, IncrementalHerbrandBase(),
+                               self.__result_cache)
+
+    def with_result_cache(self, cache: Optional[ResultCache]) -> "SymbolicProgram":
+        """
+        Use the given cache for the Herbrand base and for queries on this program and on programs derived from it.
+        """
+        return SymbolicProgram(self.__rules, self.__parsed_string, SymbolicProgram.__key, self.__herbrand_base_engine,
+                               cache)
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self.__result_cache
+
+    @cached_property
+    def content_hash(self) -> str:
+        """
+        SHA-256 over the content hashes of the rules (cached by rules, hence shared by derived programs).
+        """
+        return hashlib.sha256('\n'.join(rule.content_hash for rule in self.__rules).encode()).hexdigest()
+
+    def extend(self, *args: SymbolicRule | Iterable[SymbolicRule]) -> "SymbolicProgram":
+        return self.__derive(self.__rules, *args)
+
+    def replace(self, rule: SymbolicRule, *replacement: SymbolicRule) -> "SymbolicProgram":
+        return self.__derive_sequence(self.__rules.splice_all({
+            index: replacement for index in self.__rules.positions_of(rule)
+        }))
+
     def __str__(self):
         return '\n'.join(str(rule) for rule in self.__rules) if self.__parsed_string is None else self.__parsed_string
 
@@ -63,25 +264,112 @@ class SymbolicProgram:
 
     @cached_property
     def with_named_anonymous_variables(self) -> "SymbolicProgram":
-        return SymbolicProgram.of(rule.with_named_anonymous_variables for rule in self)
+        return self.__derive(rule.with_named_anonymous_variables for rule in self)
 
     @cached_property
     def herbrand_universe(self) -> set[SymbolicTerm]:
+        return set(SymbolicTerm.of_symbol(symbol) for symbol in self.herbrand_universe_symbols)
+
+    @cached_property
+    def herbrand_universe_symbols(self) -> frozenset[clingo.Symbol]:
         res = set()
+        for symbols in self.herbrand_universe_by_position.values():
+            for position in symbols:
+                res.update(position)
+        return frozenset(res)
 
-        def get_arguments(term):
-            for argument in term.arguments:
-                if argument.type == clingo.SymbolType.Function and argument.arguments:
-                    get_arguments(argument)
-                else:
-                    res.add(SymbolicTerm.parse(str(argument)))
+    @cached_property
+    def herbrand_universe_by_position(self) -> dict[Predicate, tuple[frozenset[clingo.Symbol], ...]]:
+        """
+        Symbols (not functions with arguments) occurring in each argument position of the Herbrand base.
+        """
+        res = {}
+
+        def add(argument, into):
+            if argument.type == clingo.SymbolType.Function and argument.arguments:
+                for sub_argument in argument.arguments:
+                    add(sub_argument, into)
+            else:
+                into.add(argument)
 
         for atom in self.herbrand_base:
-            get_arguments(atom)
-        return res
+            value = atom.value
+            positions = res.get((value.name, len(value.arguments)))
+            if positions is None:
+                positions = res[(value.name, len(value.arguments))] = \
+                    (Predicate.of(value), tuple(set() for _ in value.arguments))
+            for argument, position in zip(value.arguments, positions[1]):
+                add(argument, position)
+        return {
+            predicate: tuple(frozenset(position) for position in positions)
+            for predicate, positions in res.values()
+        }
 
     @cached_property
     def herbrand_base(self) -> Model:
+        if self.__herbrand_base_engine is not None:
+            return self.__herbrand_base_engine.herbrand_base(self)
+        if self.__result_cache is not None:
+            return self.__result_cache.get_or_compute("herbrand_base", ResultCache.key(self.content_hash),
+                                                      self.__compute_herbrand_base)
+        return self.__compute_herbrand_base()
+
+    def grounding_profile(self) -> GroundingProfile:
+        """
+        Ground each (enabled) rule in isolation over the Herbrand base (atoms of its body predicates are given as
+        external atoms to a fresh control), and report the number of ground instances, of head atoms and of body
+        literals produced, and the time spent by each rule.
+        Rules are sorted by decreasing number of instances and of body literals, then by index.
+        """
+        start = time.perf_counter()
+        herbrand_base = self.herbrand_base
+        herbrand_base_seconds = time.perf_counter() - start
+        atoms_by_predicate = defaultdict(list)
+        for atom in herbrand_base:
+            atoms_by_predicate[(atom.predicate_name, atom.predicate_arity)].append(atom)
+
+        res = []
+        for index, rule in enumerate(self.__rules):
+            if rule.disabled:
+                continue
+            _, positive, negative = rule.predicates_by_position
+            control = clingo.Control()
+            observer = _GroundingObserver()
+            control.register_observer(observer)
+            control.add("base", [], '\n'.join(
+                f"#external {atom}." for predicate in set(positive + negative)
+                for atom in atoms_by_predicate[(predicate.name, predicate.arity)]
+            ))
+            control.add("rule", [], str(rule))
+            control.ground([("base", [])])
+            observer.reset()
+            start = time.perf_counter()
+            control.ground([("rule", [])])
+            seconds = time.perf_counter() - start
+            res.append(RuleGroundingProfile(index=index, rule=rule, instances=observer.instances,
+                                            head_atoms=len(observer.head_atoms),
+                                            body_literals=observer.body_literals, seconds=seconds))
+        res.sort(key=lambda profile: (-profile.instances, -profile.body_literals, profile.index))
+        return GroundingProfile(rules=tuple(res), herbrand_base_seconds=herbrand_base_seconds)
+
+    def write_ground_program(self, output: TextIO, *, format: str = "smodels") -> None:
+        """
+        Ground the program in-process and write the ground program in the smodels or aspif format.
+        """
+        validate("format", format, is_in=["smodels", "aspif"])
+        writer = SmodelsWriter(output) if format == "smodels" else AspifWriter(output)
+        control = clingo.Control()
+        control.register_observer(writer)
+        control.add(str(self))
+        control.ground([("base", [])])
+        writer.close()
+
+    def ground_program(self, *, format: str = "smodels") -> str:
+        output = io.StringIO()
+        self.write_ground_program(output, format=format)
+        return output.getvalue()
+
+    def __compute_herbrand_base(self) -> Model:
         control = clingo.Control()
         control.add(
             '\n'.join(f"{atom} :- {rule.body_as_string(drop_negative_literals=True)}."
@@ -125,29 +413,37 @@ class SymbolicProgram:
             res.update(rule.predicates)
         return tuple(res)
 
-    @cache
+    @utils.weak_memoize()
     def process_constants(self) -> "SymbolicProgram":
-        rules = []
-        constants = {}
-        for rule in self:
-            if rule.is_fact:
-                head_atom = rule.head_atom
-                if head_atom.predicate_name == "__const__":
-                    validate("arity", head_atom.predicate_arity, equals=2, help_msg="Error in defining constant")
-                    name, value = head_atom.arguments
-                    constants[str(name)] = value
-                    rules.append(rule.disable())
-                    continue
-            rules.append(rule.apply_term_substitution(**constants))
-
-        return SymbolicProgram.of(rules)
+        return self.__process_directives(constants=True, with_statements=False)
 
-    @cache
+    @utils.weak_memoize()
     def process_with_statements(self) -> "SymbolicProgram":
+        return self.__process_directives(constants=False, with_statements=True)
+
+    @utils.weak_memoize()
+    def process_directives(self) -> "SymbolicProgram":
+        """
+        Process __const__ and __with__/__end_with__ directives in a single pass over the rules.
+        """
+        return self.__process_directives(constants=True, with_statements=True)
+
+    def __process_directives(self, *, constants: bool, with_statements: bool) -> "SymbolicProgram":
         rules = []
+        defined_constants = {}
+        plan = SubstitutionPlan.of()
         statements_queue = []
         for rule in self:
-            if rule.is_fact:
+            if constants and rule.is_fact and rule.head_atom.predicate_name == "__const__":
+                head_atom = rule.head_atom
+                validate("arity", head_atom.predicate_arity, equals=2, help_msg="Error in defining constant")
+                name, value = head_atom.arguments
+                defined_constants[str(name)] = value
+                plan = SubstitutionPlan.of(terms=defined_constants)
+                rules.append(rule.disable())
+                continue
+            rule = plan.apply(rule)
+            if with_statements and rule.is_fact:
                 head_atom = rule.head_atom
                 if head_atom.predicate_name == "__with__":
                     statements_queue.append(tuple(SymbolicAtom.parse(str(argument))
@@ -159,30 +455,72 @@ class SymbolicProgram:
                     statements_queue.pop()
                     rules.append(rule.disable())
                     continue
-            for statement in statements_queue:
-                for literal in statement:
-                    rule = rule.with_extended_body(literal)
+            if statements_queue:
+                rule = rule.with_extended_body_atoms(literal for statement in statements_queue for literal in statement)
             rules.append(rule)
         validate("all __with__ are terminated", statements_queue, length=0,
                  help_msg=f"{len(statements_queue)} unterminated __with__ statements")
 
-        return SymbolicProgram.of(rules)
+        return self.__derive(rules)
+
+    @cached_property
+    def dependency_graph(self) -> DependencyGraph:
+        return DependencyGraph.of(rule for rule in self if not rule.disabled)
+
+    def slice(self, *relevant: Predicate | GroundAtom | SymbolicAtom) -> "SymbolicProgram":
+        """
+        Keep the rules defining predicates the relevant predicates (or atoms) depend on.
+        Constraints (and any other rule without head predicates) are kept, together with unstratified components, as
+        they may discard answer sets; the rules they depend on are kept as well.
+        All other rules only define predicates whose interpretation is determined by the kept ones.
+        """
+        graph = self.dependency_graph
+        seeds = set(graph.unstratified_predicates)
+        for element in relevant:
+            seeds.add(element if type(element) is Predicate else element.predicate)
+        for rule in self:
+            if not rule.disabled and not rule.head_predicates:
+                seeds.update(rule.positive_body_predicates)
+                seeds.update(rule.negative_body_predicates)
+        dependencies = graph.dependencies(*seeds)
+        return self.__derive(
+            rule for rule in self
+            if (not rule.disabled and not rule.head_predicates) or
+            any(predicate in dependencies for predicate in rule.head_predicates)
+        )
+
+    @cached_property
+    def __symbol_occurrence_index(self) -> tuple[dict[str, list[int]], dict[str, list[int]], dict[str, list[int]]]:
+        res = (defaultdict(list), defaultdict(list), defaultdict(list))
+        for index, rule in enumerate(self.__rules):
+            for occurrences, index_by_symbol in zip(rule.symbol_occurrences, res):
+                for symbol in occurrences:
+                    index_by_symbol[symbol].append(index)
+        return res
+
+    def apply_substitution_plan(self, plan: SubstitutionPlan) -> "SymbolicProgram":
+        """
+        Apply the plan to the rules mentioning the substituted symbols (according to the symbol-occurrence index);
+        all other rules are shared with this program.
+        """
+        functions, terms, variables = self.__symbol_occurrence_index
+        affected = set()
+        for index_by_symbol, symbols in [(functions, plan.predicates), (terms, plan.terms),
+                                         (variables, plan.variables)]:
+            for symbol in symbols:
+                affected.update(index_by_symbol.get(symbol, ()))
+        if not affected:
+            return self
+        return self.__derive_sequence(self.__rules.splice_all({
+            index: (plan.apply(self.__rules[index]),) for index in affected
+        }))
 
     def apply_predicate_renaming(self, **kwargs: Predicate) -> "SymbolicProgram":
-        return SymbolicProgram.of(rule.apply_predicate_renaming(**kwargs) for rule in self)
+        return self.apply_substitution_plan(SubstitutionPlan.of(predicates=kwargs))
 
     def expand_global_safe_variables(self, *, rule: SymbolicRule, variables: Iterable[str],
                                      herbrand_base: Optional[Model] = None) -> "SymbolicProgram":
-        rules = []
-        for __rule in self.__rules:
-            if rule != __rule:
-                rules.append(__rule)
-            else:
-                rules.extend(__rule.expand_global_safe_variables(
-                    variables=variables,
-                    herbrand_base=self.herbrand_base if herbrand_base is None else herbrand_base
-                ))
-        return SymbolicProgram.of(rules)
+        return self.expand_global_safe_variables_in_rules({rule: variables}, herbrand_base)
 
     def expand_global_safe_variables_in_rules(
             self,
@@ -191,40 +529,154 @@ class SymbolicProgram:
     ) -> "SymbolicProgram":
         if not rules_to_variables:
             return self
-        rules = []
-        for __rule in self.__rules:
-            if __rule in rules_to_variables.keys():
-                rules.extend(__rule.expand_global_safe_variables(
-                    variables=rules_to_variables[__rule],
+        replacements = {}
+        for rule, variables in rules_to_variables.items():
+            positions = self.__rules.positions_of(rule)
+            if positions:
+                expansion = self.__rules[positions[0]].expand_global_safe_variables(
+                    variables=variables,
                     herbrand_base=self.herbrand_base if herbrand_base is None else herbrand_base,
-                ))
-            else:
-                rules.append(__rule)
-        return SymbolicProgram.of(rules)
+                )
+                replacements.update((position, expansion) for position in positions)
+        return self.__derive_sequence(self.__rules.splice_all(replacements),
+                                      herbrand_base=self.herbrand_base if herbrand_base is None else None)
+
+    def estimate_expansion(self, *, expand_also_disabled_rules: bool = False,
+                           herbrand_base: Optional[Model] = None) -> ExpansionEstimate:
+        """
+        Estimate the size of expand_global_and_local_variables, by means of SymbolicRule.estimate_instances.
+        """
+        herbrand_base = self.herbrand_base if herbrand_base is None else herbrand_base
+        res = ExpansionEstimate()
+        for rule in self.__rules:
+            if not rule.disabled or expand_also_disabled_rules:
+                res += self.__estimate_expansion_of(rule, herbrand_base)
+        return res
+
+    @staticmethod
+    def __estimate_expansion_of(rule: SymbolicRule, herbrand_base: Model) -> ExpansionEstimate:
+        instances = rule.estimate_instances(herbrand_base=herbrand_base)
+        return ExpansionEstimate(rules=instances, instances=instances, bytes=instances * len(str(rule)))
+
+    @staticmethod
+    def __actual_expansion_of(rules: Iterable[SymbolicRule]) -> ExpansionEstimate:
+        rules = tuple(rules)
+        return ExpansionEstimate(rules=len(rules), instances=len(rules), bytes=sum(len(str(rule)) for rule in rules))
 
     def expand_global_and_local_variables(self, *, expand_also_disabled_rules: bool = False,
-                                          herbrand_base: Optional[Model] = None) -> "SymbolicProgram":
+                                          herbrand_base: Optional[Model] = None, workers: int = 1,
+                                          budget: Optional[ExpansionBudget] = None) -> "SymbolicProgram":
+        """
+        Expand global and local variables of (enabled) rules with respect to the Herbrand base.
+        With workers > 1, rules are sharded over a process pool (the Herbrand base is shipped once per worker);
+        small programs are expanded serially anyway.
+
+        If a budget is given, the estimated expansion of each rule is reserved before expanding it (of all rules, if
+        expanded in parallel), and the actual expansion is charged after.
+        """
+        validate("workers", workers, min_value=1)
+        to_expand = [index for index, rule in enumerate(self.__rules)
+                     if (not rule.disabled or expand_also_disabled_rules) and
+                     (rule.global_safe_variables or rule.has_conditional_literals)]
+        if not to_expand and all(not rule.head_variables and not rule.body_variables
+                                 for rule in self.__rules if not rule.disabled):
+            return self  # ground rules only, which are safe: no need to compute the Herbrand base
+        inherited_herbrand_base = self.herbrand_base if herbrand_base is None else None
+        herbrand_base = self.herbrand_base if herbrand_base is None else herbrand_base
+        if workers > 1 and len(to_expand) >= workers * PARALLEL_EXPANSION_MIN_RULES_PER_WORKER:
+            if budget is not None:
+                budget.reserve(sum((self.__estimate_expansion_of(self.__rules[index], herbrand_base)
+                                    for index in to_expand), ExpansionEstimate()),
+                               f"expansion of {len(to_expand)} rules")
+            expanded = self.__expand_global_and_local_variables_in_parallel(to_expand, herbrand_base, workers)
+            if budget is not None:
+                budget.charge(self.__actual_expansion_of(rule for rules in expanded.values() for rule in rules),
+                              f"expansion of {len(to_expand)} rules")
+        else:
+            expanded = {}
+            for index in to_expand:
+                rule = self.__rules[index]
+                if budget is not None:
+                    budget.reserve(self.__estimate_expansion_of(rule, herbrand_base), f"expansion of {rule}")
+                expanded[index] = rule.expand_global_and_local_variables(herbrand_base=herbrand_base)
+                if budget is not None:
+                    budget.charge(self.__actual_expansion_of(expanded[index]), f"expansion of {rule}")
         rules = []
-        for rule in self.__rules:
-            if not rule.disabled or expand_also_disabled_rules:
-                rules.extend(
-                    rule.expand_global_and_local_variables(
-                        herbrand_base=self.herbrand_base if herbrand_base is None else herbrand_base
-                    )
-                )
+        for index, rule in enumerate(self.__rules):
+            if index in expanded:
+                rules.extend(expanded[index])
             else:
                 rules.append(rule)
-        return SymbolicProgram.of(rules)
+        return self.__derive(rules, herbrand_base=inherited_herbrand_base)
+
+    def __expand_global_and_local_variables_in_parallel(
+            self, indices: list[int], herbrand_base: Model, workers: int,
+    ) -> dict[int, tuple[SymbolicRule, ...]]:
+        shard_size = -(-len(indices) // (workers * PARALLEL_EXPANSION_SHARDS_PER_WORKER))
+        shards = [indices[begin:begin + shard_size] for begin in range(0, len(indices), shard_size)]
+        serialized_herbrand_base = tuple(element.value if type(element) is GroundAtom else element
+                                         for element in herbrand_base)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_expansion_worker,
+                                 initargs=(serialized_herbrand_base,)) as executor:
+            results = executor.map(_expand_shard_in_worker, [
+                tuple(self.__rules[index] for index in shard) for shard in shards
+            ])
+            res = {}
+            for shard, expanded_shard in zip(shards, results):
+                res.update(zip(shard, expanded_shard))
+        return res
+
+    def deduplicate(self) -> "SymbolicProgram":
+        seen = set()
+        rules = []
+        for rule in self.__rules:
+            if rule.canonical_form not in seen:
+                seen.add(rule.canonical_form)
+                rules.append(rule)
+        return self.__derive(rules)
+
+    @cached_property
+    def __predicate_index(self) -> dict[str, dict[int, tuple[list[int], list[int], list[int]]]]:
+        res = defaultdict(lambda: defaultdict(lambda: ([], [], [])))
+        for index, rule in enumerate(self.__rules):
+            for position, predicates in enumerate(rule.predicates_by_position):
+                for predicate in predicates:
+                    res[predicate.name][predicate.arity][position].append(index)
+        return res
+
+    def __indices_of_rules_with(self, predicate: Predicate, positions: Iterable[int]) -> list[int]:
+        res = set()
+        for arity, indices in self.__predicate_index.get(predicate.name, {}).items():
+            if predicate.arity is None or predicate.arity == arity:
+                for position in positions:
+                    res.update(indices[position])
+        return sorted(res)
+
+    def rules_defining(self, predicate: Predicate) -> tuple[SymbolicRule, ...]:
+        return tuple(self.__rules[index] for index in self.__indices_of_rules_with(predicate, [0]))
+
+    def rules_using(self, predicate: Predicate, *, positive: bool = True,
+                    negative: bool = True) -> tuple[SymbolicRule, ...]:
+        positions = ([1] if positive else []) + ([2] if negative else [])
+        return tuple(self.__rules[index] for index in self.__indices_of_rules_with(predicate, positions))
 
     def move_before(self, *pattern: SymbolicAtom) -> "SymbolicProgram":
-        def key(rule: SymbolicRule):
-            return 0 if rule.match(*pattern) else 1
-        return SymbolicProgram.of(sorted([rule for rule in self.__rules], key=key))
+        candidates = set()
+        for a_pattern in pattern:
+            candidates.update(self.__indices_of_rules_with(a_pattern.predicate.drop_arity(), [0, 1, 2]))
+        matched = [index for index in sorted(candidates) if self.__rules[index].match(*pattern)]
+        if not matched:
+            return self.__derive(self.__rules)
+        matched_set = set(matched)
+        return self.__derive(
+            [self.__rules[index] for index in matched],
+            [rule for index, rule in enumerate(self.__rules) if index not in matched_set],
+        )
 
     def to_zero_simplification_version(self, *, extra_atoms: Iterable[GroundAtom] = (), 
                                        compact=False) -> "SymbolicProgram":
         false_predicate = Predicate.false().name
-        return SymbolicProgram.of(
+        return self.__derive(
             [rule.to_zero_simplification_version(compact=compact) for rule in self],
             SymbolicRule.parse('{' + '; '.join(str(atom) for atom in extra_atoms) + f"}} :- {false_predicate}.")
             if extra_atoms else [],
@@ -0,0 +1,278 @@
+from bisect import bisect_left, insort
+from typing import Final, Iterable, Iterator, Optional
+
+from dumbo_utils.validation import validate
+
+from dumbo_asp.primitives.rules import SymbolicRule
+
+RULE_SEQUENCE_BRANCHING: Final = 32
+_INDEX_BITS: Final = 5
+_INDEX_MASK: Final = (1 << _INDEX_BITS) - 1
+_HASH_MASK: Final = (1 << 64) - 1
+
+Label = tuple[int, ...]
+
+
+class _Node:
+    """
+    Node of a RuleSequence. Leaves store rules and their labels; internal nodes store children, the largest label and
+    the cumulative size of each child. Labels increase along the sequence, so that a rule can be located by label.
+    """
+    __slots__ = ("children", "labels", "sizes", "is_leaf")
+
+    def __init__(self, children: tuple, labels: tuple, sizes: Optional[tuple], is_leaf: bool):
+        self.children = children
+        self.labels = labels
+        self.sizes = sizes
+        self.is_leaf = is_leaf
+
+    @staticmethod
+    def leaf(rules: tuple, labels: tuple) -> "_Node":
+        return _Node(rules, labels, None, True)
+
+    @staticmethod
+    def internal(children: tuple) -> "_Node":
+        sizes, size = [], 0
+        for child in children:
+            size += child.size
+            sizes.append(size)
+        return _Node(children, tuple(child.labels[-1] for child in children), tuple(sizes), False)
+
+    @property
+    def size(self) -> int:
+        return len(self.children) if self.is_leaf else self.sizes[-1]
+
+    @property
+    def width(self) -> int:
+        return len(self.children)
+
+    @staticmethod
+    def __chunks(length: int) -> list[tuple[int, int]]:
+        count = -(-length // RULE_SEQUENCE_BRANCHING)
+        return [(length * index // count, length * (index + 1) // count) for index in range(count)]
+
+    @staticmethod
+    def leaves(rules: tuple, labels: tuple) -> list["_Node"]:
+        """
+        Leaves of the given rules, evenly filled (so that each has at least half of the maximum width, if possible).
+        """
+        return [_Node.leaf(rules[begin:end], labels[begin:end]) for begin, end in _Node.__chunks(len(rules))]
+
+    @staticmethod
+    def internals(children: tuple) -> list["_Node"]:
+        return [_Node.internal(children[begin:end]) for begin, end in _Node.__chunks(len(children))]
+
+    @staticmethod
+    def merge(left: "_Node", right: "_Node") -> list["_Node"]:
+        if left.is_leaf:
+            return _Node.leaves(left.children + right.children, left.labels + right.labels)
+        return _Node.internals(left.children + right.children)
+
+    def locate(self, index: int) -> tuple[int, int]:
+        child = bisect_left(self.sizes, index + 1)
+        return child, index - (self.sizes[child - 1] if child else 0)
+
+    def splice(self, index: int, rules: tuple, labels: tuple) -> list["_Node"]:
+        if self.is_leaf:
+            return _Node.leaves(self.children[:index] + rules + self.children[index + 1:],
+                                self.labels[:index] + labels + self.labels[index + 1:])
+        child, offset = self.locate(index)
+        replaced = self.children[child].splice(offset, rules, labels)
+        begin, end = child, child + 1
+        if len(replaced) == 1 and replaced[0].width < RULE_SEQUENCE_BRANCHING // 2 and self.width > 1:
+            if child > 0:
+                begin -= 1
+                replaced = _Node.merge(self.children[child - 1], replaced[0])
+            else:
+                end += 1
+                replaced = _Node.merge(replaced[0], self.children[child + 1])
+        return _Node.internals(self.children[:begin] + tuple(replaced) + self.children[end:])
+
+
+def _index_of(entries: list[tuple[int, SymbolicRule, list[Label]]], shift: int):
+    """
+    Hash trie of the given entries (hash, rule, labels). Internal nodes are dicts from hash slices to nodes, and
+    leaves are pairs (hash, dict from rules to labels).
+    """
+    if not entries:
+        return None
+    if all(entry[0] == entries[0][0] for entry in entries):
+        return entries[0][0], {rule: tuple(labels) for _, rule, labels in entries}
+    slots = {}
+    for entry in entries:
+        slots.setdefault((entry[0] >> shift) & _INDEX_MASK, []).append(entry)
+    return {slot: _index_of(slot_entries, shift + _INDEX_BITS) for slot, slot_entries in slots.items()}
+
+
+def _index_get(node, rule: SymbolicRule) -> tuple[Label, ...]:
+    the_hash, shift = hash(rule) & _HASH_MASK, 0
+    while type(node) is dict:
+        node = node.get((the_hash >> shift) & _INDEX_MASK)
+        shift += _INDEX_BITS
+    if node is None or node[0] != the_hash:
+        return ()
+    return node[1].get(rule, ())
+
+
+def _index_update(node, rule: SymbolicRule, the_hash: int, shift: int, add: Optional[Label], remove: Optional[Label]):
+    """
+    Copy of the given node with a label added to and/or removed from the labels of the given rule.
+    """
+    if type(node) is tuple and node[0] != the_hash:
+        node = {(node[0] >> shift) & _INDEX_MASK: node}
+    if type(node) is dict:
+        slot = (the_hash >> shift) & _INDEX_MASK
+        child = _index_update(node.get(slot), rule, the_hash, shift + _INDEX_BITS, add, remove)
+        res = dict(node)
+        if child is None:
+            res.pop(slot, None)
+        else:
+            res[slot] = child
+        return res or None
+    items = dict(node[1]) if node is not None else {}
+    labels = list(items.get(rule, ()))
+    if remove is not None:
+        labels.remove(remove)
+    if add is not None:
+        insort(labels, add)
+    if labels:
+        items[rule] = tuple(labels)
+    else:
+        items.pop(rule, None)
+    return (the_hash, items) if items else None
+
+
+class RuleSequence:
+    """
+    Persistent sequence of rules, stored in a balanced tree of bounded branching.
+
+    Replacing a rule with any number of rules copies only the path to its leaf (and possibly a sibling, to merge
+    underfull nodes), so that the new sequence shares all other nodes with the previous one.
+
+    Rules are located by equality by means of an index from rules to labels (which increase along the sequence and
+    are stored in the tree). The index is a persistent hash trie built at the first lookup, and maintained by splices
+    of sequences having it; hence, lookups take logarithmic time (per occurrence) after the first one in a lineage.
+    """
+
+    def __init__(self, root: Optional[_Node], index=None, indexed: bool = False):
+        self.__root = root
+        self.__index = index
+        self.__indexed = indexed
+
+    @staticmethod
+    def of(rules: Iterable[SymbolicRule]) -> "RuleSequence":
+        rules = tuple(rules)
+        return RuleSequence(RuleSequence.__build(_Node.leaves(rules, tuple((index,) for index in range(len(rules))))))
+
+    @staticmethod
+    def __build(nodes: list[_Node]) -> Optional[_Node]:
+        while len(nodes) > 1:
+            nodes = _Node.internals(tuple(nodes))
+        root = nodes[0] if nodes else None
+        while root is not None and not root.is_leaf and root.width == 1:
+            root = root.children[0]
+        return root
+
+    def __len__(self) -> int:
+        return 0 if self.__root is None else self.__root.size
+
+    def __leaf_of(self, index: int) -> tuple[_Node, int]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("rule index out of range")
+        node = self.__root
+        while not node.is_leaf:
+            child, index = node.locate(index)
+            node = node.children[child]
+        return node, index
+
+    def __getitem__(self, index: int) -> SymbolicRule:
+        node, offset = self.__leaf_of(index)
+        return node.children[offset]
+
+    def __position_of(self, label: Label) -> int:
+        node, res = self.__root, 0
+        while not node.is_leaf:
+            child = bisect_left(node.labels, label)
+            if child:
+                res += node.sizes[child - 1]
+            node = node.children[child]
+        return res + bisect_left(node.labels, label)
+
+    def __leaves(self) -> Iterator[_Node]:
+        if self.__root is None:
+            return
+        stack = [self.__root]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+    def __iter__(self) -> Iterator[SymbolicRule]:
+        for leaf in self.__leaves():
+            yield from leaf.children
+
+    def __eq__(self, other):
+        if not isinstance(other, RuleSequence):
+            return NotImplemented
+        return self.__root is other.__root or (len(self) == len(other) and all(
+            a is b or a == b for a, b in zip(self, other)
+        ))
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"RuleSequence({list(self)!r})"
+
+    @property
+    def height(self) -> int:
+        res, node = 0, self.__root
+        while node is not None:
+            res += 1
+            node = None if node.is_leaf else node.children[0]
+        return res
+
+    def splice(self, index: int, replacement: Iterable[SymbolicRule]) -> "RuleSequence":
+        """
+        Replace the rule at the given index with the given rules (possibly none).
+        """
+        validate("index", index, min_value=0, max_value=len(self) - 1)
+        replacement = tuple(replacement)
+        leaf, offset = self.__leaf_of(index)
+        rule, label = leaf.children[offset], leaf.labels[offset]
+        labels = (label,) if len(replacement) == 1 else tuple(label + (position,)
+                                                               for position in range(len(replacement)))
+        index_root = self.__index
+        if self.__indexed:
+            index_root = _index_update(index_root, rule, hash(rule) & _HASH_MASK, 0, None, label)
+            for new_rule, new_label in zip(replacement, labels):
+                index_root = _index_update(index_root, new_rule, hash(new_rule) & _HASH_MASK, 0, new_label, None)
+        return RuleSequence(RuleSequence.__build(self.__root.splice(index, replacement, labels)), index_root,
+                            self.__indexed)
+
+    def replace(self, index: int, rule: SymbolicRule) -> "RuleSequence":
+        return self.splice(index, (rule,))
+
+    def splice_all(self, replacements: dict[int, Iterable[SymbolicRule]]) -> "RuleSequence":
+        res = self
+        for index in sorted(replacements.keys(), reverse=True):
+            res = res.splice(index, replacements[index])
+        return res
+
+    def positions_of(self, rule: SymbolicRule) -> list[int]:
+        """
+        Positions of the rules equal to the given rule.
+        """
+        if not self.__indexed:
+            entries = {}
+            for leaf in self.__leaves():
+                for a_rule, label in zip(leaf.children, leaf.labels):
+                    entries.setdefault(a_rule, []).append(label)
+            self.__index = _index_of([(hash(a_rule) & _HASH_MASK, a_rule, labels)
+                                      for a_rule, labels in entries.items()], 0)
+            self.__indexed = True
+        return [self.__position_of(label) for label in _index_get(self.__index, rule)]
@@ -1,6 +1,8 @@
 import base64
 import dataclasses
+import hashlib
 import re
+from collections import defaultdict
 from dataclasses import InitVar
 from functools import cached_property
 from typing import Optional, Iterable, Any, Final, List
@@ -24,21 +26,46 @@ from dumbo_asp.utils import uuid, extract_parsed_string
 ANONYMOUS_VARIABLE_PREFIX: Final = "AnonVar_2837c0c3_fe3d_4b61_95f8_7c756a83c5dd"
 SUBSTITUTE_VARIABLE_PREFIX: Final = "§2837c0c3"
 SUBSTITUTE_VARIABLE_SUFFIX: Final = "§§2837c0c3"
+LOCAL_VARIABLE_SUFFIX: Final = "Local_2837c0c3"
+WIRE_FORMAT_METADATA: Final = ("head_variables", "body_variables", "global_safe_variables", "predicates",
+                                "canonical_form", "symbol_occurrences", "predicates_by_position", "content_hash",
+                                "has_conditional_literals", "canonical_hash")
 
 
 @typeguard.typechecked
 @dataclasses.dataclass(frozen=True)
 class SymbolicRule:
-    __value: clingo.ast.AST
+    __ast: Optional[clingo.ast.AST]
     __parsed_string: Optional[str]
     disabled: bool
+    __source: Optional[str] = dataclasses.field(default=None, init=False, repr=False)
 
     key: InitVar[PrivateKey]
     __key = PrivateKey()
 
     def __post_init__(self, key: PrivateKey):
         self.__key.validate(key)
-        validate("type", self.__value.ast_type, equals=clingo.ast.ASTType.Rule)
+        if self.__ast is not None:
+            validate("type", self.__ast.ast_type, equals=clingo.ast.ASTType.Rule)
+
+    @property
+    def __value(self) -> clingo.ast.AST:
+        if self.__ast is None:
+            object.__setattr__(self, "_SymbolicRule__ast", Parser.parse_program(self.__source)[0])
+        return self.__ast
+
+    def __eq__(self, other):
+        if not isinstance(other, SymbolicRule):
+            return NotImplemented
+        if self.__parsed_string is not None and other.__parsed_string is not None:
+            return (self.__parsed_string, self.disabled) == (other.__parsed_string, other.disabled)
+        return (self.__value, self.__parsed_string, self.disabled) == \
+            (other.__value, other.__parsed_string, other.disabled)
+
+    def __hash__(self):
+        if self.__parsed_string is not None:
+            return hash((self.__parsed_string, self.disabled))
+        return hash((self.__value, self.disabled))
 
     @staticmethod
     def parse(string: str, disabled: bool = False) -> "SymbolicRule":
@@ -52,8 +79,33 @@ class SymbolicRule:
         validate("value", value.ast_type == clingo.ast.ASTType.Rule, equals=True)
         return SymbolicRule(value, None, disabled=disabled, key=SymbolicRule.__key)
 
+    @staticmethod
+    def of_wire_format(wire_format: tuple[str, bool, bool, Optional[dict[str, Any]]]) -> "SymbolicRule":
+        string, parsed, disabled, metadata = wire_format
+        res = SymbolicRule(None, string if parsed else None, disabled=disabled, key=SymbolicRule.__key)
+        object.__setattr__(res, "_SymbolicRule__source", string)  # parsed when the AST is first needed
+        if metadata:
+            for name, value in metadata.items():
+                validate("metadata", name, is_in=WIRE_FORMAT_METADATA)
+                res.__dict__[name] = value
+        return res
+
+    def wire_format(self, *, with_metadata: bool = True) -> tuple[str, bool, bool, Optional[dict[str, Any]]]:
+        """
+        A compact and picklable representation: source text, whether the text is the parsed string, disabled flag,
+        and the structural metadata computed so far (if any, and if requested).
+        """
+        metadata = {name: self.__dict__[name] for name in WIRE_FORMAT_METADATA if name in self.__dict__} \
+            if with_metadata else None
+        return (self.__parsed_string or self.__source or str(self.__value), self.__parsed_string is not None,
+                self.disabled,
+                metadata or None)
+
+    def __reduce__(self):
+        return SymbolicRule.of_wire_format, (self.wire_format(),)
+
     def __str__(self):
-        res = self.__parsed_string or str(self.__value)
+        res = self.__parsed_string or self.__source or str(self.__value)
         return f"%* {res} *%" if self.disabled else res
 
     def transform(self, transformer: clingo.ast.Transformer) -> Any:
@@ -257,6 +309,54 @@ class SymbolicRule:
         Transformer().visit_sequence(self.__value.body)
         return tuple(sorted(res))
 
+    @cached_property
+    def has_conditional_literals(self) -> bool:
+        res = []
+
+        class Transformer(clingo.ast.Transformer):
+            def visit_ConditionalLiteral(self, node):
+                res.append(node)
+                return node
+
+        Transformer().visit(self.__value)
+        return bool(res)
+
+    @cached_property
+    def canonical_form(self) -> str:
+        """
+        The rule as printed by clingo (so, whitespace-insensitive) with variables renamed by first occurrence.
+        Alpha-equivalent rules have the same canonical form.
+        """
+        variables = {}
+
+        class Transformer(clingo.ast.Transformer):
+            def visit_Variable(self, node):
+                if node.name == '_':
+                    return node
+                if node.name not in variables:
+                    variables[node.name] = f"V{len(variables)}"
+                return node.update(name=variables[node.name])
+
+        res = str(Transformer().visit(self.__value))
+        return f"%* {res} *%" if self.disabled else res
+
+    @cached_property
+    def canonical_hash(self) -> int:
+        """
+        Hash of the canonical form (from its SHA-256), stable across processes.
+        """
+        return int.from_bytes(hashlib.sha256(self.canonical_form.encode()).digest()[:8], "big")
+
+    @cached_property
+    def content_hash(self) -> str:
+        """
+        SHA-256 of the rule as it is given to clingo, stable across processes.
+        """
+        return hashlib.sha256(str(self).encode()).hexdigest()
+
+    def is_alpha_equivalent(self, other: "SymbolicRule") -> bool:
+        return self.canonical_hash == other.canonical_hash and self.canonical_form == other.canonical_form
+
     @cached_property
     def with_named_anonymous_variables(self) -> "SymbolicRule":
         string = self.__parsed_string or str(self.__value)
@@ -306,14 +406,27 @@ class SymbolicRule:
     def disable(self) -> "SymbolicRule":
         return SymbolicRule(self.__value, self.__parsed_string, True, key=self.__key)
 
+    def enable(self) -> "SymbolicRule":
+        return SymbolicRule(self.__value, self.__parsed_string, False, key=self.__key)
+
     def with_extended_body(self, atom: SymbolicAtom, sign: clingo.ast.Sign = clingo.ast.Sign.NoSign) -> "SymbolicRule":
         literal = f"{atom}" if sign == clingo.ast.Sign.NoSign else \
             f"not {atom}" if sign == clingo.ast.Sign.Negation else \
             f"not not {atom}"
+        return self.__with_extended_body(literal)
+
+    def with_extended_body_atoms(self, atoms: Iterable[SymbolicAtom]) -> "SymbolicRule":
+        """
+        Extend the body with all the given atoms (parsing the resulting rule once).
+        """
+        literals = '; '.join(str(atom) for atom in atoms)
+        return self.__with_extended_body(literals) if literals else self
+
+    def __with_extended_body(self, literal: str) -> "SymbolicRule":
         if self.__parsed_string is None:
-            string = str(self)
+            string = str(self.__value)
             line = 1
-            column = len(string) - 1
+            column = len(string)
         else:
             string = self.__parsed_string
             line = self.__value.location.end.line
@@ -358,34 +471,47 @@ class SymbolicRule:
         )
 
     def apply_variable_substitution(self, **kwargs: SymbolicTerm) -> "SymbolicRule":
-        class Transformer(clingo.ast.Transformer):
-            def visit_Variable(self, node):
-                if str(node) not in kwargs.keys():
-                    return node
-                return kwargs[str(node)].make_copy_of_value()
-
-        return self.of(Transformer().visit(self.__value), self.disabled)
+        return SubstitutionPlan.of(variables=kwargs).apply(self)
 
     def apply_term_substitution(self, **kwargs: SymbolicTerm) -> "SymbolicRule":
-        class Transformer(clingo.ast.Transformer):
-            def visit_SymbolicTerm(self, node):
-                if str(node) not in kwargs.keys():
-                    return node
-                return kwargs[str(node)].make_copy_of_value()
-
-        return self.of(Transformer().visit(self.__value), self.disabled)
+        return SubstitutionPlan.of(terms=kwargs).apply(self)
 
     def apply_predicate_renaming(self, **kwargs: Predicate) -> "SymbolicRule":
+        return SubstitutionPlan.of(predicates=kwargs).apply(self)
+
+    def apply_substitution_plan(self, plan: "SubstitutionPlan") -> "SymbolicRule":
+        if not plan.affects(self):
+            return self
+        return self.of(plan.transform(self.__value), self.disabled)
+
+    @cached_property
+    def predicate_renaming_skeleton(self) -> "PredicateRenamingSkeleton":
+        return PredicateRenamingSkeleton.of(self, str(self.__value))
+
+    @cached_property
+    def symbol_occurrences(self) -> tuple[frozenset[str], frozenset[str], frozenset[str]]:
+        """
+        Function names (with and without arity), symbolic terms and variables occurring in the rule.
+        """
+        functions, terms, variables = set(), set(), set()
+
         class Transformer(clingo.ast.Transformer):
             def visit_Function(self, node):
-                if node.name == '__debug__':
-                    return node.update(**self.visit_children(node))
-                for key in [f"{node.name}/{len(node.arguments)}", node.name]:
-                    if key in kwargs.keys():
-                        return node.update(name=kwargs[key].name)
+                functions.add(node.name)
+                functions.add(f"{node.name}/{len(node.arguments)}")
+                self.visit_children(node)
                 return node
 
-        return self.of(Transformer().visit(self.__value), self.disabled)
+            def visit_SymbolicTerm(self, node):
+                terms.add(str(node))
+                return node
+
+            def visit_Variable(self, node):
+                variables.add(node.name)
+                return node
+
+        Transformer().visit(self.__value)
+        return frozenset(functions), frozenset(terms), frozenset(variables)
 
     def __expand_global_safe_variables(
             self,
@@ -394,18 +520,13 @@ class SymbolicRule:
             herbrand_base: Model,
             expand_also_local_variables=False,
     ) -> tuple["SymbolicRule", ...]:
-        the_variables: Final = set(var for var in variables if var in self.global_safe_variables)
-        validate("variables", set(variables), equals=the_variables)
-        substitutions = herbrand_base.compute_substitutions(
-            arguments=','.join(the_variables),
-            number_of_arguments=len(the_variables),
-            conjunctive_query=self.body_as_string(),
-        ) if the_variables else ([],)
+        the_variables: Final = tuple(sorted(set(var for var in variables if var in self.global_safe_variables)))
+        validate("variables", set(variables), equals=set(the_variables))
 
         class Transformer(clingo.ast.Transformer):
             def __init__(self):
                 super().__init__()
-                self.possibly_has_local_variables = False
+                self.conditional_literals = []
                 self.locations = []
 
             def visit_Variable(self, node):
@@ -416,73 +537,161 @@ class SymbolicRule:
 
             # def visit_BodyAggregateElement(self, node):  NOT SUPPORTED AT THE MOMENT
             def visit_ConditionalLiteral(self, node):
-                self.possibly_has_local_variables = True
+                self.conditional_literals.append(node)
                 self.visit_children(node)
                 return node
 
         transformer = Transformer()
         transformer.visit(self.__value)
+        expand_local_variables: Final = expand_also_local_variables and transformer.conditional_literals
+
+        replacements = transformer.locations
+        if expand_local_variables:
+            spans = [self.__conditional_literal_location(node) for node in transformer.conditional_literals]
+            replacements = [
+                (location, replacement) for location, replacement in replacements
+                if not any(self.__location_within(location, span) for span in spans)
+            ] + [
+                (span, f"{SUBSTITUTE_VARIABLE_PREFIX}#{index}{SUBSTITUTE_VARIABLE_SUFFIX}")
+                for index, span in enumerate(spans)
+            ]
+            replacements.sort(key=lambda replacement: (replacement[0].begin.line, replacement[0].begin.column))
         fmt = self.__parsed_string or str(self.__value)
-        for location, replacement in reversed(transformer.locations):
+        for location, replacement in reversed(replacements):
             fmt = utils.replace_in_parsed_string(fmt, location, replacement)
 
-        pattern = f"{SUBSTITUTE_VARIABLE_PREFIX}({'|'.join(var for var in the_variables)}){SUBSTITUTE_VARIABLE_SUFFIX}"
+        if expand_local_variables:
+            substitutions, local_expansions = self.__compute_local_expansions(
+                the_variables, transformer.conditional_literals, herbrand_base,
+            )
+        else:
+            substitutions = herbrand_base.compute_substitutions(
+                arguments=','.join(the_variables),
+                number_of_arguments=len(the_variables),
+                conjunctive_query=self.body_as_string(),
+            ) if the_variables else ([],)
+            local_expansions = None
+
+        pattern = f"{SUBSTITUTE_VARIABLE_PREFIX}(.+?){SUBSTITUTE_VARIABLE_SUFFIX}"
         var_to_index = {var: index for index, var in enumerate(the_variables)}
 
         def apply(substitution):
-            return re.sub(pattern, lambda m: substitution[var_to_index[m.group(1)]], fmt)
+            key = tuple(substitution)
+            values = [str(s) for s in substitution]
 
-        if expand_also_local_variables and transformer.possibly_has_local_variables:
-            return tuple(
-                SymbolicRule.parse(apply([str(s) for s in substitution]), self.disabled)
-                .__expand_local_variables(herbrand_base=herbrand_base)
-                for substitution in substitutions
-            )
-        else:
-            return tuple(
-                SymbolicRule.parse(apply([str(s) for s in substitution]), self.disabled)
-                for substitution in substitutions
-            )
+            def replace(match):
+                if match.group(1).startswith('#'):
+                    return '; '.join(local_expansions[int(match.group(1)[1:])].get(key, ()))
+                return values[var_to_index[match.group(1)]]
+            return re.sub(pattern, replace, fmt)
 
-    def __expand_local_variables(self, *, herbrand_base: Model) -> "SymbolicRule":
-        class Transformer(clingo.ast.Transformer):
-            def __init__(self):
+        return tuple(SymbolicRule.parse(apply(substitution), self.disabled) for substitution in substitutions)
+
+    @staticmethod
+    def __conditional_literal_location(node) -> Location:
+        return Location(
+            begin=node.location.begin,
+            end=node.condition[-1].location.end if node.condition else node.location.end
+        )
+
+    @staticmethod
+    def __location_within(location: Location, span: Location) -> bool:
+        return (span.begin.line, span.begin.column) <= (location.begin.line, location.begin.column) and \
+            (location.end.line, location.end.column) <= (span.end.line, span.end.column)
+
+    def __compute_local_expansions(
+            self,
+            the_variables: tuple[str, ...],
+            conditional_literals: list[clingo.ast.AST],
+            herbrand_base: Model,
+    ) -> tuple[tuple[list[clingo.Symbol], ...], list[dict[tuple[clingo.Symbol, ...], list[str]]]]:
+        # a single grounding step computes the global substitutions and, keyed by each of them,
+        # the expansion of every conditional literal (local variables are renamed apart)
+        def as_tuple(terms):
+            return f"({','.join(terms)}{',' if len(terms) == 1 else ''})"
+
+        class Renamer(clingo.ast.Transformer):
+            def __init__(self, suffix: str):
                 super().__init__()
-                self.substitutions = []
+                self.suffix = suffix
 
-            # def visit_BodyAggregateElement(self, node):  NOT SUPPORTED AT THE MOMENT
-            def visit_ConditionalLiteral(self, node):
-                substitutions = herbrand_base.compute_substitutions(
-                    arguments=','.join(str(arg) for arg in node.literal.atom.symbol.arguments),
-                    number_of_arguments=len(node.literal.atom.symbol.arguments),
-                    conjunctive_query=f"{', '.join(str(condition) for condition in node.condition)}",
-                )
-                self.substitutions.append(
-                    (
-                        Location(
-                            begin=node.location.begin,
-                            end=node.condition[-1].location.end if node.condition else node.location.end
-                        ),
-                        [
-                            (
-                                "not " if node.literal.sign == clingo.ast.Sign.Negation else
-                                "not not " if node.literal.sign == clingo.ast.Sign.DoubleNegation
-                                else ""
-                            ) +
-                            f"{node.literal.atom.symbol.name}({','.join(str(arg) for arg in arguments)})" if arguments
-                            else f"{node.literal.atom.symbol.name}"
-                            for arguments in substitutions
-                        ]
-                    )
+            def visit_Variable(self, node):
+                if node.name == '_' or node.name in the_variables:
+                    return node
+                return node.update(name=f"{node.name}_{self.suffix}")
+
+        body = self.body_as_string()
+        queries = [(','.join(the_variables), len(the_variables), body)]
+        for index, node in enumerate(conditional_literals):
+            renamer = Renamer(f"{LOCAL_VARIABLE_SUFFIX}_{index}")
+            symbol = renamer.visit(node.literal.atom.symbol)
+            conditions = [str(renamer.visit(condition)) for condition in node.condition]
+            queries.append((
+                f"{as_tuple(the_variables)}, {as_tuple([str(argument) for argument in symbol.arguments])}",
+                2,
+                '; '.join(query for query in [body, *conditions] if query),
+            ))
+        substitutions, *expansions = herbrand_base.compute_substitutions_in_batch(*queries)
+        if not the_variables:
+            substitutions = ([],)
+
+        local_expansions = []
+        for node, expansion in zip(conditional_literals, expansions):
+            sign = "not " if node.literal.sign == clingo.ast.Sign.Negation else \
+                "not not " if node.literal.sign == clingo.ast.Sign.DoubleNegation else ""
+            name = node.literal.atom.symbol.name
+            atoms = defaultdict(list)
+            for instance, arguments in expansion:
+                atoms[tuple(instance.arguments)].append(
+                    sign + (f"{name}({','.join(str(arg) for arg in arguments.arguments)})" if arguments.arguments
+                            else f"{name}")
                 )
-                return node
-
-        transformer = Transformer()
-        transformer.visit(self.__value)
-        rule = self.__parsed_string or str(self.__value)
-        for location, atoms in reversed(transformer.substitutions):
-            rule = utils.replace_in_parsed_string(rule, location, '; '.join(atoms))
-        return SymbolicRule.parse(rule, disabled=self.disabled)
+            local_expansions.append(atoms)
+        return substitutions, local_expansions
+
+    def estimate_instances(self, *, herbrand_base: Model) -> int:
+        """
+        Estimate the number of substitutions of global variables, hence of rules produced by
+        expand_global_and_local_variables, from the cardinalities of predicates in the Herbrand base.
+
+        Positive body atoms are joined in order: each atom multiplies the estimate by the number of instances of its
+        predicate, divided by the number of distinct terms in the positions of constants and of variables bound by
+        previous atoms. Variables bound only by intervals (X = L..U) multiply the estimate by the size of the interval.
+        """
+        if not self.global_safe_variables:
+            return 1
+        cardinalities = herbrand_base.predicate_cardinalities
+        res, bound, intervals = 1.0, set(), {}
+        for literal in self.__value.body:
+            if literal.ast_type != clingo.ast.ASTType.Literal or literal.sign != clingo.ast.Sign.NoSign:
+                continue
+            atom = literal.atom
+            if atom.ast_type == clingo.ast.ASTType.Comparison:
+                if atom.term.ast_type == clingo.ast.ASTType.Variable and len(atom.guards) == 1 and \
+                        atom.guards[0].comparison == ComparisonOperator.Equal and \
+                        atom.guards[0].term.ast_type == clingo.ast.ASTType.Interval:
+                    left, right = atom.guards[0].term.left, atom.guards[0].term.right
+                    if left.ast_type == right.ast_type == clingo.ast.ASTType.SymbolicTerm and \
+                            left.symbol.type == right.symbol.type == clingo.SymbolType.Number:
+                        intervals[atom.term.name] = max(right.symbol.number - left.symbol.number + 1, 0)
+                continue
+            if atom.ast_type != clingo.ast.ASTType.SymbolicAtom or atom.symbol.ast_type != clingo.ast.ASTType.Function:
+                continue
+            arguments = atom.symbol.arguments
+            count, distinct = cardinalities.get((atom.symbol.name, len(arguments)), (0, ()))
+            if count == 0:
+                return 0
+            selected = float(count)
+            for argument, values in zip(arguments, distinct):
+                if argument.ast_type == clingo.ast.ASTType.SymbolicTerm or \
+                        (argument.ast_type == clingo.ast.ASTType.Variable and argument.name in bound):
+                    selected /= values
+            res *= max(selected, 1.0)
+            bound.update(argument.name for argument in arguments if argument.ast_type == clingo.ast.ASTType.Variable)
+        for variable, size in intervals.items():
+            if variable not in bound:
+                res *= size
+        return round(res)
 
     def expand_global_safe_variables(
             self,
@@ -498,10 +707,14 @@ class SymbolicRule:
                                                    expand_also_local_variables=True)
 
     def match(self, *pattern: SymbolicAtom) -> bool:
+        candidates = [a_pattern for a_pattern in pattern
+                      if a_pattern.predicate_name in self.__predicate_names]
+        if not candidates:
+            return False
+
         class Transformer(clingo.ast.Transformer):
             def visit_SymbolicAtom(self, node):
-                atom = SymbolicAtom.of(node.symbol)
-                if atom.match(*pattern):
+                if any(a_pattern.match_value(node.symbol) for a_pattern in candidates):
                     Transformer.matched = True
                 return node
         Transformer.matched = False
@@ -509,6 +722,66 @@ class SymbolicRule:
         Transformer().visit(self.__value)
         return Transformer.matched
 
+    @cached_property
+    def __predicate_names(self) -> frozenset[str]:
+        return frozenset(predicate.name for predicates in self.predicates_by_position for predicate in predicates)
+
+    @cached_property
+    def predicates_by_position(self) -> tuple[tuple[Predicate, ...], tuple[Predicate, ...], tuple[Predicate, ...]]:
+        """
+        Predicates of atoms occurring in the head, in positive body literals and in negative body literals.
+        Atoms in conditions (of conditional literals and aggregates) are considered as body atoms.
+        """
+        head, positive, negative = set(), set(), set()
+
+        class Transformer(clingo.ast.Transformer):
+            def __init__(self):
+                super().__init__()
+                self.target = head
+
+            def visit_Literal(self, node):
+                target = self.target
+                if node.sign != clingo.ast.Sign.NoSign:
+                    self.target = negative
+                self.visit_children(node)
+                self.target = target
+                return node
+
+            def visit_ConditionalLiteral(self, node):
+                self.visit(node.literal)
+                target = self.target
+                self.target = positive
+                self.visit_sequence(node.condition)
+                self.target = target
+                return node
+
+            def visit_SymbolicAtom(self, node):
+                symbol = node.symbol
+                if symbol.ast_type == clingo.ast.ASTType.UnaryOperation:
+                    symbol = symbol.argument
+                if symbol.ast_type == clingo.ast.ASTType.Function:
+                    self.target.add((symbol.name, len(symbol.arguments)))
+                return node
+
+        transformer = Transformer()
+        transformer.visit(self.__value.head)
+        transformer.target = positive
+        transformer.visit_sequence(self.__value.body)
+        return tuple(tuple(Predicate.parse(*predicate) for predicate in sorted(predicates))
+                     for predicates in (head, positive, negative))
+
+    @property
+    def head_predicates(self) -> tuple[Predicate, ...]:
+        return self.predicates_by_position[0]
+
+    @property
+    def positive_body_predicates(self) -> tuple[Predicate, ...]:
+        return self.predicates_by_position[1]
+
+    @property
+    def negative_body_predicates(self) -> tuple[Predicate, ...]:
+        return self.predicates_by_position[2]
+
     def to_zero_simplification_version(self, *, compact=False) -> "SymbolicRule":
         if compact:
             atom = Predicate.false().name
@@ -548,3 +821,163 @@ class SymbolicRule:
         if self.is_constraint:
             return SymbolicRule.parse(f'{atom}\n{self}')
         return SymbolicRule.parse(f'{atom} |\n{self}')
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class SubstitutionPlan:
+    """
+    Predicate renaming, term substitution and variable substitution applied simultaneously in one traversal.
+    Rules not mentioning any of the substituted symbols are returned as they are.
+    """
+    predicates: dict[str, Predicate]
+    terms: dict[str, SymbolicTerm]
+    variables: dict[str, SymbolicTerm]
+
+    key: InitVar[PrivateKey]
+    __key = PrivateKey()
+
+    def __post_init__(self, key: PrivateKey):
+        self.__key.validate(key)
+
+    @staticmethod
+    def of(*, predicates: Optional[dict[str, Predicate]] = None, terms: Optional[dict[str, SymbolicTerm]] = None,
+           variables: Optional[dict[str, SymbolicTerm]] = None) -> "SubstitutionPlan":
+        return SubstitutionPlan(
+            predicates=dict(predicates or {}),
+            terms=dict(terms or {}),
+            variables=dict(variables or {}),
+            key=SubstitutionPlan.__key,
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.predicates and not self.terms and not self.variables
+
+    def affects(self, rule: SymbolicRule) -> bool:
+        functions, terms, variables = rule.symbol_occurrences
+        return not functions.isdisjoint(self.predicates) or not terms.isdisjoint(self.terms) or \
+            not variables.isdisjoint(self.variables)
+
+    def apply(self, rule: SymbolicRule) -> SymbolicRule:
+        return rule.apply_substitution_plan(self)
+
+    def transform(self, value: clingo.ast.AST) -> clingo.ast.AST:
+        return SubstitutionPlan.__Transformer(self).visit(value)
+
+    class __Transformer(clingo.ast.Transformer):
+        def __init__(self, plan: "SubstitutionPlan"):
+            super().__init__()
+            self.plan = plan
+            self.rename = True
+
+        def visit_Function(self, node):
+            if node.name == '__debug__':
+                return node.update(**self.visit_children(node))
+            # only the outermost functions are predicates (arguments of __debug__ are outermost as well)
+            rename = self.rename
+            self.rename = False
+            node = node.update(**self.visit_children(node))
+            self.rename = rename
+            if rename:
+                for key in [f"{node.name}/{len(node.arguments)}", node.name]:
+                    if key in self.plan.predicates:
+                        return node.update(name=self.plan.predicates[key].name)
+            return node
+
+        def visit_SymbolicTerm(self, node):
+            if str(node) not in self.plan.terms:
+                return node
+            return self.plan.terms[str(node)].make_copy_of_value()
+
+        def visit_Variable(self, node):
+            if node.name not in self.plan.variables:
+                return node
+            return self.plan.variables[node.name].make_copy_of_value()
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class PredicateRenamingSkeleton:
+    """
+    The text of a rule split at the names of the predicates that a SubstitutionPlan would rename, so that a predicate
+    renaming is a fill of slots followed by a parse (instead of a traversal of the AST).
+    Rules whose text cannot be split are renamed by a SubstitutionPlan.
+    """
+    rule: SymbolicRule
+    __segments: Optional[tuple[str, ...]]
+    __slots: tuple[tuple[str, str], ...]
+
+    key: InitVar[PrivateKey]
+    __key = PrivateKey()
+
+    def __post_init__(self, key: PrivateKey):
+        self.__key.validate(key)
+
+    @staticmethod
+    def of(rule: SymbolicRule, text: str) -> "PredicateRenamingSkeleton":
+        encoded = text.encode()
+        line_offsets = [0]
+        for line in encoded.split(b'\n'):
+            line_offsets.append(line_offsets[-1] + len(line) + 1)
+        slots = []
+
+        class Transformer(clingo.ast.Transformer):
+            def __init__(self):
+                super().__init__()
+                self.rename = True
+
+            def visit_Function(self, node):
+                if node.name == '__debug__':
+                    self.visit_children(node)
+                    return node
+                if self.rename and node.name:
+                    begin = node.location.begin
+                    offset = line_offsets[begin.line - 1] + begin.column - 1
+                    if encoded[offset:offset + 1] == b'-':
+                        offset += 1
+                    slots.append((offset, node.name, f"{node.name}/{len(node.arguments)}"))
+                rename = self.rename
+                self.rename = False
+                self.visit_children(node)
+                self.rename = rename
+                return node
+
+        Transformer().visit_sequence(Parser.parse_program(text))
+        segments, begin = [], 0
+        for offset, name, _ in sorted(slots):
+            if encoded[offset:offset + len(name.encode())] != name.encode():
+                segments = None
+                break
+            segments.append(encoded[begin:offset].decode())
+            begin = offset + len(name.encode())
+        if segments is not None:
+            segments.append(encoded[begin:].decode())
+        return PredicateRenamingSkeleton(
+            rule,
+            tuple(segments) if segments is not None else None,
+            tuple((name, name_with_arity) for _, name, name_with_arity in sorted(slots)),
+            key=PredicateRenamingSkeleton.__key,
+        )
+
+    @property
+    def slots(self) -> tuple[tuple[str, str], ...]:
+        """
+        Names (without and with arity) of the renamed predicates, in the order they occur in the rule.
+        """
+        return self.__slots
+
+    def fill(self, predicates: dict[str, Predicate]) -> SymbolicRule:
+        """
+        Equivalent to SubstitutionPlan.of(predicates=predicates).apply(self.rule).
+        """
+        if self.__segments is None:
+            return SubstitutionPlan.of(predicates=predicates).apply(self.rule)
+        if self.rule.symbol_occurrences[0].isdisjoint(predicates):
+            return self.rule
+        res = [self.__segments[0]]
+        for (name, name_with_arity), segment in zip(self.__slots, self.__segments[1:]):
+            predicate = predicates.get(name_with_arity, predicates.get(name))
+            res.append(name if predicate is None else predicate.name)
+            res.append(segment)
+        return SymbolicRule.of(Parser.parse_program(''.join(res))[0], self.rule.disabled)
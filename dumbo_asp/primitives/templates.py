@@ -1,6 +1,13 @@
 import dataclasses
+import hashlib
+import json
+import re
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import InitVar
+from functools import cached_property
 from pathlib import Path
+from typing import Final, Iterable, Iterator, Optional
 
 import clingo
 import clingo.ast
@@ -10,9 +17,23 @@ from dumbo_utils.primitives import PrivateKey
 from dumbo_utils.validation import validate
 
 from dumbo_asp import utils
+from dumbo_asp.caches import ResultCache
+from dumbo_asp.primitives.accelerators import ACCELERATORS
 from dumbo_asp.primitives.predicates import Predicate
 from dumbo_asp.primitives.atoms import SymbolicAtom
+from dumbo_asp.primitives.budgets import ExpansionBudget, ExpansionEstimate
 from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.rules import PredicateRenamingSkeleton, SymbolicRule
+
+CORE_TEMPLATES_ARTIFACT_VERSION: Final = "4"
+FAIL_IF_DEBUG_MESSAGES_MARKER: Final = "__fail_if_debug_messages__"
+FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS: Final = tuple(
+    f":- __debug__({','.join('X' + str(index) for index in range(arity))})." if arity else ":- __debug__."
+    for arity in range(100)
+)
+TEMPLATE_INSTANTIATIONS_CACHE_SIZE: Final = 1024
+PARALLEL_TEMPLATE_EXPANSION_MIN_APPLICATIONS_PER_WORKER: Final = 16
+PARALLEL_TEMPLATE_EXPANSION_SHARDS_PER_WORKER: Final = 4
 
 
 @typeguard.typechecked
@@ -42,6 +63,9 @@ class Template:
     program: SymbolicProgram
     documentation: str = dataclasses.field(default="")
     __static_uuid: str = dataclasses.field(default_factory=lambda: utils.uuid(), init=False)
+    __instantiations: dict[tuple[tuple[str, str], ...], SymbolicProgram] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False,
+    )
 
     __core_templates = None
     __core_templates_directory = Path(__file__).parent.parent / "templates"
@@ -53,97 +77,381 @@ class Template:
         "grids",
     ]]
 
+    __core_templates_artifact = __core_templates_directory / "core_templates.json"
+    __core_templates_artifact_index: Optional[dict[str, dict[str, str]]] = None
+
+    @staticmethod
+    def __core_templates_sources_hash() -> str:
+        res = hashlib.sha256(CORE_TEMPLATES_ARTIFACT_VERSION.encode())
+        for file in Template.__core_templates_files:
+            res.update(b'\0' + file.encode() + b'\0')
+            res.update((Template.__core_templates_directory / file).read_bytes())
+        return res.hexdigest()
+
+    @staticmethod
+    def __load_core_templates_artifact() -> Optional[dict[str, dict[str, str]]]:
+        try:
+            with open(Template.__core_templates_artifact) as artifact_file:
+                artifact = json.load(artifact_file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(artifact, dict) or artifact.get("sources") != Template.__core_templates_sources_hash():
+            return None
+        return artifact["templates"]
+
     @staticmethod
     def __init_core_templates():
         if Template.__core_templates is not None:
             return
         Template.__core_templates = {}
+        Template.__core_templates_artifact_index = Template.__load_core_templates_artifact()
+        if Template.__core_templates_artifact_index is None:
+            Template.__init_core_templates_from_source()
 
-        def register(template: str, documentation: str = ""):
-            name, program = template.strip().split('\n', maxsplit=1)
-            name = f"@dumbo/{name}"
+    @staticmethod
+    def __init_core_templates_from_source():
+        Template.__core_templates_artifact_index = {}
+        for name in Template.__generated_core_template_names():
             assert name not in Template.__core_templates
-            Template.__core_templates[name] = Template(
-                Template.Name.parse(name),
-                Template.expand_program(SymbolicProgram.parse(program.strip())),
-                documentation,
-            )
+            Template.__core_templates[name] = Template.__generate_core_template(name)
 
-        # def register_all(templates: str, *, sep="----"):
-        #     for template in templates.strip().split(sep):
-        #         if template:
-        #             lines = [line[4:] if index > 0 and len(line) >= 4 else line
-        #                      for index, line in enumerate(template.strip().split('\n'))]
-        #             register('\n'.join(lines))
-
-        register(
-            "fail if debug messages\n:- __debug__." +
-            '\n'.join([f":- __debug__({','.join('X' + str(i) for i in range(arity))})." for arity in range(100)]) +
-            '\n'.join([f"__debug__({','.join(str(i) for i in range(arity))}) :- #false." for arity in range(100)])
-        )
+        for file in Template.__core_templates_files:
+            with open(Template.__core_templates_directory / file) as templates_file:
+                Template.expand_program(SymbolicProgram.parse(templates_file.read()), register_templates=True,
+                                        deterministic=True)
+
+    @staticmethod
+    def __generated_core_template_names() -> list[str]:
+        """
+        Names of the generated core templates that are listed among the core templates (others are generated on
+        demand, for arities up to 99).
+        """
+        res = ["@dumbo/fail if debug messages"]
         for arity in range(10):
+            res.append(f"@dumbo/exact copy (arity {arity})")
+            if arity > 0:
+                res.append(f"@dumbo/debug expected exactly one instance (arity {arity})")
+                res.append(f"@dumbo/debug expected some instances (arity {arity})")
+                res.append(f"@dumbo/collect arguments (arity {arity})")
+                res.extend(f"@dumbo/collect argument {index} of {arity}" for index in range(1, arity + 1))
+        return res
+
+    @staticmethod
+    def __generated_core_template_source(name: str) -> Optional[tuple[str, str]]:
+        if name == "@dumbo/fail if debug messages":
+            return '\n'.join([f"{FAIL_IF_DEBUG_MESSAGES_MARKER}.", *FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS]), \
+                "Fail if `__debug__/*` atoms are derived. When applied by expand_program, the constraints are added " \
+                "at the end of the expansion, for the arities of `__debug__/*` occurring in the expanded program; " \
+                "when instantiated directly, the template contains the constraints for arities up to 99."
+        match = re.fullmatch(r"@dumbo/collect argument ([1-9]\d?) of ([1-9]\d?)", name)
+        if match:
+            index, arity = int(match.group(1)), int(match.group(2))
+            if index > arity:
+                return None
             terms = ','.join('X' + str(i) for i in range(arity))
-            register(f"""
-exact copy (arity {arity})
+            return f"output(X{index - 1}) :- input({terms}).", ""
+        match = re.fullmatch(r"@dumbo/(.+) \(arity (0|[1-9]\d?)\)", name)
+        if not match:
+            return None
+        kind, arity = match.group(1), int(match.group(2))
+        terms = ','.join('X' + str(i) for i in range(arity))
+        if kind == "exact copy":
+            return f"""
 output({terms}) :- input({terms}).
 __debug__("@dumbo/exact copy (arity {arity}): unexpected ", output({terms}), " without ", input({terms})) :- output({terms}), not input({terms}).
-            """, f"Copy `input/{arity}` into `output/{arity}`, and generates `__debug__` atoms if `output/{arity}` is altered outside the template.")
-            if arity > 0:
-                register(f"""
-debug expected exactly one instance (arity {arity})
+            """, f"Copy `input/{arity}` into `output/{arity}`, and generates `__debug__` atoms if `output/{arity}` is altered outside the template."
+        if arity == 0:
+            return None
+        if kind == "debug expected exactly one instance":
+            return f"""
 __debug__("Expecting 1 instance of ", predicate({arity}), ", found ", Count) :- Count = #count{{ {terms} : predicate({terms})}}, Count != 1.
-""", f"Derive __debug__/* atoms if `predicate/{arity}` does not contain exactly one instance.")
-                register(f"""
-debug expected some instances (arity {arity})
+""", f"Derive __debug__/* atoms if `predicate/{arity}` does not contain exactly one instance."
+        if kind == "debug expected some instances":
+            return f"""
 __debug__("Expecting some instance of ", predicate({arity}), ", found none") :- #count{{ {terms} : predicate({terms})}} = 0.
-""", f"Derive __debug__/* atoms if `predicate/{arity}` does not contain some instances.")
-                register(f"collect arguments (arity {arity})\n" +
-                         '\n'.join(f"output(X{index}) :- input({terms})." for index in range(arity)))
-                for other_arity in range(arity):
-                    register(f"collect argument {other_arity + 1} of {arity}\n" +
-                             f"output(X{other_arity}) :- input({terms}).")
+""", f"Derive __debug__/* atoms if `predicate/{arity}` does not contain some instances."
+        if kind == "collect arguments":
+            return '\n'.join(f"output(X{index}) :- input({terms})." for index in range(arity)), ""
+        return None
 
-        for file in Template.__core_templates_files:
-            with open(Template.__core_templates_directory / file) as templates_file:
-                Template.expand_program(SymbolicProgram.parse(templates_file.read()), register_templates=True)
+    @staticmethod
+    def __generate_core_template(name: str) -> Optional["Template"]:
+        source = Template.__generated_core_template_source(name)
+        if source is None:
+            return None
+        program, documentation = source
+        program = SymbolicProgram.parse(program.strip())
+        if name != "@dumbo/fail if debug messages":  # the expansion would consume the marker
+            program = Template.expand_program(program)
+        return Template(Template.Name.parse(name), program, documentation).with_deterministic_static_uuid()
 
     @staticmethod
     def core_template(name: str) -> "Template":
         Template.__init_core_templates()
+        if name not in Template.__core_templates:
+            if name in Template.__core_templates_artifact_index:
+                entry = Template.__core_templates_artifact_index[name]
+                template = Template.of_wire_format((
+                    name, SymbolicProgram.parse(entry["program"]), entry["documentation"], entry["static_uuid"],
+                ))
+            else:
+                template = Template.__generate_core_template(name)
+                validate("core template", template is not None, equals=True, help_msg=f"Unknown core template: {name}")
+            Template.__core_templates[name] = template
         return Template.__core_templates[name]
 
     @staticmethod
     def is_core_template(name: str) -> bool:
         Template.__init_core_templates()
-        return name in Template.__core_templates
+        return name in Template.__core_templates or name in Template.__core_templates_artifact_index or \
+            Template.__generated_core_template_source(name) is not None
 
     @staticmethod
     def core_templates() -> int:
-        Template.__init_core_templates()
-        return len(Template.__core_templates)
+        return len(Template.core_template_names())
 
     @staticmethod
     def core_template_names() -> tuple[str, ...]:
         Template.__init_core_templates()
-        return tuple(Template.__core_templates.keys())
+        return tuple(dict.fromkeys((*Template.__core_templates_artifact_index.keys(),
+                                    *Template.__core_templates.keys())))
 
     @staticmethod
     def core_templates_as_parsable_string() -> str:
-        Template.__init_core_templates()
-        res = []
-        for key, value in Template.__core_templates.items():
-            res.append(str(value))
-        return '\n'.join(res)
+        return '\n'.join(str(Template.core_template(name)) for name in Template.core_template_names())
+
+    @staticmethod
+    def write_core_templates_artifact(path: Optional[Path] = None) -> None:
+        """
+        Build the core templates from source and store them (expanded) in a JSON artifact, which is then loaded
+        lazily by name. The artifact is ignored if the template files or CORE_TEMPLATES_ARTIFACT_VERSION change.
+        """
+        saved = Template.__core_templates, Template.__core_templates_artifact_index
+        try:
+            Template.__core_templates = {}
+            Template.__init_core_templates_from_source()
+            templates = Template.__core_templates
+        finally:
+            Template.__core_templates, Template.__core_templates_artifact_index = saved
+        artifact = {
+            "sources": Template.__core_templates_sources_hash(),
+            "templates": {
+                name: {
+                    "program": str(template.program),
+                    "documentation": template.documentation,
+                    "static_uuid": template.__static_uuid,
+                } for name, template in templates.items()
+            },
+        }
+        with open(path or Template.__core_templates_artifact, "w") as artifact_file:
+            json.dump(artifact, artifact_file, indent=1)
+            artifact_file.write('\n')
 
     @staticmethod
     def expand_program(program: SymbolicProgram, *, limit: int = 100_000, register_templates: bool = False,
-                       trace: bool = False) -> SymbolicProgram:
+                       trace: bool = False, deterministic: bool = False, accelerate: bool = False,
+                       workers: int = 1, library: Optional["TemplateLibrary"] = None,
+                       budget: Optional[ExpansionBudget] = None) -> SymbolicProgram:
+        """
+        Expand the templates in the given program.
+
+        If accelerate is true, top-level applications of core templates having an accelerator are replaced by the
+        facts computed by the accelerator, provided that the input predicates of the application are defined by
+        facts only in the expanded program, and that the output predicates are defined by the application only.
+
+        With workers > 1, top-level applications are instantiated by a process pool (which requires deterministic
+        naming, so that the result is the same of the serial expansion); programs with few applications are
+        expanded serially anyway.
+
+        Templates of the given library can be applied as if they were declared at the beginning of the program.
+
+        If a budget is given, the size of each instantiation is reserved before instantiating the template, and the
+        expanded rules are charged as they are produced (see estimate_expansion for a prediction of the whole size).
+        """
+        validate("workers", workers, min_value=1)
+        validate("deterministic", deterministic or workers == 1, equals=True,
+                 help_msg="Parallel expansion requires deterministic naming.")
+        templates = dict(library.templates) if library is not None else {}
+        pool = _ApplicationsPool(program, workers, templates) if workers > 1 else None
+        try:
+            if not accelerate:
+                return SymbolicProgram.of(Template.__iter_expand(
+                    program, limit=limit, register_templates=register_templates, trace=trace,
+                    deterministic=deterministic, applications=None, pool=pool, templates=templates, budget=budget,
+                ))
+            applications = []
+            rules = list(Template.__iter_expand(program, limit=limit, register_templates=register_templates,
+                                                trace=trace, deterministic=deterministic, applications=applications,
+                                                pool=pool, templates=templates, budget=budget))
+            return SymbolicProgram.of(Template.__accelerate(rules, applications))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    @staticmethod
+    def __accelerate(rules: list[SymbolicRule], applications: list[tuple[str, dict[str, Predicate], int, int]]) \
+            -> list[SymbolicRule]:
+        definitions = defaultdict(dict)
+        for rule in rules:
+            if not rule.disabled:
+                for predicate in rule.head_predicates:
+                    definitions[predicate][id(rule)] = rule
+
+        def mapped(predicate: Predicate, mapping: dict[str, Predicate]) -> Predicate:
+            target = mapping.get(f"{predicate.name}/{predicate.arity}", mapping.get(predicate.name))
+            return Predicate.parse(target.name if target else predicate.name, predicate.arity)
+
+        res, position = [], 0
+        for name, mapping, begin, end in applications:
+            accelerator = ACCELERATORS[name]
+            inputs = {predicate.name: mapped(predicate, mapping) for predicate in accelerator.inputs}
+            facts = [rule for predicate in inputs.values() for rule in definitions[predicate].values()]
+            if not all(rule.is_fact and not rule.head_variables for rule in facts):
+                continue
+            instantiation = set(id(rule) for rule in rules[begin:end])
+            if any(key not in instantiation for predicate in accelerator.outputs
+                   for key in definitions[mapped(predicate, mapping)]):
+                continue  # outputs defined elsewhere are read back by the encoding
+            control = clingo.Control(["--warn=none"])
+            control.add("base", [], '\n'.join(str(rule) for rule in facts))
+            control.ground([("base", [])])
+            outputs = accelerator.evaluate({
+                name: tuple(tuple(atom.symbol.arguments) for atom in control.symbolic_atoms.by_signature(
+                    predicate.name, predicate.arity, True,
+                )) for name, predicate in inputs.items()
+            })
+            if outputs is None:
+                continue
+            validate("outputs", set(outputs.keys()), equals=set(predicate.name for predicate in accelerator.outputs))
+            expanded = SymbolicProgram.parse('\n'.join(
+                f"{mapped(predicate, mapping).name}({','.join(str(argument) for argument in arguments)})."
+                for predicate in accelerator.outputs for arguments in sorted(outputs[predicate.name])
+            ))
+            for rule in rules[begin:end]:
+                for predicate in rule.head_predicates:
+                    definitions[predicate].pop(id(rule), None)
+            for rule in expanded:
+                definitions[rule.head_predicates[0]][id(rule)] = rule
+            res.extend(rules[position:begin])
+            res.extend(expanded)
+            position = end
+        res.extend(rules[position:])
+        return res
+
+    @staticmethod
+    def iter_expand(program: Iterable[SymbolicRule], *, limit: int = 100_000, register_templates: bool = False,
+                    trace: bool = False, deterministic: bool = False, library: Optional["TemplateLibrary"] = None,
+                    budget: Optional[ExpansionBudget] = None) -> Iterator[SymbolicRule]:
+        """
+        Expand the given rules lazily, with the same validation and tracing of expand_program.
+
+        Rules are yielded as soon as they are expanded, so that memory is bounded by the declared templates (and by
+        the largest instantiation) rather than by the expanded program. Errors are raised when the offending rule is
+        reached, possibly after some rules were yielded.
+
+        The constraints of "@dumbo/fail if debug messages" are yielded last, as they depend on the arities of
+        `__debug__/*` in the rules yielded before.
+
+        If deterministic is true, local predicates are named by instantiate_at (with the position of the application
+        as call site), and static predicates of declared templates by their name and content, so that expanding the
+        same program always gives the same rules.
+        """
+        return Template.__iter_expand(program, limit=limit, register_templates=register_templates, trace=trace,
+                                      deterministic=deterministic, applications=None, pool=None,
+                                      templates=dict(library.templates) if library is not None else {},
+                                      budget=budget)
+
+    @staticmethod
+    def estimate_expansion(program: Iterable[SymbolicRule], *, library: Optional["TemplateLibrary"] = None) \
+            -> ExpansionEstimate:
+        """
+        Estimate the size of expand_program without instantiating templates: each application produces the rules of
+        the applied template (declared templates include the instantiations of their nested applications).
+        Unknown templates are ignored, as they make the expansion fail anyway.
+        """
+        sizes = {name: template.__size for name, template in (library.templates if library is not None else {}).items()}
+        res, template_under_read = ExpansionEstimate(), None
+        for rule in program:
+            size = ExpansionEstimate(rules=1, bytes=len(str(rule)))
+            if not rule.disabled and rule.is_normal_rule:
+                predicate_name = rule.head_atom.predicate_name
+                if predicate_name == "__template__":
+                    template_under_read = (_application_template_name(rule), ExpansionEstimate())
+                    continue
+                if predicate_name == "__end__":
+                    if template_under_read is not None and template_under_read[0] is not None:
+                        sizes[template_under_read[0]] = template_under_read[1]
+                    template_under_read = None
+                    continue
+                if predicate_name == "__doc__":
+                    continue
+                if predicate_name == "__apply_template__":
+                    template_name = _application_template_name(rule)
+                    if template_name in sizes:
+                        size = sizes[template_name]
+                    elif template_name is not None and Template.is_core_template(template_name):
+                        size = Template.core_template(template_name).__size
+                    else:
+                        size = ExpansionEstimate()
+            if template_under_read is not None:
+                template_under_read = (template_under_read[0], template_under_read[1] + size)
+            else:
+                res += size
+        return res
+
+    @staticmethod
+    def declare_templates(program: SymbolicProgram, *, templates: Optional[dict[str, "Template"]] = None) \
+            -> dict[str, "Template"]:
+        """
+        The templates declared in the given program, with deterministic naming of static predicates.
+        Declarations can apply core templates and the given templates; rules outside declarations are not allowed.
+        """
+        available = templates or {}
+        res = dict(available)
+        rules = list(Template.__iter_expand(program, limit=100_000, register_templates=False, trace=False,
+                                            deterministic=True, applications=None, pool=None, templates=res,
+                                            budget=None))
+        validate("only declarations", len(rules), equals=0,
+                 help_msg="Template libraries must contain template declarations only.")
+        return {name: template for name, template in res.items() if name not in available}
+
+    @staticmethod
+    def __iter_expand(program: Iterable[SymbolicRule], *, limit: int, register_templates: bool, trace: bool,
+                      deterministic: bool, applications: Optional[list[tuple[str, dict[str, Predicate], int, int]]],
+                      pool: Optional["_ApplicationsPool"], templates: dict[str, "Template"],
+                      budget: Optional[ExpansionBudget]) -> Iterator[SymbolicRule]:
         Template.__init_core_templates()
-        templates = {}
         template_under_read = None
-        res = []
-        for rule in program:
-            validate("avoid blow up", len(res) + (len(template_under_read[1]) if template_under_read else 0),
+        emitted = 0
+        fail_if_debug_messages = False
+        debug_arities = set()
+        # constraints of the instantiation of @dumbo/fail if debug messages following its marker, which are replaced
+        # by the constraints for the arities occurring in the expanded program
+        skipped_constraints = len(FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS)
+
+        def emit(*rules: SymbolicRule) -> Iterator[SymbolicRule]:
+            nonlocal emitted, fail_if_debug_messages, skipped_constraints
+            for the_rule in rules:
+                text = str(the_rule)
+                if text == f"{FAIL_IF_DEBUG_MESSAGES_MARKER}.":
+                    fail_if_debug_messages = True
+                    skipped_constraints = 0
+                    continue
+                if skipped_constraints < len(FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS):
+                    if text == FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS[skipped_constraints]:
+                        skipped_constraints += 1
+                        continue
+                    skipped_constraints = len(FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS)
+                if "__debug__" in text and not the_rule.disabled:
+                    debug_arities.update(predicate.arity for predicate in the_rule.head_predicates
+                                         if predicate.name == "__debug__")
+                emitted += 1
+                if budget is not None:
+                    budget.charge(ExpansionEstimate(rules=1, bytes=len(text)), f"expansion of {text}")
+                yield the_rule
+
+        for index, rule in enumerate(program):
+            validate("avoid blow up", emitted + (len(template_under_read[1]) if template_under_read else 0),
                      max_value=limit,
                      help_msg=f"The expansion takes more than {limit} rules. "
                               f"If you trust the code, try again by increasing the limit.")
@@ -151,7 +459,7 @@ __debug__("Expecting some instance of ", predicate({arity}), ", found none") :-
                 if template_under_read is not None:
                     template_under_read[1].append(rule)
                 else:
-                    res.append(rule)
+                    yield from emit(rule)
             elif rule.head_atom.predicate_name == "__template__":
                 validate("empty body", rule.is_fact, equals=True)
                 validate("arity 1", rule.head_atom.predicate_arity, equals=1)
@@ -169,44 +477,50 @@ __debug__("Expecting some instance of ", predicate({arity}), ", found none") :-
                 the_template = Template(name=Template.Name.parse(template_under_read[0]),
                                         program=SymbolicProgram.of(template_under_read[1]),
                                         documentation='\n'.join(template_under_read[2]))
+                if deterministic:
+                    the_template = the_template.with_deterministic_static_uuid()
                 if register_templates:
                     Template.__core_templates[template_under_read[0]] = the_template
                 else:
                     templates[template_under_read[0]] = the_template
+                if pool is not None:
+                    pool.submit(template_under_read[0], the_template, index)
                 template_under_read = None
             elif rule.head_atom.predicate_name == "__apply_template__":
-                validate("empty body", rule.is_fact, equals=True)
-                validate("arity >= 1", rule.head_atom.predicate_arity, min_value=1)
-                validate("arg#0", rule.head_atom.arguments[0].is_string(), equals=True)
-                template_name = rule.head_atom.arguments[0].string_value()
-                if Template.is_core_template(template_name):
-                    template = Template.core_template(template_name)
+                prefetched = pool.result(index) if pool is not None else None
+                if prefetched is not None:
+                    template_name, mapping, instantiation = prefetched
+                    if budget is not None:
+                        budget.reserve(ExpansionEstimate(rules=len(instantiation)),
+                                       f"application of {template_name} (rule {index})")
                 else:
-                    validate("known template", template_name in templates, equals=True,
-                             help_msg=f"Unknown template: {template_name}")
-                    template = templates[template_name]
-                mapping = {}
-                for argument in rule.head_atom.arguments[1:]:
-                    validate("mapping args", argument.is_function(), equals=True)
-                    validate("mapping args", argument.function_name, equals='')
-                    validate("mapping args", argument.function_arity, equals=2)
-                    validate("mapping args", argument.arguments[0].is_function(), equals=True)
-                    validate("mapping args", argument.arguments[0].function_arity, max_value=1)
-                    validate("mapping args", argument.arguments[1].is_function(), equals=True)
-                    validate("mapping args", argument.arguments[1].function_arity, equals=0)
-                    key = str(argument.arguments[0].function_name)
-                    if argument.arguments[0].function_arity == 1:
-                        validate("mapping args", argument.arguments[0].arguments[0].is_int(), equals=True)
-                        key += "/" + str(argument.arguments[0].arguments[0])
-                    mapping[key] = Predicate.parse(argument.arguments[1].function_name)
+                    validate("empty body", rule.is_fact, equals=True)
+                    validate("arity >= 1", rule.head_atom.predicate_arity, min_value=1)
+                    validate("arg#0", rule.head_atom.arguments[0].is_string(), equals=True)
+                    template_name = rule.head_atom.arguments[0].string_value()
+                    if Template.is_core_template(template_name):
+                        template = Template.core_template(template_name)
+                    else:
+                        validate("known template", template_name in templates, equals=True,
+                                 help_msg=f"Unknown template: {template_name}")
+                        template = templates[template_name]
+                    mapping = _application_mapping(rule)
+                    if budget is not None:
+                        budget.reserve(template.__size, f"application of {template_name} (rule {index})")
+                    instantiation = template.instantiate_at(str(index), **mapping) if deterministic else \
+                        template.instantiate(**mapping)
                 if template_under_read is None:
                     if trace:
-                        res.append(rule.disable())
-                    res.extend(r for r in template.instantiate(**mapping))
+                        yield from emit(rule.disable())
+                    begin = emitted
+                    yield from emit(*instantiation)
+                    if applications is not None and template_name in ACCELERATORS and \
+                            Template.is_core_template(template_name):
+                        applications.append((template_name, mapping, begin, emitted))
                 else:
                     if trace:
                         template_under_read[1].append(rule.disable())
-                    template_under_read[1].extend(r for r in template.instantiate(**mapping))
+                    template_under_read[1].extend(instantiation)
             elif rule.head_atom.predicate_name == "__doc__":
                 validate("empty body", rule.is_fact, equals=True)
                 validate("arg#0", all(argument.is_string() for argument in rule.head_atom.arguments), equals=True)
@@ -218,9 +532,30 @@ __debug__("Expecting some instance of ", predicate({arity}), ", found none") :-
                 if template_under_read is not None:
                     template_under_read[1].append(rule)
                 else:
-                    res.append(rule)
+                    yield from emit(rule)
 
-        return SymbolicProgram.of(res)
+        if fail_if_debug_messages:
+            skipped_constraints = len(FAIL_IF_DEBUG_MESSAGES_CONSTRAINTS)
+            validate("avoid blow up", emitted + len(debug_arities), max_value=limit,
+                     help_msg=f"The expansion takes more than {limit} rules. "
+                              f"If you trust the code, try again by increasing the limit.")
+            yield from emit(*(SymbolicRule.parse(
+                f":- __debug__({','.join('X' + str(index) for index in range(arity))})." if arity else ":- __debug__."
+            ) for arity in sorted(debug_arities)))
+
+    @staticmethod
+    def of_wire_format(wire_format: tuple[str, SymbolicProgram, str, str]) -> "Template":
+        name, program, documentation, static_uuid = wire_format
+        res = Template(name=Template.Name.parse(name), program=program, documentation=documentation)
+        object.__setattr__(res, "_Template__static_uuid", static_uuid)
+        return res
+
+    @property
+    def wire_format(self) -> tuple[str, SymbolicProgram, str, str]:
+        return self.name.value, self.program, self.documentation, self.__static_uuid
+
+    def __reduce__(self):
+        return Template.of_wire_format, (self.wire_format,)
 
     def __str__(self):
         return f"""__template__("{self.name}").\n{self.program}\n__end__."""
@@ -228,21 +563,277 @@ __debug__("Expecting some instance of ", predicate({arity}), ", found none") :-
     def __repr__(self):
         return f"""Template(name="{self.name}", program={self.program})"""
 
+    @cached_property
+    def __compiled(self) -> tuple[tuple[PredicateRenamingSkeleton, ...], dict[str, Predicate], tuple[str, ...]]:
+        """
+        Skeletons of the rules, renaming of static predicates, and names of local predicates.
+        """
+        static_mapping, local_predicates = {}, []
+        for predicate in self.program.predicates:
+            if not predicate.name.endswith('__'):
+                if predicate.name.startswith('__static_'):
+                    static_mapping[predicate.name] = Predicate.parse(f"{predicate.name[1:]}_{self.__static_uuid}")
+                elif predicate.name.startswith('__'):
+                    local_predicates.append(predicate.name)
+        return (
+            tuple(rule.predicate_renaming_skeleton for rule in self.program),
+            static_mapping,
+            tuple(dict.fromkeys(local_predicates)),
+        )
+
+    @cached_property
+    def __size(self) -> ExpansionEstimate:
+        return ExpansionEstimate(rules=len(self.program), bytes=sum(len(str(rule)) for rule in self.program))
+
     def instantiate(self, **kwargs: Predicate) -> SymbolicProgram:
+        """
+        Instantiate the template by filling its skeleton. Local predicates are given fresh names; templates without
+        local predicates are memoized on the external mapping.
+        """
+        return self.__instantiate(kwargs, None)
+
+    def instantiate_at(self, call_site: str, **kwargs: Predicate) -> SymbolicProgram:
+        """
+        Like instantiate, but local predicates are named after the template, the call site and the mapping, so that
+        names are unique among different call sites and stable across runs and processes.
+        """
+        return self.__instantiate(kwargs, call_site)
+
+    def __instantiate(self, kwargs: dict[str, Predicate], call_site: Optional[str]) -> SymbolicProgram:
         Template.__init_core_templates()
         for arg in kwargs:
             validate("kwargs", arg.startswith('__'), equals=False,
                      help_msg="Local (or dunder) predicates cannot be renamed externally.")
-        static_uuid = self.__static_uuid
-        local_uuid = utils.uuid()
-        mapping = {**kwargs}
-        for predicate in self.program.predicates:
-            if not predicate.name.endswith('__'):
-                if predicate.name.startswith('__static_'):
-                    mapping[predicate.name] = Predicate.parse(f"{predicate.name[1:]}_{static_uuid}")
-                elif predicate.name.startswith('__'):
-                    mapping[predicate.name] = Predicate.parse(f"{predicate.name}_{local_uuid}")
-        return self.program.apply_predicate_renaming(**mapping)
+        skeletons, static_mapping, local_predicates = self.__compiled
+        memo_key = None
+        if not local_predicates:
+            memo_key = tuple(sorted((key, predicate.name) for key, predicate in kwargs.items()))
+            if memo_key in self.__instantiations:
+                return self.__instantiations[memo_key]
+        if call_site is None:
+            local_uuid = utils.uuid()
+        else:
+            local_uuid = utils.deterministic_uuid(
+                self.name.value, call_site, *(f"{key}={predicate.name}" for key, predicate in sorted(kwargs.items())),
+            )
+        mapping = {**kwargs, **static_mapping}
+        mapping.update((name, Predicate.parse(f"{name}_{local_uuid}")) for name in local_predicates)
+        res = SymbolicProgram.of(skeleton.fill(mapping) for skeleton in skeletons)
+        if memo_key is not None:
+            if len(self.__instantiations) >= TEMPLATE_INSTANTIATIONS_CACHE_SIZE:
+                del self.__instantiations[next(iter(self.__instantiations))]
+            self.__instantiations[memo_key] = res
+        return res
+
+    def with_deterministic_static_uuid(self) -> "Template":
+        """
+        A copy of the template whose static predicates are named after the name and the program of the template.
+        """
+        return Template.of_wire_format((
+            self.name.value, self.program, self.documentation,
+            utils.deterministic_uuid(self.name.value, str(self.program)),
+        ))
 
     def predicates(self) -> tuple[Predicate, ...]:
         return tuple(predicate for predicate in self.program.predicates if not predicate.name.startswith('__'))
+
+
+@typeguard.typechecked
+@dataclasses.dataclass(frozen=True)
+class TemplateLibrary:
+    """
+    Templates declared in a sequence of files, compiled once and reused by the expansion of many programs.
+
+    Files are loaded in order, and their declarations can apply core templates and templates of previous files. A file
+    is read again when its modification time or size change, and compiled again when its content or the templates it
+    applies change (static predicates are named deterministically, so the static uuid of a template is a fingerprint of
+    its content). If a cache is given, compiled files are also persisted on disk, keyed by content hash.
+    """
+    paths: tuple[Path, ...]
+    cache: Optional[ResultCache] = None
+    __files: dict[Path, tuple[tuple[int, int], str, tuple[tuple[str, Optional[str]], ...], dict[str, Template]]] = \
+        dataclasses.field(default_factory=dict, init=False, repr=False, compare=False)
+    __metrics: dict[str, int] = dataclasses.field(
+        default_factory=lambda: {"reads": 0, "compilations": 0}, init=False, repr=False, compare=False,
+    )
+
+    @staticmethod
+    def of(*paths: Path | str, cache: Optional[ResultCache] = None) -> "TemplateLibrary":
+        return TemplateLibrary(paths=tuple(Path(path) for path in paths), cache=cache)
+
+    @property
+    def metrics(self) -> dict[str, int]:
+        return dict(self.__metrics)
+
+    @property
+    def templates(self) -> dict[str, Template]:
+        """
+        The templates of the library, after reloading the files that changed.
+        """
+        res = {}
+        for path in self.paths:
+            stat = path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            entry = self.__files.get(path)
+            if entry is None or entry[0] != stamp or not self.__up_to_date(entry[2], res):
+                entry = self.__load(path, stamp, entry, res)
+                self.__files[path] = entry
+            for name, template in entry[3].items():
+                validate("unique names", name not in res, equals=True,
+                         help_msg=f"Template {name} is declared twice in the library.")
+                res[name] = template
+        return res
+
+    @staticmethod
+    def __fingerprint(name: str, available: dict[str, Template]) -> Optional[str]:
+        if name in available:
+            return available[name].wire_format[3]
+        if Template.is_core_template(name):
+            return Template.core_template(name).wire_format[3]
+        return None
+
+    @staticmethod
+    def __up_to_date(dependencies: tuple[tuple[str, Optional[str]], ...], available: dict[str, Template]) -> bool:
+        return all(TemplateLibrary.__fingerprint(name, available) == fingerprint for name, fingerprint in dependencies)
+
+    def __load(self, path: Path, stamp: tuple[int, int], entry: Optional[tuple], available: dict[str, Template]) \
+            -> tuple[tuple[int, int], str, tuple[tuple[str, Optional[str]], ...], dict[str, Template]]:
+        content = path.read_text()
+        self.__metrics["reads"] += 1
+        content_hash = hashlib.sha256(content.encode()).hexdigest()
+        if entry is not None and entry[1] == content_hash and self.__up_to_date(entry[2], available):
+            return stamp, content_hash, entry[2], entry[3]
+        key = ResultCache.key(CORE_TEMPLATES_ARTIFACT_VERSION, content_hash)
+        compiled = self.cache.get("template_library", key) if self.cache is not None else None
+        if compiled is None or not self.__up_to_date(compiled[0], available):
+            compiled = self.__compile(content, available)
+            if self.cache is not None:
+                self.cache.put("template_library", key, compiled)
+        return stamp, content_hash, compiled[0], compiled[1]
+
+    def __compile(self, content: str, available: dict[str, Template]) \
+            -> tuple[tuple[tuple[str, Optional[str]], ...], dict[str, Template]]:
+        self.__metrics["compilations"] += 1
+        program = SymbolicProgram.parse(content)
+        templates = Template.declare_templates(program, templates=available)
+        dependencies = sorted(set(
+            rule.head_atom.arguments[0].string_value() for rule in program
+            if not rule.disabled and rule.is_normal_rule and rule.head_atom.predicate_name == "__apply_template__"
+        ))
+        return tuple((name, TemplateLibrary.__fingerprint(name, available)) for name in dependencies), templates
+
+
+def _application_template_name(rule: SymbolicRule) -> Optional[str]:
+    """
+    The name of the template applied (or declared) by the given rule, without parsing its arguments as terms.
+    """
+    try:
+        symbol = clingo.parse_term(str(rule.head_atom))
+    except RuntimeError:
+        return None
+    if symbol.type != clingo.SymbolType.Function or not symbol.arguments or \
+            symbol.arguments[0].type != clingo.SymbolType.String:
+        return None
+    return symbol.arguments[0].string
+
+
+def _application_mapping(rule: SymbolicRule) -> dict[str, Predicate]:
+    """
+    The renaming of predicates given by the arguments (after the name of the template) of an application.
+    """
+    res = {}
+    for argument in rule.head_atom.arguments[1:]:
+        validate("mapping args", argument.is_function(), equals=True)
+        validate("mapping args", argument.function_name, equals='')
+        validate("mapping args", argument.function_arity, equals=2)
+        validate("mapping args", argument.arguments[0].is_function(), equals=True)
+        validate("mapping args", argument.arguments[0].function_arity, max_value=1)
+        validate("mapping args", argument.arguments[1].is_function(), equals=True)
+        validate("mapping args", argument.arguments[1].function_arity, equals=0)
+        key = str(argument.arguments[0].function_name)
+        if argument.arguments[0].function_arity == 1:
+            validate("mapping args", argument.arguments[0].arguments[0].is_int(), equals=True)
+            key += "/" + str(argument.arguments[0].arguments[0])
+        res[key] = Predicate.parse(argument.arguments[1].function_name)
+    return res
+
+
+def _instantiate_applications_in_worker(template: "Template", shard: tuple[tuple[int, SymbolicRule], ...]) \
+        -> list[tuple[dict[str, Predicate], SymbolicProgram]]:
+    res = []
+    for index, rule in shard:
+        mapping = _application_mapping(rule)
+        res.append((mapping, template.instantiate_at(str(index), **mapping)))
+    return res
+
+
+class _ApplicationsPool:
+    """
+    Instantiations of the top-level applications of a program, computed ahead of time by a process pool.
+
+    Applications are dispatched as soon as their template is known: at start for core templates and templates of a
+    library, and when the template is declared otherwise. The serial expansion consumes the results in order, and
+    processes by itself the applications that were not dispatched or whose shard failed (so that errors are raised
+    where they belong).
+    """
+
+    def __init__(self, program: Iterable[SymbolicRule], workers: int, templates: dict[str, "Template"]):
+        self.__workers = workers
+        self.__applications = defaultdict(list)
+        self.__results: dict[int, tuple[str, Future, int]] = {}
+        inside_template = False
+        for index, rule in enumerate(program):
+            if rule.disabled or not rule.is_normal_rule:
+                continue
+            predicate_name = rule.head_atom.predicate_name
+            if predicate_name == "__template__":
+                inside_template = True
+            elif predicate_name == "__end__":
+                inside_template = False
+            elif predicate_name == "__apply_template__" and not inside_template and rule.is_fact:
+                template_name = _application_template_name(rule)
+                if template_name is not None:
+                    self.__applications[template_name].append((index, rule))
+        applications = sum(len(applications) for applications in self.__applications.values())
+        self.__executor = ProcessPoolExecutor(max_workers=workers) \
+            if applications >= workers * PARALLEL_TEMPLATE_EXPANSION_MIN_APPLICATIONS_PER_WORKER else None
+        for template_name in list(self.__applications.keys()):
+            if template_name in templates:
+                self.submit(template_name, templates[template_name], -1)
+            elif Template.is_core_template(template_name):
+                self.submit(template_name, Template.core_template(template_name), -1)
+
+    def shutdown(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+
+    def submit(self, template_name: str, template: "Template", after: int) -> None:
+        """
+        Dispatch the applications of the given template occurring after the given index.
+        """
+        tasks = [task for task in self.__applications.pop(template_name, ()) if task[0] > after]
+        if self.__executor is None or not tasks:
+            return
+        shard_size = -(-len(tasks) // (self.__workers * PARALLEL_TEMPLATE_EXPANSION_SHARDS_PER_WORKER))
+        for begin in range(0, len(tasks), shard_size):
+            shard = tuple(tasks[begin:begin + shard_size])
+            future = self.__executor.submit(_instantiate_applications_in_worker, template, shard)
+            for offset, (index, _) in enumerate(shard):
+                self.__results[index] = (template_name, future, offset)
+
+    def result(self, index: int) -> Optional[tuple[str, dict[str, Predicate], SymbolicProgram]]:
+        """
+        Name of the template, mapping and instantiation of the application at the given index, if dispatched.
+        """
+        if index not in self.__results:
+            return None
+        template_name, future, offset = self.__results.pop(index)
+        try:
+            mapping, instantiation = future.result()[offset]
+        except Exception:
+            return None
+        return template_name, mapping, instantiation
+
+
+if __name__ == "__main__":
+    Template.write_core_templates_artifact()
@@ -54,6 +54,28 @@ class SymbolicTerm:
     def of_string(value: str) -> "SymbolicTerm":
         return SymbolicTerm.parse(f'"{value}"')
 
+    @staticmethod
+    def of_symbol(symbol: clingo.Symbol) -> "SymbolicTerm":
+        if symbol.type == clingo.SymbolType.Function and symbol.arguments:
+            return SymbolicTerm.parse(str(symbol))
+        string = str(symbol)
+        position = clingo.ast.Position("<symbol>", 1, 1)
+        location = clingo.ast.Location(position, clingo.ast.Position("<symbol>", 1, 1 + len(string)))
+        return SymbolicTerm(clingo.ast.SymbolicTerm(location, symbol), string, key=SymbolicTerm.__key)
+
+    @staticmethod
+    def of_wire_format(wire_format: tuple[str, bool]) -> "SymbolicTerm":
+        string, parsed = wire_format
+        res = SymbolicTerm.parse(string)
+        return res if parsed else SymbolicTerm(res.__value, None, key=SymbolicTerm.__key)
+
+    @property
+    def wire_format(self) -> tuple[str, bool]:
+        return str(self), self.__parsed_string is not None
+
+    def __reduce__(self):
+        return SymbolicTerm.of_wire_format, (self.wire_format,)
+
     def __str__(self):
         return self.__parsed_string or str(self.__value)
 
@@ -97,11 +119,30 @@ class SymbolicTerm:
         return copy.deepcopy(self.__value)
 
     def match(self, pattern: "SymbolicTerm") -> bool:
-        if pattern.is_variable() or self.is_variable():
+        return SymbolicTerm.match_values(self.__value, pattern.__value)
+
+    @staticmethod
+    def match_values(value: clingo.ast.AST, pattern: clingo.ast.AST) -> bool:
+        """
+        Match terms given as AST nodes, without materializing (and re-parsing) their arguments.
+        """
+        if pattern.ast_type == clingo.ast.ASTType.Variable or value.ast_type == clingo.ast.ASTType.Variable:
             return True
-        if pattern.is_function():
-            return self.is_function() and pattern.function_name == self.function_name and \
-                pattern.function_arity == self.function_arity and \
-                all(argument.match(pattern.arguments[index]) for index, argument in enumerate(self.arguments))
-        return pattern == self
+        pattern_function = SymbolicTerm.__function_of(pattern)
+        if pattern_function is not None:
+            value_function = SymbolicTerm.__function_of(value)
+            return value_function is not None and value_function[0] == pattern_function[0] and \
+                len(value_function[1]) == len(pattern_function[1]) and \
+                all(SymbolicTerm.match_values(argument, pattern_function[1][index])
+                    for index, argument in enumerate(value_function[1]))
+        return value == pattern
+
+    @staticmethod
+    def __function_of(value: clingo.ast.AST) -> Optional[tuple[str, tuple[clingo.ast.AST, ...]]]:
+        if value.ast_type == clingo.ast.ASTType.Function:
+            return value.name, tuple(value.arguments)
+        if value.ast_type == clingo.ast.ASTType.SymbolicTerm and value.symbol.type == clingo.SymbolType.Function:
+            return value.symbol.name, tuple(clingo.ast.SymbolicTerm(value.location, argument)
+                                            for argument in value.symbol.arguments)
+        return None
 
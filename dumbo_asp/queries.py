@@ -13,6 +13,7 @@ from dumbo_utils.url import compress_object_for_url
 from dumbo_utils.validation import validate
 
 from dumbo_asp import utils
+from dumbo_asp.caches import ResultCache
 from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.programs import SymbolicProgram
@@ -28,11 +29,20 @@ def compute_minimal_unsatisfiable_subsets(
         over_the_ground_program: bool = False,
         clingo_path: Path = Path("clingo"),
         wasp: Path = Path("wasp"),
+        slice: bool = False,
+        in_process_grounding: bool = True,
 ) -> list[SymbolicProgram]:
+    """
+    With slice=True, only constraints and the rules they depend on are considered (any MUS is among them).
+    The program is grounded in-process and fed to wasp in the smodels format, unless in_process_grounding=False (in
+    which case clingo_path is used to ground it).
+    """
     predicate: Final = f"__mus__"
+    if slice:
+        program = program.slice()
     if over_the_ground_program:
         rules = [
-            SymbolicRule.parse(f"__constant{predicate}({';'.join(str(term) for term in program.herbrand_universe)}).")
+            SymbolicRule.parse(f"__constant{predicate}({';'.join(str(symbol) for symbol in program.herbrand_universe_symbols)}).")
         ]
         for index, rule in enumerate(program, start=1):
             terms = ','.join([str(index), *rule.global_safe_variables])
@@ -49,12 +59,19 @@ def compute_minimal_unsatisfiable_subsets(
             ),
         )
     # print(mus_program)
-    res = subprocess.run(
-        ["bash", "-c",
-         f"{clingo_path} --output=smodels | {wasp} --silent --mus={predicate} -n {up_to if up_to.is_int else 0}"],
-        input=str(mus_program).encode(),
-        capture_output=True,
-    )
+    if in_process_grounding:
+        res = subprocess.run(
+            ["bash", "-c", f"{wasp} --silent --mus={predicate} -n {up_to if up_to.is_int else 0}"],
+            input=mus_program.ground_program(format="smodels").encode(),
+            capture_output=True,
+        )
+    else:
+        res = subprocess.run(
+            ["bash", "-c",
+             f"{clingo_path} --output=smodels | {wasp} --silent --mus={predicate} -n {up_to if up_to.is_int else 0}"],
+            input=str(mus_program).encode(),
+            capture_output=True,
+        )
     validate("exit code", res.returncode, equals=0, help_msg="Computation failed")
     lines = res.stdout.decode().split('\n')
     muses = [Model.of_atoms(line.split()[2:]) for line in lines if line]
@@ -66,7 +83,7 @@ def compute_minimal_unsatisfiable_subsets(
         for atom in mus:
             rule = program[atom.arguments[0].number - 1]
             rules.append(rule.apply_variable_substitution(**{
-                variable: SymbolicTerm.parse(str(atom.arguments[index]))
+                variable: SymbolicTerm.of_symbol(atom.arguments[index])
                 for index, variable in enumerate(rule.global_safe_variables, start=1)
             }))
         res.append(SymbolicProgram.of(rules))
@@ -80,24 +97,27 @@ def enumerate_models(
         false_atoms: Iterable[GroundAtom] = (),
         unknown_atoms: Iterable[GroundAtom] = (),
         up_to: int = 0,
+        slice: bool = False,
 ) -> tuple[Model, ...]:
     """
     Enumerate models of the program that are compatible with the partial assignment.
     Note that the program may be simplified by clingo, so you may want to specify some unknown atoms to prevent
     such simplifications.
+    With slice=True, the program is sliced on the predicates of the given atoms, and models are restricted to the
+    predicates of the sliced program.
     """
     validate("up_to", up_to, min_value=0)
+    true_atoms, false_atoms, unknown_atoms = tuple(true_atoms), tuple(false_atoms), tuple(unknown_atoms)
+    if slice:
+        program = program.slice(*true_atoms, *false_atoms, *unknown_atoms)
 
-    the_program = Model.of_atoms(
-        reify_program(
-            Model.of_atoms(true_atoms).as_facts +
-            '\n'.join(f":- {atom}." for atom in false_atoms) +
-            Model.of_atoms(unknown_atoms).as_choice_rules +
-            str(program)
-        )
-    ).as_facts + META_MODELS
+    prefix = Model.of_atoms(true_atoms).as_facts + \
+        '\n'.join(f":- {atom}." for atom in false_atoms) + \
+        Model.of_atoms(unknown_atoms).as_choice_rules
+    the_program = __reify(program, prefix).as_facts + META_MODELS
 
-    return __collect_models(the_program, [f"{up_to}"])
+    return __collect_models(the_program, [f"{up_to}"], cache=program.result_cache,
+                            key=("models", program.content_hash, prefix))
 
 
 @typeguard.typechecked
@@ -109,14 +129,12 @@ def enumerate_counter_models(
 ) -> tuple[Model, ...]:
     validate("up_to", up_to, min_value=0)
 
-    the_program = Model.of_atoms(
-        reify_program(
-            '\n'.join(f"#external {atom}." for atom in model) +
-            str(program)
-        )
-    ).as_facts + META_COUNTER_MODELS + '\n'.join(f"true(L) :- output({atom},B), literal_tuple(B,L)." for atom in model)
+    prefix = '\n'.join(f"#external {atom}." for atom in model)
+    the_program = __reify(program, prefix).as_facts + META_COUNTER_MODELS + \
+        '\n'.join(f"true(L) :- output({atom},B), literal_tuple(B,L)." for atom in model)
 
-    return __collect_models(the_program, [f"{up_to}"])
+    return __collect_models(the_program, [f"{up_to}"], cache=program.result_cache,
+                            key=("counter models", program.content_hash, prefix))
 
 
 @typeguard.typechecked
@@ -125,17 +143,19 @@ def validate_in_all_models(
         true_atoms: Iterable[GroundAtom] = (),
         false_atoms: Iterable[GroundAtom] = (),
         unknown_atoms: Iterable[GroundAtom] = (),
+        slice: bool = False,
 ) -> None:
-    the_program = Model.of_atoms(
-        reify_program(
-            Model.of_atoms(true_atoms, false_atoms, unknown_atoms).as_choice_rules +
-            str(program)
-        )
-    ).as_facts + META_MODELS
+    true_atoms, false_atoms, unknown_atoms = tuple(true_atoms), tuple(false_atoms), tuple(unknown_atoms)
+    if slice:
+        program = program.slice(*true_atoms, *false_atoms, *unknown_atoms)
+    prefix = Model.of_atoms(true_atoms, false_atoms, unknown_atoms).as_choice_rules
+    the_program = __reify(program, prefix).as_facts + META_MODELS
 
     def check(mode: bool, atoms):
         consequences = set(
-            at for at in __collect_models(the_program, ["--enum-mode=cautious" if mode else "--enum-mode=brave"])[-1]
+            at for at in __collect_models(the_program, ["--enum-mode=cautious" if mode else "--enum-mode=brave"],
+                                          cache=program.result_cache,
+                                          key=("models", program.content_hash, prefix))[-1]
         )
         for atom in atoms:
             validate(f"{mode} atom", atom in consequences, equals=mode,
@@ -151,14 +171,12 @@ def validate_in_all_models_of_the_reduct(
         model: Model,
         true_atoms: Iterable[GroundAtom] = (),
 ) -> None:
-    the_program = Model.of_atoms(
-        reify_program(
-            '\n'.join(f"#external {atom}." for atom in model) +
-            str(program)
-        )
-    ).as_facts + META_REDUCT_MODELS + '\n'.join(f"true(L) :- output({atom},B), literal_tuple(B,L)." for atom in model)
+    prefix = '\n'.join(f"#external {atom}." for atom in model)
+    the_program = __reify(program, prefix).as_facts + META_REDUCT_MODELS + \
+        '\n'.join(f"true(L) :- output({atom},B), literal_tuple(B,L)." for atom in model)
     consequences = set(
-        at for at in __collect_models(the_program, ["--enum-mode=cautious"])[-1]
+        at for at in __collect_models(the_program, ["--enum-mode=cautious"], cache=program.result_cache,
+                                      key=("reduct models", program.content_hash, prefix))[-1]
     )
     for atom in true_atoms:
         validate(f"True atom", atom in consequences, equals=True,
@@ -226,7 +244,20 @@ def validate_cannot_be_extended_to_stable_model(
         validate("has counter model", enumerate_counter_models(the_program, model, up_to=1), length=1)
 
 
-def __collect_models(program: str, options: list[str]) -> tuple[Model, ...]:
+def __reify(program: SymbolicProgram, prefix: str) -> Model:
+    def compute():
+        return Model.of_atoms(reify_program(prefix + str(program)))
+
+    if program.result_cache is None:
+        return compute()
+    return program.result_cache.get_or_compute("reify_program", ResultCache.key(program.content_hash, prefix), compute)
+
+
+def __collect_models(program: str, options: list[str], *, cache: Optional[ResultCache] = None,
+                     key: tuple[str, ...] = ()) -> tuple[Model, ...]:
+    if cache is not None:
+        return cache.get_or_compute("models", ResultCache.key(*key, *options),
+                                    lambda: __collect_models(program, options))
     control = clingo.Control(options)
     control.add(program)
     control.ground([("base", [])])
@@ -473,6 +504,7 @@ def explanation_graph(
         query: Model,
         *,
         collect_pus_program: Optional[List[SymbolicProgram]] = None,
+        slice: bool = False,
 ) -> Model:
     """
     Compute an explanation graph for a conjunctive query.
@@ -485,8 +517,15 @@ def explanation_graph(
     [1] the symbolic program used to compute the 1-PUS;
     [2] the reduced selectors being the preferred 1-PUS;
     [3] the expanded program (at index 0) including the preferred 1-PUS (at index 2).
+    :param slice: Slice the program on the predicates of the query (the answer set and the Herbrand base are
+    restricted accordingly)
     :return: a graph encoded by predicates node and link (with labels on nodes and links)
     """
+    if slice:
+        program = program.slice(*query)
+        predicates = set(program.predicates)
+        answer_set = answer_set.filter(when=lambda atom: atom.predicate in predicates)
+        herbrand_base = [atom for atom in herbrand_base if atom.predicate in predicates]
     pus_program = __explanation_graph_pus_program(program, answer_set, herbrand_base, query,
                                                   collect_pus_program=collect_pus_program)
 
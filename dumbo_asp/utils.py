@@ -1,12 +1,16 @@
-from uuid import uuid4
+import functools
+import weakref
+from collections import OrderedDict
+from uuid import uuid4, uuid5, UUID
 from pathlib import Path
-from typing import Final
+from typing import Final, Callable, Any
 
 import clingo.ast
 import typeguard
 
 PROJECT_ROOT: Final = Path(__file__).parent.parent
 NEW_LINE_SYMBOL: Final = '⏎'
+DETERMINISTIC_UUID_NAMESPACE: Final = UUID("2837c0c3-fe3d-4b61-95f8-7c756a83c5dd")
 
 
 @typeguard.typechecked
@@ -46,3 +50,38 @@ def one_line(string: str) -> str:
 
 def uuid() -> str:
     return str(uuid4()).replace('-', '_')
+
+
+def deterministic_uuid(*parts: str) -> str:
+    """
+    A uuid in the format of uuid(), determined by the given parts.
+    """
+    return str(uuid5(DETERMINISTIC_UUID_NAMESPACE, '\0'.join(parts))).replace('-', '_')
+
+
+def weak_memoize(maxsize: int = 128) -> Callable:
+    """
+    Memoize a method without arguments for at most maxsize instances (the most recently used ones).
+    Instances are identified by identity and are not kept alive by the memo (unless the result refers to them).
+    """
+    def decorator(method: Callable) -> Callable:
+        entries = OrderedDict()
+
+        @functools.wraps(method)
+        def wrapper(self) -> Any:
+            key = id(self)
+            entry = entries.get(key)
+            if entry is not None and entry[0]() is self:
+                entries.move_to_end(key)
+                return entry[1]
+            res = method(self)
+            entries[key] = (weakref.ref(self, lambda _: entries.pop(key, None)), res)
+            if len(entries) > maxsize:
+                entries.popitem(last=False)
+            return res
+
+        wrapper.cache_clear = entries.clear
+        wrapper.cache_size = lambda: len(entries)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from dumbo_asp.primitives.accelerators import ACCELERATORS
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.templates import Template
+
+
+def random_graph(seed: int, nodes: int = 8, links: int = 12) -> str:
+    generator = random.Random(seed)
+    return '\n'.join(
+        [f"node({node})." for node in range(1, nodes + 1) if generator.random() < 0.8] +
+        [f"link({generator.randint(1, nodes + 2)},{generator.randint(1, nodes)})." for _ in range(links)]
+    )
+
+
+def outputs(program: SymbolicProgram, *predicates: str) -> Model:
+    return Model.of_program(program).filter(when=lambda atom: atom.predicate_name in predicates)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("application, predicates", [
+    ('__apply_template__("@dumbo/transitive closure", (relation, link), (closure, reach)).', ["reach"]),
+    ('start(1). start(3). __apply_template__("@dumbo/reachable nodes").', ["reach"]),
+    ('__apply_template__("@dumbo/strongly connected components").', ["in_scc", "scc"]),
+    ('__apply_template__("@dumbo/condensation graph", (scc_link, c)).', ["in_scc", "scc", "c"]),
+    ('rows(3). cols(4). __apply_template__("@dumbo/generate grid").', ["row", "col", "grid"]),
+])
+def test_accelerated_expansion_is_equivalent_to_the_asp_encoding(seed, application, predicates):
+    program = SymbolicProgram.parse(random_graph(seed) + '\n' + application)
+    accelerated = Template.expand_program(program, accelerate=True)
+    assert all(rule.is_fact for rule in accelerated)
+    assert outputs(accelerated, *predicates) == outputs(Template.expand_program(program), *predicates)
+
+
+@pytest.mark.parametrize("program, predicates", [
+    ('start(1). link(1,2). link(5,6). reach(5). __apply_template__("@dumbo/reachable nodes").', ["reach"]),
+    ('link(1,2). link(2,3). reach(0,1). '
+     '__apply_template__("@dumbo/transitive closure", (relation, link), (closure, reach)).', ["reach"]),
+    ('node(1). node(2). link(1,2). scc(3). __apply_template__("@dumbo/strongly connected components").',
+     ["in_scc", "scc"]),
+    ('rows(2). cols(2). grid(0,0) :- rows(2). __apply_template__("@dumbo/generate grid").', ["grid"]),
+])
+def test_no_acceleration_if_outputs_are_defined_outside_the_application(program, predicates):
+    program = SymbolicProgram.parse(program)
+    accelerated = Template.expand_program(program, accelerate=True)
+    assert outputs(accelerated, *predicates) == outputs(Template.expand_program(program), *predicates)
+    assert len(accelerated) == len(Template.expand_program(program))
+
+
+def test_accelerators_are_registered_for_core_templates():
+    assert all(Template.is_core_template(name) for name in ACCELERATORS)
+
+
+def test_no_acceleration_if_inputs_are_not_facts():
+    program = SymbolicProgram.parse("""
+link(1,2).
+link(X,Y) :- link(Y,X).
+__apply_template__("@dumbo/transitive closure", (relation, link), (closure, reach)).
+    """)
+    assert Template.expand_program(program, accelerate=True) == Template.expand_program(program)
+
+
+def test_no_acceleration_if_the_accelerator_declines():
+    program = SymbolicProgram.parse("""
+rows(2). rows(3). cols(4).
+__apply_template__("@dumbo/generate grid").
+    """)
+    assert len(Template.expand_program(program, accelerate=True)) == len(Template.expand_program(program))
+
+
+def test_accelerated_outputs_can_feed_other_applications():
+    program = SymbolicProgram.parse("""
+edge(1,2). edge(2,3).
+__apply_template__("@dumbo/transitive closure", (relation, edge), (closure, path)).
+__apply_template__("@dumbo/transitive closure", (relation, path), (closure, path2)).
+    """)
+    accelerated = Template.expand_program(program, accelerate=True)
+    assert all(rule.is_fact for rule in accelerated)
+    assert outputs(accelerated, "path2") == Model.of_atoms("path2(1,2)", "path2(1,3)", "path2(2,3)")
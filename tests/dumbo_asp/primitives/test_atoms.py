@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
@@ -45,3 +47,8 @@ def test_symbolic_atom_match_nested():
     atom2 = SymbolicAtom.parse("foo(bar(X))")
     assert atom1.match(atom2)
 
+
+def test_symbolic_atom_pickling():
+    atom = SymbolicAtom.parse("a(X, f(1))")
+    assert pickle.loads(pickle.dumps(atom)) == atom
+    assert pickle.loads(pickle.dumps(SymbolicAtom.of_false())) == SymbolicAtom.of_false()
@@ -0,0 +1,39 @@
+import pytest
+
+from dumbo_asp.primitives.budgets import ExpansionBudget, ExpansionEstimate
+
+
+def test_expansion_estimates_can_be_summed():
+    assert ExpansionEstimate(rules=1, bytes=10) + ExpansionEstimate(rules=2, instances=3) == \
+           ExpansionEstimate(rules=3, instances=3, bytes=10)
+
+
+def test_expansion_budget_reserve_does_not_consume():
+    budget = ExpansionBudget(rules=10)
+    budget.reserve(ExpansionEstimate(rules=10))
+    budget.reserve(ExpansionEstimate(rules=10))
+    with pytest.raises(ExpansionBudget.ExceededError):
+        budget.reserve(ExpansionEstimate(rules=11))
+    assert budget.usage["rules"] == 0
+
+
+def test_expansion_budget_charge_consumes():
+    budget = ExpansionBudget(rules=10, bytes=100)
+    budget.charge(ExpansionEstimate(rules=6, bytes=60))
+    with pytest.raises(ExpansionBudget.ExceededError):
+        budget.reserve(ExpansionEstimate(rules=6))
+    with pytest.raises(ExpansionBudget.ExceededError) as error:
+        budget.charge(ExpansionEstimate(rules=1, bytes=50), "the reason")
+    assert "the reason" in str(error.value)
+    assert "bytes: 110 of 100" in str(error.value)
+
+
+def test_expansion_budget_on_wall_time():
+    budget = ExpansionBudget(seconds=0)
+    with pytest.raises(ExpansionBudget.ExceededError):
+        budget.reserve(ExpansionEstimate())
+
+
+def test_expansion_budget_limits_must_be_non_negative():
+    with pytest.raises(ValueError):
+        ExpansionBudget(rules=-1)
@@ -0,0 +1,45 @@
+from dumbo_asp.primitives.predicates import Predicate
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+
+def test_dependency_graph_edges():
+    graph = SymbolicProgram.parse("""
+b(X) :- a(X), not c(X).
+{d} :- b(1).
+e | f.
+    """.strip()).dependency_graph
+    a, b, c, d, e, f = (Predicate.parse(p) for p in "a/1 b/1 c/1 d/0 e/0 f/0".split())
+    assert graph.positive_edges == {(a, b), (b, d)}
+    assert graph.negative_edges == {(c, b), (e, f), (f, e)}
+    assert graph.choice_edges == {(d, d)}
+
+
+def test_dependency_graph_components_are_topologically_sorted():
+    graph = SymbolicProgram.parse("""
+d(X) :- b(X).
+b(X) :- a(X), not c(X).
+c(X) :- a(X), not b(X).
+a(1).
+    """.strip()).dependency_graph
+    assert graph.strongly_connected_components[0] == (Predicate.parse("a/1"),)
+    assert set(graph.strongly_connected_components[1]) == {Predicate.parse("b/1"), Predicate.parse("c/1")}
+    assert graph.strongly_connected_components[2] == (Predicate.parse("d/1"),)
+    assert set(graph.component_of(Predicate.parse("c/1"))) == {Predicate.parse("b/1"), Predicate.parse("c/1")}
+
+
+def test_dependency_graph_stratification_and_tightness():
+    assert SymbolicProgram.parse("a. b :- a, not c. c :- a.").dependency_graph.is_stratified
+    assert not SymbolicProgram.parse("a :- not b. b :- not a.").dependency_graph.is_stratified
+    assert not SymbolicProgram.parse("{a}.").dependency_graph.is_stratified
+    assert SymbolicProgram.parse("{a}. b :- a.").dependency_graph.is_tight
+    assert not SymbolicProgram.parse("a :- b. b :- a.").dependency_graph.is_tight
+
+
+def test_dependency_graph_dependencies():
+    graph = SymbolicProgram.parse("""
+a(X) :- b(X), not c(X).
+b(X) :- d(X).
+e(X) :- a(X).
+    """.strip()).dependency_graph
+    assert graph.dependencies(Predicate.parse("a")) == {Predicate.parse(p) for p in "a/1 b/1 c/1 d/1".split()}
+    assert graph.dependencies(Predicate.parse("z")) == set()
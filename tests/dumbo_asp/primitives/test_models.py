@@ -119,3 +119,18 @@ block((sub, Row', Col'), (Row, Col)) :- Row = 1..9; Col = 1..9; Row' = (Row-1) /
         conjunctive_query="block((sub, Row', Col'), (Row, Col)), block((sub, Row', Col'), (7, 9))",
     )
     assert len(res) == 9
+
+
+def test_compute_substitutions_in_batch():
+    model = Model.of_program("a(1..3). b(2..4).")
+    first, second = model.compute_substitutions_in_batch(
+        ("X", 1, "a(X), b(X)"),
+        ("X,Y", 2, "a(X), b(Y), X > Y"),
+    )
+    assert sorted(str(substitution[0]) for substitution in first) == ["2", "3"]
+    assert [[str(x) for x in substitution] for substitution in second] == [["3", "2"]]
+
+
+def test_predicate_cardinalities():
+    model = Model.of_program("a(1,1). a(1,2). a(2,2). b. c(x).")
+    assert model.predicate_cardinalities == {("a", 2): (3, (2, 2)), ("b", 0): (1, ()), ("c", 1): (1, (1,))}
@@ -1,7 +1,11 @@
+import pickle
+
 import pytest
 
 from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
+from dumbo_asp.primitives.budgets import ExpansionBudget
 from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.parsers import Parser
 from dumbo_asp.primitives.predicates import Predicate
 from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.rules import SymbolicRule, ANONYMOUS_VARIABLE_PREFIX
@@ -35,6 +39,22 @@ def test_program_herbrand_universe():
     assert SymbolicProgram.parse("a(b(c)).").herbrand_universe == {SymbolicTerm.parse("c")}
 
 
+def test_program_herbrand_universe_symbols():
+    program = SymbolicProgram.parse("""
+a(1,b(c)).
+a(2,"d").
+e.
+    """.strip())
+    assert program.herbrand_universe_symbols == frozenset(
+        Parser.parse_ground_term(term) for term in ["1", "2", "c", '"d"']
+    )
+    assert program.herbrand_universe_by_position[Predicate.parse("a/2")] == (
+        frozenset(Parser.parse_ground_term(term) for term in ["1", "2"]),
+        frozenset(Parser.parse_ground_term(term) for term in ["c", '"d"']),
+    )
+    assert program.herbrand_universe_by_position[Predicate.parse("e/0")] == ()
+
+
 def test_program_herbrand_base():
     assert SymbolicProgram.parse("a(X) :- X = 1..3.").herbrand_base == Model.of_program("a(1..3).")
 
@@ -60,6 +80,29 @@ b(X,Y) :- c(Y); foo(X).
 """.strip()
 
 
+def test_symbolic_program_process_directives():
+    program = SymbolicProgram.parse("""
+__const__(x, 10).
+__with__(foo(x)).
+    a(X) :- b(X).
+    __with__(bar).
+        c(x).
+    __end_with__.
+__end_with__.
+    """.strip())
+    assert str(program.process_directives()) == """
+%* __const__(x, 10). *%
+%* __with__(foo(10)). *%
+a(X) :- b(X); foo(10).
+%* __with__(bar). *%
+c(10) :- foo(10); bar.
+%* __end_with__. *%
+%* __end_with__. *%
+    """.strip()
+    assert program.process_directives() is program.process_directives()
+    assert str(program.process_directives()) == str(program.process_constants().process_with_statements())
+
+
 def test_expand_zero_global_variables():
     rule = SymbolicRule.parse("""
 :- __false__.
@@ -315,3 +358,219 @@ rule("YigxLDIpLg==").
 def test_program_with_named_anonymous_variables():
     assert (str(SymbolicProgram.parse("a :- b(_).").with_named_anonymous_variables) ==
             str(SymbolicProgram.parse(f"a :- b({ANONYMOUS_VARIABLE_PREFIX}_1).")))
+
+
+def test_expand_global_and_local_variables_of_ground_program_does_not_compute_the_herbrand_base():
+    program = SymbolicProgram.parse("""
+a(1) :- b(1,2), not c(2).
+b(1,2).
+    """)
+    assert program.expand_global_and_local_variables() is program
+    assert "herbrand_base" not in program.__dict__
+    program = SymbolicProgram.parse("a :- b : c. c.")
+    assert str(program.expand_global_and_local_variables()) == "a :- b.\nc."
+
+
+@pytest.mark.parametrize("program", [
+    "a(X) :- not b(X).",
+    "a(X) :- not b(X). c(Y) :- d(Y). d(1).",
+])
+def test_expand_global_and_local_variables_of_unsafe_program(program):
+    with pytest.raises(RuntimeError):
+        SymbolicProgram.parse(program).expand_global_and_local_variables()
+
+
+def test_expand_global_and_local_variables_with_workers():
+    program = SymbolicProgram.parse('\n'.join(
+        [f"a{index}(X) :- X = 1..3." for index in range(40)] +
+        [f"b{index} :- a{index}(X) : X = 1..3." for index in range(40)]
+    ))
+    expected = program.expand_global_and_local_variables()
+    assert str(program.expand_global_and_local_variables(workers=2)) == str(expected)
+
+
+def test_expand_global_and_local_variables_with_workers_keeps_disabled_rules():
+    program = SymbolicProgram.of(
+        SymbolicRule.parse("a(X) :- X = 1..3.").disable(),
+        *(SymbolicRule.parse(f"b{index}(X) :- X = 1..2.") for index in range(40)),
+    )
+    assert str(program.expand_global_and_local_variables(workers=2, expand_also_disabled_rules=True)) == \
+           str(program.expand_global_and_local_variables(expand_also_disabled_rules=True))
+    assert program.expand_global_and_local_variables(workers=2)[0].disabled
+
+
+def test_symbolic_program_pickling():
+    program = SymbolicProgram.parse("""
+a(X) :- b(X).
+b(1..3).
+    """.strip())
+    assert pickle.loads(pickle.dumps(program)) == program
+    assert str(pickle.loads(pickle.dumps(program))) == str(program)
+
+
+def test_deduplicate():
+    program = SymbolicProgram.parse("""
+a(X) :- b(X).
+b(1).
+a(Y) :-  b(Y).
+b( 1 ).
+c(X) :- b(X).
+    """.strip())
+    assert str(program.deduplicate()) == """
+a(X) :- b(X).
+b(1).
+c(X) :- b(X).
+    """.strip()
+
+
+def test_apply_substitution_plan_touches_only_affected_rules():
+    program = SymbolicProgram.parse("""
+a(X) :- b(X).
+c(X) :- d(X).
+    """.strip())
+    renamed = program.apply_predicate_renaming(b=Predicate.parse("e"))
+    assert str(renamed) == "a(X) :- e(X).\nc(X) :- d(X)."
+    assert renamed[1] is program[1]
+    assert program.apply_predicate_renaming(f=Predicate.parse("g")) is program
+
+
+def test_rules_defining_and_using_predicates():
+    program = SymbolicProgram.parse("""
+a(X) :- b(X).
+a(1).
+c(X) :- b(X), not a(X).
+{b(1..3)}.
+    """.strip())
+    assert [str(rule) for rule in program.rules_defining(Predicate.parse("a"))] == ["a(X) :- b(X).", "a(1)."]
+    assert [str(rule) for rule in program.rules_using(Predicate.parse("b/1"))] == \
+           ["a(X) :- b(X).", "c(X) :- b(X), not a(X)."]
+    assert [str(rule) for rule in program.rules_using(Predicate.parse("a/1"), negative=False)] == []
+    assert program.rules_using(Predicate.parse("b/2")) == ()
+
+
+def test_incremental_herbrand_base_grounds_only_new_rules():
+    program = SymbolicProgram.parse("""
+a(1..2).
+b(X) :- a(X).
+    """.strip()).with_incremental_herbrand_base()
+    assert program.herbrand_base == Model.of_atoms("a(1)", "a(2)", "b(1)", "b(2)")
+    extended = program.extend(SymbolicRule.parse("c(X) :- b(X), not a(X+1)."))
+    assert extended.herbrand_base == SymbolicProgram.parse(str(extended)).herbrand_base
+    assert extended.herbrand_base == Model.of_atoms("a(1)", "a(2)", "b(1)", "b(2)", "c(1)", "c(2)")
+
+
+def test_incremental_herbrand_base_is_reset_on_feedback_and_removal():
+    program = SymbolicProgram.parse("""
+a(1).
+b(X) :- a(X).
+    """.strip()).with_incremental_herbrand_base()
+    assert program.herbrand_base == Model.of_atoms("a(1)", "b(1)")
+    extended = program.extend(SymbolicRule.parse("a(2)."))
+    assert extended.herbrand_base == Model.of_atoms("a(1)", "a(2)", "b(1)", "b(2)")
+    replaced = extended.replace(extended[0], SymbolicRule.parse("a(3)."))
+    assert replaced.herbrand_base == Model.of_atoms("a(2)", "a(3)", "b(2)", "b(3)")
+
+
+def test_expansion_inherits_herbrand_base():
+    program = SymbolicProgram.parse("""
+a(1..2).
+b(X) :- a(X).
+    """.strip())
+    expanded = program.expand_global_and_local_variables()
+    assert expanded.herbrand_base is program.herbrand_base
+
+
+def test_slice_keeps_dependencies_constraints_and_unstratified_components():
+    program = SymbolicProgram.parse("""
+a(X) :- b(X).
+b(1).
+c(X) :- d(X).
+d(1).
+:- e.
+e :- f.
+f.
+g :- not h.
+h :- not g.
+i :- j.
+    """.strip())
+    assert str(program.slice(Predicate.parse("a"))) == """
+a(X) :- b(X).
+b(1).
+:- e.
+e :- f.
+f.
+g :- not h.
+h :- not g.
+    """.strip()
+    assert len(program.slice(GroundAtom.parse("c(1)"))) == 7
+
+
+def test_grounding_profile():
+    program = SymbolicProgram.parse("""
+n(1..10).
+e(X,Y) :- n(X), n(Y), X < Y.
+p(X) :- n(X), not q(X).
+q(X) :- n(X), not p(X).
+    """.strip())
+    profile = program.grounding_profile()
+    assert len(profile.rules) == 4
+    by_index = {rule.index: rule for rule in profile.rules}
+    assert by_index[1].instances == 45
+    assert by_index[1].head_atoms == 45
+    assert by_index[1].body_literals == 90
+    assert by_index[2].instances == 10
+    assert by_index[2].body_literals == 20
+    assert profile.total_instances == 75
+    assert [rule.index for rule in profile.rules] == [1, 2, 3, 0]
+    assert len(profile.report(top=1).split('\n')) == 2
+
+
+def test_grounding_profile_does_not_depend_on_the_order_of_rules():
+    program = SymbolicProgram.parse("""
+n(1..10).
+e(X,Y) :- n(X), n(Y), X < Y.
+    """.strip())
+    reversed_program = SymbolicProgram.of(reversed(list(program)))
+    assert [(rule.instances, rule.body_literals) for rule in program.grounding_profile().rules] == \
+           [(rule.instances, rule.body_literals) for rule in reversed_program.grounding_profile().rules]
+
+
+def test_ground_program_in_smodels_format():
+    program = SymbolicProgram.parse("""
+a.
+{b; c}.
+:- b, c.
+d :- #count{1 : b; 2 : c} >= 2.
+    """.strip())
+    lines = program.ground_program(format="smodels").split('\n')
+    assert lines[-8:] == ["0", "B+", "0", "B-", "1", "0", "1", ""]
+    symbols = lines[lines.index("0") + 1:lines.index("B+") - 1]
+    assert sorted(line.split()[1] for line in symbols) == ["a", "b", "c", "d"]
+    assert "3 2 3 4 0 0" in lines
+    assert "1 1 2 0 4 3" in lines
+    assert "5 5 2 2 0 3 4 1 1" in lines
+
+
+def test_ground_program_in_aspif_format():
+    lines = SymbolicProgram.parse("{a}. b :- a.").ground_program(format="aspif").split('\n')
+    assert lines[0] == "asp 1 0 0"
+    assert "1 1 1 1 0 0" in lines
+    assert "1 0 1 2 0 1 1" in lines
+    assert "4 1 a 1 1" in lines
+    assert lines[-2:] == ["0", ""]
+
+
+def test_estimate_expansion_of_global_and_local_variables():
+    program = SymbolicProgram.parse("e(1..3,1..3). r(X,Z) :- e(X,Y), e(Y,Z).")
+    estimate = program.estimate_expansion()
+    assert estimate.rules == estimate.instances == len(program.expand_global_and_local_variables())
+
+
+def test_expand_global_and_local_variables_with_budget():
+    program = SymbolicProgram.parse("a(X) :- X = 1..10. b(X) :- X = 1..1000000.")
+    with pytest.raises(ExpansionBudget.ExceededError):
+        program.expand_global_and_local_variables(budget=ExpansionBudget(instances=1000))
+    budget = ExpansionBudget(instances=1000)
+    program = SymbolicProgram.parse("a(X) :- X = 1..10.")
+    assert len(program.expand_global_and_local_variables(budget=budget)) == 10
+    assert budget.usage["rules"] == budget.usage["instances"] == 10
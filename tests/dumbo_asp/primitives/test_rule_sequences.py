@@ -0,0 +1,85 @@
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.rule_sequences import RuleSequence, RULE_SEQUENCE_BRANCHING
+from dumbo_asp.primitives.rules import SymbolicRule
+
+
+def rules(size):
+    return [SymbolicRule.parse(f"a({index}).") for index in range(size)]
+
+
+def test_rule_sequence_indexing_and_iteration():
+    the_rules = rules(RULE_SEQUENCE_BRANCHING ** 2 + 5)
+    sequence = RuleSequence.of(the_rules)
+    assert len(sequence) == len(the_rules)
+    assert list(sequence) == the_rules
+    assert sequence[0] is the_rules[0]
+    assert sequence[-1] is the_rules[-1]
+    assert sequence[RULE_SEQUENCE_BRANCHING + 1] is the_rules[RULE_SEQUENCE_BRANCHING + 1]
+
+
+def test_rule_sequence_splice_is_persistent():
+    the_rules = rules(1000)
+    sequence = RuleSequence.of(the_rules)
+    replacement = rules(100)
+    spliced = sequence.splice(500, replacement)
+    assert list(spliced) == the_rules[:500] + replacement + the_rules[501:]
+    assert list(sequence) == the_rules
+    assert list(sequence.splice(0, [])) == the_rules[1:]
+    assert len(RuleSequence.of(rules(1)).splice(0, [])) == 0
+
+
+def test_rule_sequence_positions_of_by_equality():
+    rule = SymbolicRule.parse("a(1).")
+    sequence = RuleSequence.of([*rules(3), rule, *rules(50), rule])
+    assert sequence.positions_of(rule) == [1, 3, 5, 54]
+    assert sequence.positions_of(SymbolicRule.parse("a(2).")) == [2, 6]
+    assert sequence.positions_of(SymbolicRule.parse("b.")) == []
+
+
+def test_rule_sequence_index_is_maintained_by_splices():
+    the_rules = rules(2000)
+    sequence = RuleSequence.of(the_rules)
+    assert sequence.positions_of(the_rules[1500]) == [1500]
+    sequence = sequence.splice(10, rules(3)).splice(1000, []).splice(1600, [SymbolicRule.parse("b.")])
+    expected = the_rules[:10] + rules(3) + the_rules[11:]
+    del expected[1000]
+    expected[1600] = SymbolicRule.parse("b.")
+    assert list(sequence) == expected
+    for rule in [the_rules[0], the_rules[1], the_rules[1500], the_rules[1999], SymbolicRule.parse("b.")]:
+        assert sequence.positions_of(rule) == [index for index, other in enumerate(expected) if other == rule]
+    assert sequence.positions_of(the_rules[999]) == [index for index, other in enumerate(expected)
+                                                     if other == the_rules[999]]
+
+
+def test_rule_sequence_is_rebalanced_by_deletions():
+    the_rules = rules(RULE_SEQUENCE_BRANCHING ** 2 * 4)
+    sequence = RuleSequence.of(the_rules)
+    assert sequence.height == 3
+    while len(sequence) > 20:
+        sequence = sequence.splice(len(sequence) // 2, [])
+    assert sequence.height == 1
+    assert list(sequence) == the_rules[:10] + the_rules[-10:]
+
+
+def test_program_edits_share_rules():
+    program = SymbolicProgram.parse("""
+a(1..3).
+b(X) :- a(X).
+c(X) :- b(X).
+    """.strip())
+    expanded = program.expand_global_safe_variables(rule=program[1], variables=["X"])
+    assert len(expanded) == 5
+    assert expanded[0] is program[0]
+    assert expanded[-1] is program[2]
+    assert str(program.replace(program[2])) == "a(1..3).\nb(X) :- a(X)."
+
+
+def test_program_edits_apply_to_equal_rules():
+    program = SymbolicProgram.parse("""
+a(1..3).
+b(X) :- a(X).
+b(X) :- a(X).
+    """.strip())
+    assert program[1] is not program[2]
+    assert str(program.replace(SymbolicRule.parse("b(X) :- a(X)."))) == "a(1..3)."
+    assert len(program.expand_global_safe_variables(rule=program[1], variables=["X"])) == 7
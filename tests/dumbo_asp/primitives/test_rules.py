@@ -1,11 +1,18 @@
+import os
+import pickle
+import subprocess
+import sys
+
 import clingo
 import pytest
 from dumbo_utils.validation import ValidationError
 
 from dumbo_asp.primitives.atoms import SymbolicAtom
 from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.parsers import Parser
 from dumbo_asp.primitives.predicates import Predicate
-from dumbo_asp.primitives.rules import SymbolicRule, ANONYMOUS_VARIABLE_PREFIX
+from dumbo_asp.primitives.rules import SymbolicRule, ANONYMOUS_VARIABLE_PREFIX, SubstitutionPlan, \
+    PredicateRenamingSkeleton
 from dumbo_asp.primitives.terms import SymbolicTerm
 
 
@@ -132,6 +139,30 @@ def test_predicate_renaming_debug_is_special():
     assert str(rule) == "__debug__(foo,bar(1)) :- bar; bar(1); buzz(foo,foo(1))."
 
 
+@pytest.mark.parametrize("rule", [
+    "a(b) :- b(a).",
+    "__debug__(foo, foo(1)) :- foo, foo(1), buzz(foo, foo(1)).",
+    "-foo(X) :- not -bar(X), #count{Y : foo(Y), not bar(Y)} > 1, X = foo(bar).",
+    "{foo(X) : bar(X)} = 1 :- buzz(X).",
+    "foo(\"§\") :- bar(\"§\", foo).",
+    "a :- b.",
+])
+def test_predicate_renaming_skeleton_is_equivalent_to_substitution_plan(rule):
+    rule = SymbolicRule.parse(rule)
+    predicates = {"foo": Predicate.parse("__foo_1"), "bar/1": Predicate.parse("bar_1"), "buzz": Predicate.parse("b")}
+    skeleton = rule.predicate_renaming_skeleton
+    assert isinstance(skeleton, PredicateRenamingSkeleton)
+    assert str(skeleton.fill(predicates)) == str(SubstitutionPlan.of(predicates=predicates).apply(rule))
+    disabled = rule.disable().predicate_renaming_skeleton
+    assert str(disabled.fill(predicates)) == str(skeleton.fill(predicates).disable())
+
+
+def test_predicate_renaming_skeleton_slots():
+    assert SymbolicRule.parse("a(X) :- b(X), c(f(X)).").predicate_renaming_skeleton.slots == (
+        ("a", "a/1"), ("b", "b/1"), ("c", "c/1"),
+    )
+
+
 def test_rule_to_zero_simplification_version():
     rule = SymbolicRule.parse("a(X) :- b(X,Y).").to_zero_simplification_version()
     assert rule == SymbolicRule.parse('__false__(("YShYKSA6LSBiKFgsWSku", ("X","Y")), (X,Y)) |\na(X) :- b(X,Y).')
@@ -238,3 +269,132 @@ def test_head_elements():
     assert ' '.join(atom for atom in SymbolicRule.parse("a(X) | c(X) :- b(X).").head_elements) == "a(X) c(X)"
     assert ' '.join(atom for atom in SymbolicRule.parse("{a(X); c(X)} :- b(X).").head_elements) == "a(X) c(X)"
     assert ' '.join(atom for atom in SymbolicRule.parse("{a(X) : X = 1..3} :- b(X).").head_elements) == "a(X): X = (1..3)"
+
+
+def test_symbolic_rule_pickling():
+    rule = SymbolicRule.parse("a(X) :- b(X,Y), not c(Y).")
+    assert rule.global_safe_variables == ("X", "Y")
+    assert pickle.loads(pickle.dumps(rule)) == rule
+    assert pickle.loads(pickle.dumps(rule.disable())) == rule.disable()
+    assert str(pickle.loads(pickle.dumps(rule.disable()))) == str(rule.disable())
+
+
+def test_symbolic_rule_wire_format_carries_metadata():
+    rule = SymbolicRule.parse("a(X) :- b(X,Y), not c(Y).")
+    assert rule.wire_format()[-1] is None
+    assert rule.predicates
+    restored = SymbolicRule.of_wire_format(rule.wire_format())
+    assert "predicates" in restored.wire_format()[-1]
+    assert set(restored.predicates) == set(rule.predicates)
+
+
+def test_symbolic_rule_of_wire_format_is_not_parsed_if_only_metadata_is_read(monkeypatch):
+    rule = SymbolicRule.parse("a(X) :- b(X,Y), not c(Y).")
+    metadata = ("predicates", "canonical_hash", "content_hash", "head_variables", "body_variables",
+                "global_safe_variables")
+    for name in metadata:
+        getattr(rule, name)
+    wire_format = rule.wire_format()
+    parsed = []
+    parse_program = Parser.parse_program
+    monkeypatch.setattr(Parser, "parse_program", lambda *args, **kwargs: parsed.append(args) or
+                        parse_program(*args, **kwargs))
+    restored = SymbolicRule.of_wire_format(wire_format)
+    for name in metadata:
+        assert getattr(restored, name) == getattr(rule, name)
+    assert str(restored) == str(rule)
+    assert restored == rule
+    assert not parsed
+    assert not restored.is_fact
+    assert len(parsed) == 1
+
+
+def test_symbolic_rule_wire_format_of_unparsed_rule():
+    rule = SymbolicRule.parse("a(X) :- b(X).").apply_predicate_renaming(a=Predicate.parse("c"))
+    assert pickle.loads(pickle.dumps(rule)) == rule
+
+
+def test_expand_global_and_local_variables_with_several_conditional_literals():
+    rule = SymbolicRule.parse("d(Y) :- b(Y), a(X) : c(X,Y); not a(Z) : c(Z,Y), Z > 1.")
+    rules = rule.expand_global_and_local_variables(herbrand_base=Model.of_program("a(1..3). b(1..2). c(1..3,1..2)."))
+    assert set(str(rule) for rule in rules) == {
+        "d(1) :- b(1), a(3); a(2); a(1); not a(3); not a(2).",
+        "d(2) :- b(2), a(3); a(2); a(1); not a(3); not a(2).",
+    }
+
+
+def test_expand_local_variables_shadowing_global_variables_of_other_rules():
+    rule = SymbolicRule.parse("d(Y) :- b(Y); a(X) : c(X,Y); e(X) : c(Y,X).")
+    rules = rule.expand_global_and_local_variables(herbrand_base=Model.of_program("b(1). c(1,2). c(3,1)."))
+    assert [str(rule) for rule in rules] == ["d(1) :- b(1); a(3); e(2)."]
+
+
+def test_canonical_form_is_invariant_under_variable_renaming_and_formatting():
+    rule = SymbolicRule.parse("a(X) :- b(X,Y), not c(Y).")
+    assert rule.canonical_form == SymbolicRule.parse("a(Z)  :-\n  b(Z, W),\n  not c(W).").canonical_form
+    assert rule.canonical_hash == SymbolicRule.parse("a(Y) :- b(Y,X), not c(X).").canonical_hash
+    assert not rule.is_alpha_equivalent(SymbolicRule.parse("a(X) :- b(Y,X), not c(Y)."))
+    assert not rule.is_alpha_equivalent(rule.disable())
+
+
+def test_canonical_hash_is_stable_across_processes():
+    code = 'from dumbo_asp.primitives.rules import SymbolicRule; ' \
+           'print(SymbolicRule.parse("a(X) :- b(X,Y), not c(Y).").canonical_hash)'
+    hashes = {
+        subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert hashes == {str(SymbolicRule.parse("a(Z) :- b(Z,W), not c(W).").canonical_hash)}
+
+
+def test_substitution_plan_applies_everything_in_one_pass():
+    rule = SymbolicRule.parse("a(X, k) :- b(X, Y), not c(Y, k).")
+    plan = SubstitutionPlan.of(
+        predicates={"a": Predicate.parse("aa"), "c/2": Predicate.parse("cc")},
+        terms={"k": SymbolicTerm.of_int(1)},
+        variables={"Y": SymbolicTerm.parse("f(Z)")},
+    )
+    assert str(rule.apply_substitution_plan(plan)) == "aa(X,1) :- b(X,f(Z)); not cc(f(Z),1)."
+
+
+def test_substitution_plan_shares_untouched_rules():
+    rule = SymbolicRule.parse("a(X) :-  b(X).")
+    plan = SubstitutionPlan.of(predicates={"c": Predicate.parse("d")}, terms={"k": SymbolicTerm.of_int(1)})
+    assert not plan.affects(rule)
+    assert plan.apply(rule) is rule
+
+
+def test_predicates_by_position():
+    rule = SymbolicRule.parse("{a(X) : b(X)} :- c(X), not d(X), #count{Y : e(Y), not f(Y)} > 0.")
+    assert rule.head_predicates == (Predicate.parse("a/1"),)
+    assert rule.positive_body_predicates == tuple(Predicate.parse(p) for p in "b/1 c/1 e/1".split())
+    assert rule.negative_body_predicates == tuple(Predicate.parse(p) for p in "d/1 f/1".split())
+
+
+def test_rule_match():
+    rule = SymbolicRule.parse("a(X) :- b(f(X), 1), not c(X).")
+    assert rule.match(SymbolicAtom.parse("b(f(Y), Z)"))
+    assert rule.match(SymbolicAtom.parse("d"), SymbolicAtom.parse("c(1)"))
+    assert not rule.match(SymbolicAtom.parse("b(g(Y), Z)"))
+    assert not rule.match(SymbolicAtom.parse("b(Y)"))
+
+
+def test_symbolic_rule_with_extended_body_of_rule_without_parsed_string():
+    rule = SymbolicRule.parse("a(x) :- b.").apply_term_substitution(x=SymbolicTerm.of_int(1))
+    assert str(rule.with_extended_body(SymbolicAtom.parse("c"))) == "a(1) :- b; c."
+    assert str(rule.with_extended_body_atoms([SymbolicAtom.parse("c"), SymbolicAtom.parse("d")])) == \
+           "a(1) :- b; c; d."
+
+
+@pytest.mark.parametrize("rule, expected", [
+    ("a :- b.", 1),
+    ("r(X,Z) :- e(X,Y), e(Y,Z).", 80),
+    ("r(X) :- e(1,X).", 4),
+    ("r(X) :- e(X,Y), not n(X).", 20),
+    ("r(X) :- X = 1..100.", 100),
+    ("r(X) :- missing(X).", 0),
+])
+def test_estimate_instances(rule, expected):
+    herbrand_base = Model.of_program("e(1..5,1..4). n(1..5).")
+    assert SymbolicRule.parse(rule).estimate_instances(herbrand_base=herbrand_base) == expected
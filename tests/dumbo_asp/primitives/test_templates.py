@@ -1,12 +1,19 @@
+import json
+import os
+import pickle
 from builtins import ValueError
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
+import dumbo_asp
+from dumbo_asp.primitives.budgets import ExpansionBudget
+from dumbo_asp.caches import ResultCache
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.predicates import Predicate
 from dumbo_asp.primitives.programs import SymbolicProgram
-from dumbo_asp.primitives.templates import Template
+from dumbo_asp.primitives.templates import Template, TemplateLibrary
 
 
 @pytest.fixture
@@ -127,7 +134,7 @@ __apply_template__("transitive closure check", (r, link)).
 link(a,b).
 link(b,a).
 %* __apply_template__("transitive closure check", (r, link)). *%
-%* __apply_template__("transitive closure",(tc,__tc)). *%
+%* __apply_template__("transitive closure", (tc, __tc)). *%
 __tc_ebc40a28_de77_494a_a139_000000000004(X,Y) :- link(X,Y).
 __tc_ebc40a28_de77_494a_a139_000000000004(X,Z) :- __tc_ebc40a28_de77_494a_a139_000000000004(X,Y); link(Y,Z).
 %* __end__. *%
@@ -211,3 +218,228 @@ def test_template_multiline_documentation():
 
 def test_template_multiple_documentation_atoms():
     assert len(Template.core_template('@dumbo/cycle detection').documentation.split('\n')) == 2
+
+
+def test_template_pickling():
+    template = Template(name=Template.Name.parse("main"), program=SymbolicProgram.parse("a :- __static_b."))
+    restored = pickle.loads(pickle.dumps(template))
+    assert restored == template
+    assert str(restored.instantiate()) == str(template.instantiate())
+
+
+def test_core_templates_artifact_is_up_to_date(tmp_path):
+    Template.write_core_templates_artifact(tmp_path / "core_templates.json")
+    with open(tmp_path / "core_templates.json") as file:
+        rebuilt = json.load(file)
+    with open(Path(dumbo_asp.__file__).parent / "templates" / "core_templates.json") as file:
+        shipped = json.load(file)
+    assert shipped == rebuilt
+
+
+def test_core_templates_from_artifact_are_parsable():
+    program = SymbolicProgram.parse(Template.core_templates_as_parsable_string())
+    assert len(program) > Template.core_templates()
+
+
+def test_template_instantiation_without_local_predicates_is_memoized():
+    template = Template(name=Template.Name.parse("main"), program=SymbolicProgram.parse("a(X) :- b(X), __static_c."))
+    first = template.instantiate(a=Predicate.parse("x"))
+    assert template.instantiate(a=Predicate.parse("x")) is first
+    assert str(template.instantiate(a=Predicate.parse("y"))).startswith("y(X) :- b(X)")
+
+
+def test_template_instantiation_with_local_predicates_is_fresh():
+    template = Template(name=Template.Name.parse("main"), program=SymbolicProgram.parse("a :- __b."))
+    assert str(template.instantiate()) != str(template.instantiate())
+
+
+def test_iter_expand_streams_rules(patched_uuid):
+    program = SymbolicProgram.parse("""
+__template__("choice").
+    predicate(X) :- condition(X), not __false(X).
+    __false(X) :- condition(X), not predicate(X).
+__end__.
+
+edb(1..3).
+__apply_template__("choice", (predicate, a), (condition, edb)).
+__apply_template__("unknown").
+    """)
+    rules = Template.iter_expand(rule for rule in program)
+    assert str(next(rules)) == "edb(1..3)."
+    assert str(next(rules)) == f"a(X) :- edb(X); not __false_ebc40a28_de77_494a_a139_{2:012}(X)."
+    next(rules)
+    with pytest.raises(ValueError):
+        next(rules)
+
+
+def test_iter_expand_is_equivalent_to_expand_program():
+    program = SymbolicProgram.parse("""
+__apply_template__("@dumbo/transitive closure", (relation, link), (closure, reach)).
+__apply_template__("@dumbo/exact copy (arity 1)", (input, foo), (output, bar)).
+    """)
+    assert [str(rule) for rule in Template.iter_expand(program, trace=True)] == \
+           [str(rule) for rule in Template.expand_program(program, trace=True)]
+
+
+def test_instantiate_at_is_deterministic():
+    template = Template(name=Template.Name.parse("main"), program=SymbolicProgram.parse("a :- __b. __b :- c."))
+
+    def local_rule(call_site, predicate):
+        return str(template.instantiate_at(call_site, a=Predicate.parse(predicate))[1])
+
+    assert local_rule("1", "x") == local_rule("1", "x")
+    assert local_rule("1", "x") != local_rule("2", "x")
+    assert local_rule("1", "x") != local_rule("1", "y")
+
+
+def test_deterministic_expand_program():
+    program = SymbolicProgram.parse("""
+__template__("choice").
+    predicate(X) :- condition(X), not __false(X).
+    __false(X) :- condition(X), not predicate(X).
+    __static_seen.
+__end__.
+
+__template__("twice").
+    __apply_template__("choice", (predicate, __a)).
+    __apply_template__("choice", (predicate, __b)).
+    ok :- __a(X), __b(X).
+__end__.
+
+condition(1..3).
+__apply_template__("twice").
+__apply_template__("twice").
+__apply_template__("@dumbo/strongly connected components", (link, condition)).
+    """)
+    expanded = str(Template.expand_program(program, deterministic=True))
+    assert expanded == str(Template.expand_program(program, deterministic=True))
+    assert expanded != str(Template.expand_program(program))
+    assert len(Model.of_program(Template.expand_program(program, deterministic=True))) == \
+           len(Model.of_program(Template.expand_program(program)))
+    assert len(SymbolicProgram.parse(expanded).predicates) == \
+           len(Template.expand_program(program).predicates)
+
+
+def test_parallel_expand_program_is_equivalent_to_serial():
+    program = SymbolicProgram.parse('\n'.join([
+        '__template__("choice").',
+        '    predicate(X) :- condition(X), not __false(X).',
+        '    __false(X) :- condition(X), not predicate(X).',
+        '__end__.',
+        *(f'__apply_template__("choice", (predicate, p{index})).' for index in range(20)),
+        *(f'__apply_template__("@dumbo/transitive closure", (relation, r{index}), (closure, c{index})).'
+          for index in range(20)),
+        '__apply_template__("@dumbo/symmetric closure", (relation, r0)).',
+        'condition(1..3).',
+    ]))
+    for trace in [False, True]:
+        assert str(Template.expand_program(program, deterministic=True, trace=trace, workers=2)) == \
+               str(Template.expand_program(program, deterministic=True, trace=trace))
+
+
+def test_parallel_expand_program_raises_errors_of_serial_expansion():
+    program = SymbolicProgram.parse('\n'.join([
+        *(f'__apply_template__("@dumbo/transitive closure", (relation, r{index})).' for index in range(40)),
+        '__apply_template__("@dumbo/transitive closure", (relation, 1)).',
+    ]))
+    with pytest.raises(ValueError):
+        Template.expand_program(program, deterministic=True)
+    with pytest.raises(ValueError):
+        Template.expand_program(program, deterministic=True, workers=2)
+    with pytest.raises(ValueError):
+        Template.expand_program(program, deterministic=True, limit=10, workers=2)
+
+
+def test_parallel_expand_program_requires_deterministic_naming():
+    with pytest.raises(ValueError):
+        Template.expand_program(SymbolicProgram.parse("a."), workers=2)
+
+
+@pytest.fixture
+def library_files(tmp_path):
+    base = tmp_path / "base.asp"
+    base.write_text("""
+__template__("choice").
+    predicate(X) :- condition(X), not __false(X).
+    __false(X) :- condition(X), not predicate(X).
+__end__.
+    """)
+    derived = tmp_path / "derived.asp"
+    derived.write_text("""
+__template__("choice and closure").
+    __apply_template__("choice", (predicate, __choice)).
+    __apply_template__("@dumbo/transitive closure", (relation, __choice), (closure, closure)).
+__end__.
+    """)
+    return base, derived
+
+
+def test_template_library_expands_programs_as_inline_declarations(library_files):
+    library = TemplateLibrary.of(*library_files)
+    program = SymbolicProgram.parse("""
+condition(1..3).
+__apply_template__("choice and closure", (condition, condition)).
+    """)
+    inline = SymbolicProgram.parse('\n'.join(path.read_text() for path in library_files) + str(program))
+    expanded = Template.expand_program(program, library=library, deterministic=True)
+    assert str(expanded) == str(Template.expand_program(program, library=TemplateLibrary.of(*library_files),
+                                                        deterministic=True))
+    assert len(expanded) == len(Template.expand_program(inline))
+    assert len(Model.of_program(expanded)) == len(Model.of_program(Template.expand_program(inline)))
+    assert list(library.templates.keys()) == ["choice", "choice and closure"]
+    assert library.metrics == {"reads": 2, "compilations": 2}
+
+
+def test_template_library_recompiles_changed_files_and_dependent_files(library_files):
+    base, derived = library_files
+    library = TemplateLibrary.of(base, derived)
+    before = library.templates["choice and closure"]
+    assert library.metrics == {"reads": 2, "compilations": 2}
+
+    os.utime(derived, ns=(0, 0))
+    assert library.templates["choice and closure"] is before
+    assert library.metrics == {"reads": 3, "compilations": 2}
+
+    base.write_text(base.read_text().replace("__false", "__other"))
+    assert str(library.templates["choice and closure"]) != str(before)
+    assert library.metrics == {"reads": 5, "compilations": 4}
+
+
+def test_template_library_persists_compiled_files(library_files, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    expected = str(TemplateLibrary.of(*library_files, cache=cache).templates["choice and closure"])
+    library = TemplateLibrary.of(*library_files, cache=cache)
+    assert str(library.templates["choice and closure"]) == expected
+    assert library.metrics == {"reads": 2, "compilations": 0}
+
+
+def test_template_library_accepts_declarations_only(tmp_path):
+    path = tmp_path / "library.asp"
+    path.write_text("a.")
+    with pytest.raises(ValueError):
+        TemplateLibrary.of(path).templates
+
+
+def test_estimate_expansion_of_templates():
+    program = SymbolicProgram.parse("""
+__template__("closure twice").
+    __apply_template__("@dumbo/transitive closure", (relation, a), (closure, b)).
+    __apply_template__("@dumbo/transitive closure", (relation, b), (closure, c)).
+__end__.
+a(1,2).
+__apply_template__("closure twice").
+__apply_template__("closure twice", (c, d)).
+    """)
+    assert Template.estimate_expansion(program).rules == len(Template.expand_program(program))
+
+
+def test_expand_program_with_budget():
+    program = SymbolicProgram.parse('\n'.join(
+        f'__apply_template__("@dumbo/transitive closure", (relation, r{index})).' for index in range(10)
+    ))
+    with pytest.raises(ExpansionBudget.ExceededError) as error:
+        Template.expand_program(program, budget=ExpansionBudget(rules=5))
+    assert "@dumbo/transitive closure" in str(error.value)
+    budget = ExpansionBudget(rules=20)
+    assert len(list(Template.iter_expand(program, budget=budget))) == 20
+    assert budget.usage["rules"] == 20
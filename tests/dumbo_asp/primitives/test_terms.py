@@ -1,3 +1,6 @@
+import pickle
+
+from dumbo_asp.primitives.parsers import Parser
 from dumbo_asp.primitives.terms import SymbolicTerm
 
 
@@ -22,3 +25,16 @@ def test_symbolic_term_int():
     term = SymbolicTerm.parse("123")
     assert term.is_int()
     assert term.int_value() == 123
+
+
+def test_symbolic_term_pickling():
+    term = SymbolicTerm.parse("f(X, 1)")
+    assert pickle.loads(pickle.dumps(term)) == term
+
+
+def test_symbolic_term_of_symbol():
+    for string in ["1", '"foo"', "bar", "-bar", "f(1,g(x))"]:
+        term = SymbolicTerm.of_symbol(Parser.parse_ground_term(string))
+        assert str(term) == string
+    assert SymbolicTerm.of_symbol(Parser.parse_ground_term("1")) == SymbolicTerm.parse("1")
+    assert SymbolicTerm.of_symbol(Parser.parse_ground_term("f(1)")) == SymbolicTerm.parse("f(1)")
@@ -1,5 +1,6 @@
 import pytest
 
+from dumbo_asp.primitives.budgets import ExpansionBudget
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.templates import Template
@@ -46,3 +47,74 @@ __apply_template__("@dumbo/fail if debug messages").
     program = Template.expand_program(program)
     with pytest.raises(Model.NoModelError):
         Model.of_program(program)
+
+
+def test_fail_if_debug_messages_only_for_arities_in_the_program():
+    program = SymbolicProgram.parse("""
+__apply_template__("@dumbo/fail if debug messages").
+__debug__(1) :- a.
+__debug__("x", 2) :- b.
+a.
+    """)
+    program = Template.expand_program(program)
+    assert str(program).endswith(":- __debug__(X0).\n:- __debug__(X0,X1).")
+    assert len(program) == 5
+    with pytest.raises(Model.NoModelError):
+        Model.of_program(program)
+
+
+def test_fail_if_debug_messages_keeps_constraints_of_the_user():
+    program = SymbolicProgram.parse("""
+__apply_template__("@dumbo/fail if debug messages").
+:- __debug__(X0).
+a.
+    """)
+    assert str(Template.expand_program(program)) == ":- __debug__(X0).\na."
+
+
+def test_fail_if_debug_messages_constraints_are_accounted():
+    program = SymbolicProgram.parse("""
+__apply_template__("@dumbo/fail if debug messages").
+__debug__(1) :- a.
+__debug__(1,2) :- a.
+    """)
+    budget = ExpansionBudget()
+    assert len(list(Template.iter_expand(program, budget=budget))) == 4
+    assert budget.usage["rules"] == 4
+    with pytest.raises(ValueError):
+        Template.expand_program(program, limit=3)
+
+
+def test_fail_if_debug_messages_instantiated_directly():
+    template = Template.core_template("@dumbo/fail if debug messages")
+    program = SymbolicProgram.parse(f"__debug__(1,2,3,4,5,6,7).\n{template.instantiate()}")
+    with pytest.raises(Model.NoModelError):
+        Model.of_program(program)
+    assert ":- __debug__(X0,X1,X2,X3,X4,X5,X6)." in Template.core_templates_as_parsable_string()
+
+
+def test_fail_if_debug_messages_applied_in_a_template():
+    program = SymbolicProgram.parse("""
+__template__("strict").
+    __apply_template__("@dumbo/fail if debug messages").
+__end__.
+__apply_template__("@dumbo/exact copy (arity 1)", (input, foo), (output, bar)).
+__apply_template__("strict").
+foo(1).
+bar(2).
+    """)
+    program = Template.expand_program(program)
+    assert str(program).endswith(":- __debug__(X0,X1,X2,X3).")
+    with pytest.raises(Model.NoModelError):
+        Model.of_program(program)
+
+
+def test_copy_templates_are_generated_for_arities_up_to_99():
+    assert not Template.is_core_template("@dumbo/exact copy (arity 100)")
+    assert not Template.is_core_template("@dumbo/collect argument 13 of 12")
+    program = SymbolicProgram.parse("""
+foo(1,2,3,4,5,6,7,8,9,10,11,12).
+__apply_template__("@dumbo/collect argument 12 of 12", (input, foo), (output, bar)).
+    """)
+    model = Model.of_program(Template.expand_program(program))
+    assert model.filter(when=lambda atom: atom.predicate_name == "bar") == Model.of_atoms("bar(12)")
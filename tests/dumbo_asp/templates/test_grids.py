@@ -1,3 +1,6 @@
+import clingo
+import pytest
+
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.templates import Template
@@ -58,3 +61,28 @@ __apply_template__("@dumbo/Sudoku").
     model = [str(atom) for atom in Model.of_program(program) if str(atom).startswith('assign')]
     assert "assign((1,3),4)" in model
 
+
+@pytest.mark.parametrize("template, size, clues", [
+    ("Latin Square", 3, ""),
+    ("Latin Square", 4, "clue((1,1),1). clue((1,2),2). clue((2,1),3). clue((3,3),4)."),
+    ("Diagonal Latin Square", 4, ""),
+    ("Sudoku", 4, "clue((1,1),1). clue((2,3),1). clue((4,4),2)."),
+    ("Graeco-Latin squares", 3, "clue((1,1),1). clue'((1,1),1)."),
+])
+def test_cardinality_encodings_of_grids(template, size, clues):
+    def models(name):
+        program = SymbolicProgram.parse(f"""
+size({size}). value(1..{size}). value'(1..{size}).
+{clues}
+__apply_template__("@dumbo/{name}").
+        """)
+        control = clingo.Control(["0", "--warn=none"])
+        control.add("base", [], str(Template.expand_program(program)))
+        control.ground([("base", [])])
+        res = set()
+        control.solve(on_model=lambda model: res.add(frozenset(
+            str(atom) for atom in model.symbols(shown=True) if atom.name in ["assign", "assign'"]
+        )))
+        return res
+
+    assert models(f"{template} (cardinality)") == models(template)
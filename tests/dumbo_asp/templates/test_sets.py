@@ -1,3 +1,5 @@
+import pytest
+
 from dumbo_asp.primitives.models import Model
 from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.templates import Template
@@ -79,3 +81,36 @@ __apply_template__("@dumbo/discard duplicate sets").
     program = Template.expand_program(program)
     model = Model.of_program(program)
     assert len(model.filter(when=lambda atom: atom.predicate_name == "unique")) == 2
+
+
+SETS = """
+set(s1). set(s2). set(s3). set(s4). set(s5). set(s6).
+in_set(1,s1).
+in_set(1,s2). in_set(2,s2).
+in_set(1,s3). in_set(2,s3).
+in_set(3,s4).
+in_set(4,s7).
+"""
+
+
+def sets_outputs(template, predicate):
+    program = Template.expand_program(SymbolicProgram.parse(f'{SETS}\n__apply_template__("@dumbo/{template}").'))
+    return Model.of_program(program).filter(when=lambda atom: atom.predicate_name == predicate)
+
+
+@pytest.mark.parametrize("template, predicate", [
+    ("subsets", "subset"),
+    ("supersets", "superset"),
+    ("equal sets", "equals"),
+    ("discard duplicate sets", "unique"),
+])
+def test_cardinality_encodings_of_sets(template, predicate):
+    assert sets_outputs(f"{template} (cardinality)", predicate) == sets_outputs(template, predicate)
+
+
+def test_cardinality_encodings_of_strict_subsets_and_supersets():
+    expected = ["s1,s2", "s1,s3"] + [f"{empty},{other}" for empty in ["s5", "s6"] for other in ["s1", "s2", "s3", "s4"]]
+    assert sets_outputs("strict subsets (cardinality)", "subset") == \
+           Model.of_atoms(f"subset({pair})" for pair in expected)
+    assert sets_outputs("strict supersets (cardinality)", "superset") == \
+           Model.of_atoms(f"superset({','.join(reversed(pair.split(',')))})" for pair in expected)
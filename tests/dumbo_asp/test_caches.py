@@ -0,0 +1,77 @@
+import pytest
+
+import dumbo_asp
+from dumbo_asp.caches import CACHE_FORMAT_VERSION, ResultCache
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.queries import enumerate_models
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "cache")
+
+
+def test_result_cache_get_and_put(cache):
+    key = ResultCache.key("foo")
+    assert cache.get("test", key) is None
+    cache.put("test", key, (1, "two"))
+    assert cache.get("test", key) == (1, "two")
+    assert cache.metrics == {"hits": 1, "misses": 1, "writes": 1, "evictions": 0}
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_size=100)
+    for index in range(10):
+        cache.put("test", ResultCache.key(str(index)), "x" * 30)
+    assert cache.size() <= 100
+    assert cache.metrics["evictions"] > 0
+    assert cache.get("test", ResultCache.key("9")) is not None
+    assert cache.get("test", ResultCache.key("0")) is None
+
+
+def test_program_content_hash_is_merkle_over_rules():
+    program = SymbolicProgram.parse("a. b :- a.")
+    assert program.content_hash == SymbolicProgram.of(program[0], program[1]).content_hash
+    assert program.content_hash != SymbolicProgram.of(program[1], program[0]).content_hash
+    assert program[0].content_hash == SymbolicProgram.parse("a.")[0].content_hash
+
+
+def test_herbrand_base_is_cached(cache):
+    program = SymbolicProgram.parse("a(1..3). b(X) :- a(X).")
+    assert program.with_result_cache(cache).herbrand_base == program.herbrand_base
+    assert SymbolicProgram.parse(str(program)).with_result_cache(cache).herbrand_base == program.herbrand_base
+    assert cache.metrics["hits"] == 1
+
+
+def test_query_results_are_cached(cache):
+    program = SymbolicProgram.parse("{a; b}.").with_result_cache(cache)
+    models = enumerate_models(program)
+    assert len(models) == 4
+    writes = cache.metrics["writes"]
+    assert enumerate_models(program) == models
+    assert cache.metrics["writes"] == writes
+    assert enumerate_models(program, true_atoms=Model.of_atoms("a")) != models
+
+
+def test_result_cache_treats_unloadable_entries_as_misses(cache):
+    key = ResultCache.key("foo")
+    cache.put("test", key, "value")
+    path = cache.directory / f"test-{key}.pickle"
+    path.write_bytes(b"\x80\x04\x95\x10\x00\x00\x00\x00\x00\x00\x00\x8c\x08no_such_module\x94\x8c\x01x\x94\x93\x94.")
+    assert cache.get("test", key, "missing") == "missing"
+    assert cache.metrics["misses"] == 1
+
+
+def test_result_cache_returns_entries_evicted_after_loading(cache, monkeypatch):
+    key = ResultCache.key("foo")
+    cache.put("test", key, "value")
+
+    def evicted(path):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr("dumbo_asp.caches.os.utime", evicted)
+    assert cache.get("test", key) == "value"
+
+
+def test_cache_format_version_includes_dumbo_asp_version():
+    assert dumbo_asp.__version__ in CACHE_FORMAT_VERSION
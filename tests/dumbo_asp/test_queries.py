@@ -45,6 +45,31 @@ def test_enumerate_models():
     assert len(models) == 2
 
 
+def test_enumerate_models_with_slicing():
+    program = SymbolicProgram.parse("""
+{a; b; c; d}.
+:- c, d.
+:- not c, not d.
+e(X) :- X = 1..10.
+f(X) :- e(X), not a.
+    """)
+    models = enumerate_models(program, true_atoms=Model.of_atoms("a"), false_atoms=Model.of_atoms("b"), slice=True)
+    assert len(models) == 2
+    assert all(atom.predicate_name in "abcd" for model in models for atom in model)
+
+
+def test_validate_in_all_models_with_slicing():
+    program = SymbolicProgram.parse("""
+a :- b.
+b.
+{c}.
+d :- c.
+    """)
+    validate_in_all_models(program=program, true_atoms=Model.of_atoms("a"), slice=True)
+    with pytest.raises(ValueError):
+        validate_in_all_models(program=program, true_atoms=Model.of_atoms("d"), slice=True)
+
+
 def test_enumerate_models_2():
     program = SymbolicProgram.parse("""
 a :- b.
@@ -189,6 +214,15 @@ def test_explanation_graph_support():
     assert 'link("a","b","a :- b' in graph.as_facts
 
 
+def test_explanation_graph_support_with_slicing():
+    program = SymbolicProgram.parse("a :- b. b. noo :- a. c(1..10). d(X) :- c(X), not e(X). e(1).")
+    answer_set = Model.of_program(str(program))
+    herbrand_base = [GroundAtom.parse(str(atom)) for atom in program.herbrand_base]
+    query = Model.of_program("a.")
+    assert explanation_graph(program, answer_set, herbrand_base, query, slice=True) == \
+           explanation_graph(program, answer_set, herbrand_base, query)
+
+
 def test_explanation_graph_head_upper_bound():
     program = SymbolicProgram.parse("{a; b} <= 1.")
     answer_set = Model.of_atoms("b")
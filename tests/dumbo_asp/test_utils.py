@@ -1,7 +1,9 @@
+import gc
+
 import pytest
 from clingo.ast import Location, Position
 
-from dumbo_asp.utils import one_line, NEW_LINE_SYMBOL, replace_in_parsed_string
+from dumbo_asp.utils import one_line, NEW_LINE_SYMBOL, replace_in_parsed_string, weak_memoize, deterministic_uuid, uuid
 
 
 @pytest.mark.parametrize("lines", [
@@ -21,3 +23,31 @@ me :- body.
     """.strip()
     location = Location(begin=Position('<string>', line=1, column=5), end=Position('<string>', line=3, column=3))
     assert replace_in_parsed_string(rule, location, "b") == "a | b :- body."
+
+
+def test_weak_memoize_does_not_keep_instances_alive():
+    calls = []
+
+    class Foo:
+        @weak_memoize(maxsize=2)
+        def bar(self):
+            calls.append(self)
+            return len(calls)
+
+    foo = Foo()
+    assert foo.bar() == foo.bar() == 1
+    assert Foo.bar.cache_size() == 1
+    calls.clear()
+    del foo
+    gc.collect()
+    assert Foo.bar.cache_size() == 0
+    foos = [Foo() for _ in range(3)]
+    for foo in foos:
+        foo.bar()
+    assert Foo.bar.cache_size() == 2
+
+
+def test_deterministic_uuid():
+    assert deterministic_uuid("a", "b") == deterministic_uuid("a", "b")
+    assert deterministic_uuid("a", "b") != deterministic_uuid("ab")
+    assert len(deterministic_uuid("a")) == len(uuid())